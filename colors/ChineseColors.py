@@ -2,24 +2,70 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import contextlib
 import csv
+import os
 import sys
 import math
+import tempfile
+from functools import lru_cache, partial
 from pathlib import Path
 
 try:
-    import pandas as pd
-except ImportError:
-    print("Error: pandas package is required.")
-    print("Install it with: pip install pandas openpyxl")
-    sys.exit(1)
-
-try:
-    from pypinyin import lazy_pinyin, Style
-except ImportError:
-    print("Error: pypinyin package is required.")
-    print("Install it with: pip install pypinyin")
-    sys.exit(1)
+    import numpy as np
+except ImportError as e:
+    raise ImportError(
+        "numpy package is required. Install it with: pip install numpy"
+    ) from e
+
+from build_cache import BuildCache, code_digest, file_digest
+from category_spill import CategorySpill
+from candidates import (
+    NearestSelected,
+    PaletteCandidates,
+)
+from color_record import lab_array, records_from_table
+from colorspace import (
+    convert_hex_colors,
+    hex_to_hsv,
+    hex_to_lab,
+    hex_to_rgb,
+    lab_to_lch_array,
+    rgb_to_hsv,
+    rgb_to_lab,
+    rgb_to_xyz,
+    xyz_to_lab,
+)
+from cvd import (
+    CVD_TYPES,
+    DEFAULT_CVD_THRESHOLD,
+    PaletteAuditError,
+    audit_palettes,
+    cvd_metric,
+    flagged_palettes,
+)
+from dispersion import max_min_dispersion
+from lab_index import StreamingSuppressor
+from metrics import DEFAULT_METRIC, METRICS, get_metric
+from name_search import NameSearchIndex
+from path_order import optimize_path
+from pinyin_lexicon import (
+    CATEGORY_READINGS,
+    LEXICON_FORMAT,
+    PinyinLexicon,
+    load_overrides,
+)
+from run_report import RunReport, count, counted_call, merge_counters, note
+from rda import character, data_frame, integer, named_list, write_rda
+from workbook import DEFAULT_CHUNK_ROWS, SKIP_REASONS, WorkbookError
+from workbook import clean_rows as clean_workbook_rows
+from workbook import (
+    frame_to_columns,
+    iter_workbook_frames,
+    load_columns,
+    read_workbook,
+    save_columns,
+)
 
 BASE_CHINESE_COLORS = [
     "#1772B4",  # 群青   蓝 - elegant blue (slightly high saturation but acceptable)
@@ -48,74 +94,44 @@ DEFAULT_CHINESE_COLORS = [
 ]
 
 
-def chinese_to_pinyin(chinese_text):
-    """Convert Chinese text to pinyin without tones."""
-    if not chinese_text or pd.isna(chinese_text) or chinese_text == "NA":
-        raise ValueError(f"Invalid Chinese text: {chinese_text}")
-
-    pinyin_list = lazy_pinyin(chinese_text, style=Style.NORMAL)
-    pinyin = "".join(pinyin_list)
-
-    pinyin = pinyin.lower()
-
-    return pinyin
-
-
-def hex_to_rgb(hex_color):
-    """Convert hex color to RGB tuple (0-255)."""
-    hex_color = hex_color.lstrip("#")
-    return tuple(int(hex_color[i : i + 2], 16) for i in (0, 2, 4))
-
-
-def rgb_to_xyz(r, g, b):
-    """Convert RGB to XYZ color space (D65 illuminant)."""
-    # Normalize to 0-1
-    r, g, b = r / 255.0, g / 255.0, b / 255.0
-
-    # Apply gamma correction
-    def f(c):
-        if c > 0.04045:
-            return ((c + 0.055) / 1.055) ** 2.4
-        else:
-            return c / 12.92
-
-    r, g, b = f(r), f(g), f(b)
-
-    # Convert to XYZ using sRGB matrix
-    x = (r * 0.4124564 + g * 0.3575761 + b * 0.1804375) * 100
-    y = (r * 0.2126729 + g * 0.7151522 + b * 0.0721750) * 100
-    z = (r * 0.0193339 + g * 0.1191920 + b * 0.9503041) * 100
-
-    return (x, y, z)
-
+CATEGORY_ORDER = [
+    "blue",
+    "cyan",
+    "green",
+    "yellow",
+    "orange",
+    "red",
+    "purple",
+    "gray_brown",
+]
 
-def xyz_to_lab(x, y, z):
-    """Convert XYZ to LAB color space (D65 illuminant)."""
-    # D65 white point
-    xn, yn, zn = 95.047, 100.000, 108.883
+# Characters whose reading check_pinyin verifies in each category
+PINYIN_CHECK_CHARS = {
+    "blue": "蓝",
+    "red": "红",
+    "green": "绿",
+    "yellow": "黄",
+    "orange": "橙",
+    "purple": "紫",
+    "cyan": "青",
+    "gray_brown": "灰褐",
+}
 
-    def f(t):
-        if t > (6 / 29) ** 3:
-            return t ** (1 / 3)
-        else:
-            return (1 / 3) * ((29 / 6) ** 2) * t + 4 / 29
+CSV_FIELDS = ["num", "name", "name_ch", "rgb", "hex", "category", "category_ch"]
+SET_SIZES = (16, 32, 64, 128)
 
-    fx = f(x / xn)
-    fy = f(y / yn)
-    fz = f(z / zn)
 
-    L = 116 * fy - 16
-    a = 500 * (fx - fy)
-    b = 200 * (fy - fz)
+@lru_cache(maxsize=None)
+def _default_lexicon():
+    return PinyinLexicon()
 
-    return (L, a, b)
 
+def chinese_to_pinyin(chinese_text):
+    """Convert Chinese text to pinyin without tones."""
+    if not isinstance(chinese_text, str) or not chinese_text or chinese_text == "NA":
+        raise ValueError(f"Invalid Chinese text: {chinese_text}")
 
-def rgb_to_lab(rgb):
-    """Convert RGB (0-255) to LAB color space."""
-    r, g, b = rgb
-    x, y, z = rgb_to_xyz(r, g, b)
-    return xyz_to_lab(x, y, z)
+    return _default_lexicon().transliterate(chinese_text)
 
 
 def calculate_chroma(lab):
@@ -137,10 +153,8 @@ def calculate_lab_distance(color1_hex, color2_hex):
     Returns:
         Euclidean distance in LAB color space (higher = more distinguishable)
     """
-    rgb1 = hex_to_rgb(color1_hex)
-    rgb2 = hex_to_rgb(color2_hex)
-    lab1 = rgb_to_lab(rgb1)
-    lab2 = rgb_to_lab(rgb2)
+    lab1 = hex_to_lab(color1_hex)
+    lab2 = hex_to_lab(color2_hex)
 
     L1, a1, b1 = lab1
     L2, a2, b2 = lab2
@@ -148,59 +162,43 @@ def calculate_lab_distance(color1_hex, color2_hex):
     return distance
 
 
-def rgb_to_hsv(rgb):
-    """Convert RGB (0-255) to HSV color space.
-
-    Returns:
-        tuple: (H, S, V) where H is hue in degrees (0-360), S and V are 0-1
-    """
-    r, g, b = rgb[0] / 255.0, rgb[1] / 255.0, rgb[2] / 255.0
+def _select(hex_colors, mask):
+    return [hex_color for hex_color, keep in zip(hex_colors, mask.tolist()) if keep]
 
-    max_val = max(r, g, b)
-    min_val = min(r, g, b)
-    delta = max_val - min_val
 
-    V = max_val
+def base_hue_distance(hues, base_hues):
+    """Circular distance from each hue to the nearest base hue, in degrees.
 
-    if max_val == 0:
-        S = 0
-    else:
-        S = delta / max_val
-
-    if delta == 0:
-        H = 0
-    elif max_val == r:
-        H = 60 * (((g - b) / delta) % 6)
-    elif max_val == g:
-        H = 60 * (((b - r) / delta) + 2)
-    else:
-        H = 60 * (((r - g) / delta) + 4)
+    Returns:
+        (n,) array; ``inf`` everywhere when ``base_hues`` is empty
+    """
+    diff = np.abs(np.asarray(hues)[:, None] - np.asarray(base_hues)[None, :])
+    return np.minimum(diff, 360.0 - diff).min(axis=1, initial=np.inf)
 
-    if H < 0:
-        H += 360
 
-    return (H, S, V)
+def limit_to_base_hue_families(all_colors, base_set8, max_hue_diff=22.5):
+    base_hues = convert_hex_colors(base_set8)["hsv"][:, 0]
+    hues = convert_hex_colors(all_colors)["hsv"][:, 0]
+    return _select(all_colors, base_hue_distance(hues, base_hues) <= max_hue_diff)
 
 
-def limit_to_base_hue_families(all_colors, base_set8, max_hue_diff=22.5):
-    base_hues = []
-    for hex_color in base_set8:
-        rgb = hex_to_rgb(hex_color)
-        hsv = rgb_to_hsv(rgb)
-        base_hues.append(hsv[0])
+def vibrant_mask(hsv, min_saturation=0.55, min_value=0.5, max_value=0.8):
+    """Boolean mask of the ``filter_vibrant_colors`` criteria over (n, 3) HSV."""
+    saturation = hsv[:, 1]
+    value = hsv[:, 2]
+    return (saturation >= min_saturation) & (min_value <= value) & (value <= max_value)
 
-    def min_hue_distance(h):
-        return min(min(abs(h - bh), 360.0 - abs(h - bh)) for bh in base_hues)
 
-    filtered = []
-    for hex_color in all_colors:
-        rgb = hex_to_rgb(hex_color)
-        hsv = rgb_to_hsv(rgb)
-        hue = hsv[0]
-        if min_hue_distance(hue) <= max_hue_diff:
-            filtered.append(hex_color)
+def vibrant_strict_mask(hsv, min_saturation=0.6, min_value=0.55, max_value=0.8):
+    """Boolean mask of the ``filter_vibrant_colors_strict`` criteria over HSV.
 
-    return filtered
+    Like ``vibrant_mask``, but also drops the orange-to-yellow hues
+    (15-45°) unless they are strongly saturated.
+    """
+    hue = hsv[:, 0]
+    saturation = hsv[:, 1]
+    mask = vibrant_mask(hsv, min_saturation, min_value, max_value)
+    return mask & ~((15 <= hue) & (hue < 45) & (saturation < 0.75))
 
 
 def filter_vibrant_colors(
@@ -220,89 +218,83 @@ def filter_vibrant_colors(
     Returns:
         List of hex color strings that meet the vibrant color criteria
     """
-    vibrant_colors = []
-
-    for hex_color in hex_colors:
-        rgb = hex_to_rgb(hex_color)
-        hsv = rgb_to_hsv(rgb)
-        saturation = hsv[1]
-        value = hsv[2]
-
-        if saturation >= min_saturation and min_value <= value <= max_value:
-            vibrant_colors.append(hex_color)
-
-    return vibrant_colors
+    hsv = convert_hex_colors(hex_colors)["hsv"]
+    return _select(hex_colors, vibrant_mask(hsv, min_saturation, min_value, max_value))
 
 
 def filter_vibrant_colors_strict(
     hex_colors, min_saturation=0.6, min_value=0.55, max_value=0.8
 ):
-    vibrant_colors = []
-
-    for hex_color in hex_colors:
-        rgb = hex_to_rgb(hex_color)
-        hsv = rgb_to_hsv(rgb)
-        hue = hsv[0]
-        saturation = hsv[1]
-        value = hsv[2]
-
-        if saturation < min_saturation or not (min_value <= value <= max_value):
-            continue
-
-        if 15 <= hue < 45:
-            if saturation < 0.75:
-                continue
-
-        vibrant_colors.append(hex_color)
-
-    return vibrant_colors
+    hsv = convert_hex_colors(hex_colors)["hsv"]
+    return _select(
+        hex_colors, vibrant_strict_mask(hsv, min_saturation, min_value, max_value)
+    )
 
 
-def score_colors(candidate_color, target_hue, selected_colors, min_lab_distance):
+def score_colors(
+    candidate_color, target_hue, selected_colors, min_lab_distance, candidates=None
+):
     """Score a candidate color for interpolation.
     Args:
         candidate_color: Candidate color hex string
         target_hue: Target hue position (0-360)
         selected_colors: List of already selected colors
         min_lab_distance: Minimum required LAB distance
+        candidates: Optional PaletteCandidates containing the candidate and
+            selected colors; distances are then read from its ΔE matrix
 
     Returns:
         Tuple of (score, min_lab_dist_to_selected)
         score: Higher is better (negative if doesn't meet min distance requirement)
         min_lab_dist_to_selected: Minimum LAB distance to selected colors
     """
-    rgb = hex_to_rgb(candidate_color)
-    hsv = rgb_to_hsv(rgb)
-    hue = hsv[0]
-    saturation = hsv[1]
-    value = hsv[2]
-
-    dist1 = abs(target_hue - hue)
-    dist2 = 360.0 - dist1
-    hue_distance = min(dist1, dist2)
+    hsv = hex_to_hsv(candidate_color)
 
     min_lab_dist = float("inf")
-    if selected_colors:
+    if selected_colors and candidates is not None:
+        min_lab_dist = candidates.min_distance_to(candidate_color, selected_colors)
+    elif selected_colors:
         for selected_color in selected_colors:
             lab_dist = calculate_lab_distance(candidate_color, selected_color)
             min_lab_dist = min(min_lab_dist, lab_dist)
     else:
         min_lab_dist = float("inf")
 
-    if min_lab_dist < min_lab_distance:
-        return (-1, min_lab_dist)
+    score = score_hsv_candidates(
+        np.array([hsv]), np.array([min_lab_dist]), target_hue, min_lab_distance
+    )[0]
+    return (float(score), min_lab_dist)
 
-    brightness_bonus = 0
-    if 0.60 <= value <= 0.80:
-        brightness_bonus = 5
-    else:
-        brightness_bonus = -abs(value - 0.70) * 30
 
-    saturation_bonus = 0
-    if 0.55 <= saturation <= 0.85:
-        saturation_bonus = 5
-    else:
-        saturation_bonus = -abs(saturation - 0.70) * 20
+def score_hsv_candidates(hsv, min_lab_dist, target_hue, min_lab_distance):
+    """Vectorized form of ``score_colors`` for many candidates at once.
+
+    Args:
+        hsv: (n, 3) HSV array of the candidates
+        min_lab_dist: (n,) minimum LAB distance from each candidate to the
+            selected colors (``inf`` when nothing is selected yet)
+        target_hue: Target hue position (0-360)
+        min_lab_distance: Minimum required LAB distance
+
+    Returns:
+        (n,) array of scores, -1 where the distance requirement is not met
+    """
+    hue = hsv[:, 0]
+    saturation = hsv[:, 1]
+    value = hsv[:, 2]
+
+    dist1 = np.abs(target_hue - hue)
+    dist2 = 360.0 - dist1
+    hue_distance = np.minimum(dist1, dist2)
+
+    brightness_bonus = np.where(
+        (0.60 <= value) & (value <= 0.80), 5.0, -np.abs(value - 0.70) * 30
+    )
+    saturation_bonus = np.where(
+        (0.55 <= saturation) & (saturation <= 0.85),
+        5.0,
+        -np.abs(saturation - 0.70) * 20,
+    )
 
     score = (
         -hue_distance
@@ -310,15 +302,25 @@ def score_colors(candidate_color, target_hue, selected_colors, min_lab_distance)
         + saturation_bonus
         + brightness_bonus
     )
-    return (score, min_lab_dist)
+    return np.where(min_lab_dist < min_lab_distance, -1.0, score)
 
 
-def color_order(colors, min_hue_gap=30, min_lab_distance=15):
+def color_order(
+    colors,
+    min_hue_gap=30,
+    min_lab_distance=15,
+    candidates=None,
+    metric=DEFAULT_METRIC,
+):
     """Optimize color order to maximize distinguishability between adjacent colors.
     Args:
         colors: List of hex color strings
         min_hue_gap: Minimum hue gap between adjacent colors (degrees, default 30)
         min_lab_distance: Minimum LAB distance between adjacent colors (default 15)
+        candidates: Optional PaletteCandidates containing all of ``colors``;
+            built from ``colors`` when not given
+        metric: Name of the distance metric in ``metrics.METRICS`` used
+            when ``candidates`` is built here
 
     Returns:
         List of hex colors arranged to maximize adjacent color distinguishability
@@ -326,306 +328,465 @@ def color_order(colors, min_hue_gap=30, min_lab_distance=15):
     if len(colors) <= 1:
         return colors
 
-    best_start = colors[0]
-    best_start_sat = 0
-    for color in colors:
-        rgb = hex_to_rgb(color)
-        hsv = rgb_to_hsv(rgb)
-        if hsv[1] > best_start_sat:
-            best_start_sat = hsv[1]
-            best_start = color
+    if candidates is None:
+        candidates = PaletteCandidates(colors, metric=get_metric(metric))
+    rows = candidates.indices(colors)
+    hues = candidates.hsv[rows, 0]
+    saturations = candidates.hsv[rows, 1]
+    distances = candidates.delta_e(rows, rows)
 
-    ordered = [best_start]
-    remaining = [c for c in colors if c != best_start]
+    start = int(np.argmax(saturations))
+    if not saturations[start] > 0:
+        start = 0
 
-    while remaining:
-        last_color = ordered[-1]
-        best_next = None
-        best_score = -1
+    ordered = [start]
+    remaining = rows != rows[start]
 
-        for candidate in remaining:
-            rgb_last = hex_to_rgb(last_color)
-            hsv_last = rgb_to_hsv(rgb_last)
-            hue_last = hsv_last[0]
+    while remaining.any():
+        last = ordered[-1]
+        positions = np.flatnonzero(remaining)
+        count("candidates_scanned", len(positions))
 
-            rgb_cand = hex_to_rgb(candidate)
-            hsv_cand = rgb_to_hsv(rgb_cand)
-            hue_cand = hsv_cand[0]
+        dist1 = np.abs(hues[positions] - hues[last])
+        dist2 = 360.0 - dist1
+        hue_gap = np.minimum(dist1, dist2)
+        lab_dist = distances[last, positions]
 
-            dist1 = abs(hue_cand - hue_last)
-            dist2 = 360.0 - dist1
-            hue_gap = min(dist1, dist2)
+        scores = np.where(
+            hue_gap < min_hue_gap, lab_dist * 0.5, lab_dist + hue_gap * 0.5
+        )
+        best = int(np.argmax(scores))
+        best_next = positions[best] if scores[best] > -1 else positions[0]
+
+        ordered.append(best_next)
+        remaining[best_next] = False
+
+    return [colors[i] for i in ordered]
+
+
+VIBRANT_LADDER = (
+    (
+        vibrant_strict_mask,
+        {"min_saturation": 0.6, "min_value": 0.55, "max_value": 0.8},
+        22.5,
+    ),
+    (
+        vibrant_strict_mask,
+        {"min_saturation": 0.55, "min_value": 0.5, "max_value": 0.85},
+        25.0,
+    ),
+    (
+        vibrant_mask,
+        {"min_saturation": 0.5, "min_value": 0.5, "max_value": 0.8},
+        30.0,
+    ),
+)
+"""Candidate filters tried in order, each as (HSV mask, kwargs, max_hue_diff).
+
+The first step that leaves enough colors to fill a palette is used; when
+none does, every non-base color is a candidate.
+"""
 
-            lab_dist = calculate_lab_distance(last_color, candidate)
 
-            if hue_gap < min_hue_gap:
-                score = lab_dist * 0.5
-            else:
-                score = lab_dist + hue_gap * 0.5
+PALETTE_ENGINES = ("hue", "dispersion")
 
-            if score > best_score:
-                best_score = score
-                best_next = candidate
 
-        if best_next:
-            ordered.append(best_next)
-            remaining.remove(best_next)
-        else:
-            ordered.append(remaining[0])
-            remaining.remove(remaining[0])
+def _order_thresholds(target_size):
+    """``color_order`` (min_hue_gap, min_lab_distance) for a palette size."""
+    if target_size <= 16:
+        return 50, 25
+    elif target_size <= 32:
+        return 40, 20
+    elif target_size <= 64:
+        return 35, 18
+    else:
+        return 30, 15
 
-    return ordered
 
+class PaletteGenerator:
+    """Palettes of any size interpolated from one base set and color pool.
 
-def interpolate_colors_from_set8(base_set8, all_colors, target_size):
-    """Interpolate colors based on ChineseSet8 hue positions.
+    Everything that does not depend on the palette size is computed once
+    and shared by all sizes: the LAB/HSV table of the pool, the hues of
+    the base colors and the result of each step of ``VIBRANT_LADDER``.
+    Finished palettes are memoized per size. No ΔE matrix over the pool is
+    built; each palette only computes the distances from its selected
+    colors to the base colors and the candidates of its ladder step.
 
-    Strategy:
-    1. Calculate hue positions of base_set8 colors
-    2. Create target hue positions evenly distributed on hue circle (target_size positions)
-    3. For each target position:
-       - If a base_set8 color matches (within threshold), use it
-       - Otherwise, find the closest color from all_colors that matches the target hue
-    4. Filter selected colors to ensure vibrancy
+    The ladder is evaluated once, as one boolean row per step in
+    ``ladder_masks`` over ``available_colors``, from HSV and the distance
+    to the nearest base hue (``base_hue_distance``). ``ladder_counts``
+    tells how many candidates survive each step.
 
     Args:
-        base_set8: List of 8 base hex colors (ChineseSet8)
-        all_colors: List of all available hex colors to choose from
-        target_size: Target total number of colors (16, 32, 64, 128)
-
-    Returns:
-        List of hex colors with base_set8 colors prioritized and interpolated colors,
-        sorted by hue position
+        base_set8: Base hex colors (ChineseSet8) that every palette builds on
+        all_colors: Hex colors to interpolate from
+        metric: Name of the distance metric in ``metrics.METRICS``; the
+            minimum distances are in its units
+        cvd: Optional deficiency names from ``cvd.CVD_TYPES``. Distances
+            are then the smallest of normal and simulated vision, so the
+            minimum-distance constraints also hold for those viewers.
     """
-    if target_size <= len(base_set8):
-        return base_set8[:target_size] if target_size < len(base_set8) else base_set8
-
-    base_hue_map = {}
-    base_colors_with_hue = []
-    for hex_color in base_set8:
-        rgb = hex_to_rgb(hex_color)
-        hsv = rgb_to_hsv(rgb)
-        hue = hsv[0]
-        base_hue_map[hue] = hex_color
-        base_colors_with_hue.append((hue, hex_color))
-
-    hue_step = 360.0 / target_size
-    target_hue_positions = [i * hue_step for i in range(target_size)]
-
-    base_set = set(base_set8)
-    available_colors = [c for c in all_colors if c not in base_set]
-
-    vibrant_colors = filter_vibrant_colors_strict(
-        available_colors, min_saturation=0.6, min_value=0.55, max_value=0.8
-    )
-    vibrant_colors = limit_to_base_hue_families(
-        vibrant_colors,
-        base_set8,
-        max_hue_diff=22.5,
-    )
 
-    if len(vibrant_colors) < (target_size - len(base_set8)):
-        relaxed = filter_vibrant_colors_strict(
-            available_colors, min_saturation=0.55, min_value=0.5, max_value=0.85
+    def __init__(self, base_set8, all_colors, metric=DEFAULT_METRIC, cvd=None):
+        self.base_set8 = list(base_set8)
+        base_set = set(self.base_set8)
+        self.available_colors = [c for c in all_colors if c not in base_set]
+        distance = get_metric(metric)
+        if cvd:
+            distance = cvd_metric(distance, cvd)
+        self.candidates = PaletteCandidates(
+            self.base_set8 + self.available_colors, metric=distance
         )
-        relaxed = limit_to_base_hue_families(relaxed, base_set8, max_hue_diff=25.0)
-        vibrant_colors = relaxed
+        self.base_colors_with_hue = [
+            (hex_to_hsv(hex_color)[0], hex_color) for hex_color in self.base_set8
+        ]
+        self.base_rows = self.candidates.indices(self.base_set8)
 
-    if len(vibrant_colors) < (target_size - len(base_set8)):
-        relaxed2 = filter_vibrant_colors(
-            available_colors, min_saturation=0.5, min_value=0.5, max_value=0.8
+        hsv = self.candidates.hsv[self.candidates.indices(self.available_colors)]
+        self.base_hue_distance = base_hue_distance(
+            hsv[:, 0], self.candidates.hsv[self.base_rows, 0]
         )
-        relaxed2 = limit_to_base_hue_families(relaxed2, base_set8, max_hue_diff=30.0)
-        vibrant_colors = relaxed2
-
-    if len(vibrant_colors) < (target_size - len(base_set8)):
-        vibrant_colors = available_colors
+        self.ladder_masks = np.zeros(
+            (len(VIBRANT_LADDER), len(self.available_colors)), dtype=bool
+        )
+        for step, (mask, kwargs, max_hue_diff) in enumerate(VIBRANT_LADDER):
+            self.ladder_masks[step] = mask(hsv, **kwargs) & (
+                self.base_hue_distance <= max_hue_diff
+            )
+        self._ladder = {}
+        self._palettes = {}
+        self._dispersed = {}
+
+    def ladder_counts(self):
+        """Number of candidates that pass each step of ``VIBRANT_LADDER``."""
+        return self.ladder_masks.sum(axis=1).tolist()
+
+    def _ladder_step(self, step):
+        if step not in self._ladder:
+            colors = _select(self.available_colors, self.ladder_masks[step])
+            self._ladder[step] = (
+                colors,
+                self.candidates.indices(list(dict.fromkeys(colors))),
+            )
+        return self._ladder[step]
+
+    def vibrant_colors(self, needed):
+        """Candidates from the first ladder step with at least ``needed`` colors.
+
+        Returns:
+            Tuple of (hex colors, their unique candidate rows)
+        """
+        for step in range(len(VIBRANT_LADDER)):
+            colors, rows = self._ladder_step(step)
+            if len(colors) >= needed:
+                return colors, rows
+        if "all" not in self._ladder:
+            self._ladder["all"] = (
+                self.available_colors,
+                self.candidates.indices(list(dict.fromkeys(self.available_colors))),
+            )
+        return self._ladder["all"]
+
+    def palette(self, target_size, engine="hue"):
+        """Palette of ``target_size`` colors.
+
+        Args:
+            target_size: Number of colors
+            engine: "hue" fills evenly spaced hue slots (see
+                ``interpolate_colors_from_set8``); "dispersion" maximizes
+                the smallest ΔE between any two colors (see ``dispersed``)
+        """
+        if target_size < 0:
+            raise ValueError(f"Palette size must not be negative, got {target_size}")
+        if engine not in PALETTE_ENGINES:
+            raise ValueError(
+                f"Unknown palette engine '{engine}' (choose from {', '.join(PALETTE_ENGINES)})"
+            )
+        if engine == "dispersion":
+            return list(self.dispersed(target_size)[0])
+        if target_size not in self._palettes:
+            if target_size <= len(self.base_set8):
+                self._palettes[target_size] = self.base_set8[:target_size]
+            else:
+                self._palettes[target_size] = self._interpolate(target_size)
+        return list(self._palettes[target_size])
+
+    def dispersed(self, target_size, time_budget=None):
+        """Palette that keeps every pair of colors as far apart as it can.
+
+        The base colors are pinned, and the others are chosen from the
+        same ``VIBRANT_LADDER`` step the hue engine would use, by
+        ``dispersion.max_min_dispersion``. The result is ordered like the
+        hue engine's.
+
+        Args:
+            target_size: Number of colors
+            time_budget: Optional limit in seconds for improving the
+                palette; without it the result is deterministic
+
+        Returns:
+            Tuple of (palette, min_delta_e): the hex colors and the smallest
+            ΔE between any two of them, in units of the generator's metric
+        """
+        key = (target_size, time_budget)
+        if key not in self._dispersed:
+            needed = max(target_size - len(self.base_set8), 0)
+            _, vibrant_rows = self.vibrant_colors(needed)
+            rows, min_delta_e = max_min_dispersion(
+                self.candidates.delta_e,
+                self.base_rows,
+                vibrant_rows,
+                target_size,
+                time_budget=time_budget,
+            )
+            selected_colors = [self.candidates.hex_colors[row] for row in rows]
+            min_hue_gap, min_lab_distance = _order_thresholds(target_size)
+            if target_size > len(self.base_set8):
+                selected_colors = color_order(
+                    selected_colors,
+                    min_hue_gap=min_hue_gap,
+                    min_lab_distance=min_lab_distance,
+                    candidates=self.candidates,
+                )
+            self._dispersed[key] = (selected_colors, min_delta_e)
+        palette, min_delta_e = self._dispersed[key]
+        return list(palette), min_delta_e
+
+    def warm(self, sizes, engine="hue"):
+        """Generate the palettes of all ``sizes`` ahead of the first request."""
+        for size in sizes:
+            self.palette(size, engine=engine)
+        return self
+
+    def _interpolate(self, target_size):
+        base_set8 = self.base_set8
+        base_colors_with_hue = self.base_colors_with_hue
+        candidates = self.candidates
+        base_rows = self.base_rows
+
+        hue_step = 360.0 / target_size
+        target_hue_positions = [i * hue_step for i in range(target_size)]
+
+        vibrant_colors, vibrant_rows = self.vibrant_colors(target_size - len(base_set8))
+
+        if target_size <= 16:
+            min_lab_distance = 25
+        elif target_size <= 32:
+            min_lab_distance = 20
+        elif target_size <= 64:
+            min_lab_distance = 18
+        else:
+            min_lab_distance = 15
 
-    available_colors_by_hue = {}
-    for hex_color in vibrant_colors:
-        rgb = hex_to_rgb(hex_color)
-        hsv = rgb_to_hsv(rgb)
-        hue = hsv[0]
-        if hue not in available_colors_by_hue:
-            available_colors_by_hue[hue] = []
-        available_colors_by_hue[hue].append((hex_color, hsv[1], hsv[2]))
+        nearest = NearestSelected(
+            candidates, rows=np.concatenate([base_rows, vibrant_rows])
+        )
 
-    if target_size <= 16:
-        min_lab_distance = 25
-    elif target_size <= 32:
-        min_lab_distance = 20
-    elif target_size <= 64:
-        min_lab_distance = 18
-    else:
-        min_lab_distance = 15
+        def best_of(rows, target_hue, min_distance):
+            """First highest-scoring unused row, as (row, score) or (None, -inf)."""
+            rows = nearest.unused(rows)
+            count("candidates_scanned", len(rows))
+            if len(rows) == 0:
+                return None, float("-inf")
+            scores = score_hsv_candidates(
+                candidates.hsv[rows],
+                nearest.min_distance[rows],
+                target_hue,
+                min_distance,
+            )
+            best = int(np.argmax(scores))
+            return rows[best], float(scores[best])
 
-    selected_colors = []
-    used_colors = set()
+        base_assignments = {}
+        base_colors_assigned = set()
 
-    base_assignments = {}
-    base_colors_assigned = set()
+        for base_hue, base_color in base_colors_with_hue:
+            best_target_idx = 0
+            best_target_dist = 360.0
+            for idx, target_hue in enumerate(target_hue_positions):
+                dist1 = abs(target_hue - base_hue)
+                dist2 = 360.0 - dist1
+                dist = min(dist1, dist2)
+                if dist < best_target_dist:
+                    best_target_dist = dist
+                    best_target_idx = idx
+
+            if best_target_idx not in base_assignments:
+                base_assignments[best_target_idx] = base_color
+                base_colors_assigned.add(base_color)
 
-    for base_hue, base_color in base_colors_with_hue:
-        best_target_idx = 0
-        best_target_dist = 360.0
         for idx, target_hue in enumerate(target_hue_positions):
-            dist1 = abs(target_hue - base_hue)
-            dist2 = 360.0 - dist1
-            dist = min(dist1, dist2)
-            if dist < best_target_dist:
-                best_target_dist = dist
-                best_target_idx = idx
-
-        if best_target_idx not in base_assignments:
-            base_assignments[best_target_idx] = base_color
-            base_colors_assigned.add(base_color)
-
-    for idx, target_hue in enumerate(target_hue_positions):
-        best_color = None
-        best_score = float("-inf")
-
-        if idx in base_assignments:
-            base_color = base_assignments[idx]
-            if len(selected_colors) == 0:
-                best_color = base_color
-                selected_colors.append(best_color)
-                used_colors.add(best_color)
-                continue
-            else:
-                score, min_lab_dist = score_colors(
-                    base_color, target_hue, selected_colors, min_lab_distance
-                )
-                if score >= 0:
-                    best_color = base_color
-                    selected_colors.append(best_color)
-                    used_colors.add(best_color)
+            if idx in base_assignments:
+                base_row = candidates.index[base_assignments[idx]]
+                if len(nearest) == 0:
+                    nearest.add(base_row)
                     continue
+                else:
+                    score = score_hsv_candidates(
+                        candidates.hsv[[base_row]],
+                        nearest.min_distance[[base_row]],
+                        target_hue,
+                        min_lab_distance,
+                    )[0]
+                    if score >= 0:
+                        nearest.add(base_row)
+                        continue
 
-        for base_hue, base_color in base_colors_with_hue:
-            if base_color in used_colors:
-                continue
-            score, min_lab_dist = score_colors(
-                base_color, target_hue, selected_colors, min_lab_distance
-            )
-            if score > best_score:
-                best_score = score
-                best_color = base_color
+            best_row, best_score = best_of(base_rows, target_hue, min_lab_distance)
 
-        if best_color is None or best_score < 0:
-            for hex_color in vibrant_colors:
-                if hex_color in used_colors:
-                    continue
-                score, min_lab_dist = score_colors(
-                    hex_color, target_hue, selected_colors, min_lab_distance
-                )
+            if best_row is None or best_score < 0:
+                row, score = best_of(vibrant_rows, target_hue, min_lab_distance)
                 if score > best_score:
-                    best_score = score
-                    best_color = hex_color
+                    best_row, best_score = row, score
 
-        if best_color is not None and best_score >= 0:
-            selected_colors.append(best_color)
-            used_colors.add(best_color)
-        elif best_color is None or best_score < 0:
-            min_lab_distance_relaxed = min_lab_distance * 0.8
-            best_color_relaxed = None
-            best_score_relaxed = float("-inf")
+            if best_row is not None and best_score >= 0:
+                nearest.add(best_row)
+                continue
+
+            row, score = best_of(vibrant_rows, target_hue, min_lab_distance * 0.8)
+            if row is not None and score >= 0:
+                nearest.add(row)
+                continue
 
+            rows = nearest.unused(vibrant_rows)
+            count("candidates_scanned", len(rows))
+            if len(rows) > 0:
+                dist1 = np.abs(target_hue - candidates.hsv[rows, 0])
+                dist2 = 360.0 - dist1
+                dist = np.minimum(dist1, dist2)
+                best = int(np.argmin(dist))
+                if dist[best] < 360.0:
+                    nearest.add(rows[best])
+
+        selected_colors = [candidates.hex_colors[row] for row in nearest.selected]
+        used_colors = set(selected_colors)
+
+        for base_color in base_set8:
+            if base_color not in used_colors:
+                if len(selected_colors) < target_size:
+                    selected_colors.append(base_color)
+                    used_colors.add(base_color)
+                else:
+                    hsv = hex_to_hsv(base_color)
+                    base_hue = hsv[0]
+
+                    worst_idx = 0
+                    worst_dist = 0
+                    for idx, color in enumerate(selected_colors):
+                        if color in base_set8:
+                            continue
+                        if idx >= len(target_hue_positions):
+                            continue
+                        c_hsv = hex_to_hsv(color)
+                        c_hue = c_hsv[0]
+                        target_hue = target_hue_positions[idx]
+                        dist1 = abs(target_hue - c_hue)
+                        dist2 = 360.0 - dist1
+                        dist = min(dist1, dist2)
+                        if dist > worst_dist:
+                            worst_dist = dist
+                            worst_idx = idx
+
+                    if worst_idx < len(target_hue_positions):
+                        target_hue = target_hue_positions[worst_idx]
+                        base_dist1 = abs(target_hue - base_hue)
+                        base_dist2 = 360.0 - base_dist1
+                        base_dist = min(base_dist1, base_dist2)
+                        if base_dist < worst_dist:
+                            selected_colors[worst_idx] = base_color
+                            used_colors.add(base_color)
+
+        if len(selected_colors) < target_size:
             for hex_color in vibrant_colors:
-                if hex_color in used_colors:
-                    continue
-                score, min_lab_dist = score_colors(
-                    hex_color, target_hue, selected_colors, min_lab_distance_relaxed
-                )
-                if score > best_score_relaxed:
-                    best_score_relaxed = score
-                    best_color_relaxed = hex_color
+                if hex_color not in used_colors and len(selected_colors) < target_size:
+                    selected_colors.append(hex_color)
+                    used_colors.add(hex_color)
 
-            if best_color_relaxed is not None and best_score_relaxed >= 0:
-                selected_colors.append(best_color_relaxed)
-                used_colors.add(best_color_relaxed)
-            else:
-                best_color_fallback = None
-                best_distance_fallback = 360.0
-                for hex_color in vibrant_colors:
-                    if hex_color in used_colors:
-                        continue
-                    rgb = hex_to_rgb(hex_color)
-                    hsv = rgb_to_hsv(rgb)
-                    hue = hsv[0]
-                    dist1 = abs(target_hue - hue)
-                    dist2 = 360.0 - dist1
-                    dist = min(dist1, dist2)
-                    if dist < best_distance_fallback:
-                        best_distance_fallback = dist
-                        best_color_fallback = hex_color
-
-                if best_color_fallback is not None:
-                    selected_colors.append(best_color_fallback)
-                    used_colors.add(best_color_fallback)
-
-    for base_color in base_set8:
-        if base_color not in used_colors:
-            if len(selected_colors) < target_size:
-                selected_colors.append(base_color)
-                used_colors.add(base_color)
-            else:
-                rgb = hex_to_rgb(base_color)
-                hsv = rgb_to_hsv(rgb)
-                base_hue = hsv[0]
-
-                worst_idx = 0
-                worst_dist = 0
-                for idx, color in enumerate(selected_colors):
-                    if color in base_set8:
-                        continue
-                    if idx >= len(target_hue_positions):
-                        continue
-                    c_rgb = hex_to_rgb(color)
-                    c_hsv = rgb_to_hsv(c_rgb)
-                    c_hue = c_hsv[0]
-                    target_hue = target_hue_positions[idx]
-                    dist1 = abs(target_hue - c_hue)
-                    dist2 = 360.0 - dist1
-                    dist = min(dist1, dist2)
-                    if dist > worst_dist:
-                        worst_dist = dist
-                        worst_idx = idx
-
-                if worst_idx < len(target_hue_positions):
-                    target_hue = target_hue_positions[worst_idx]
-                    base_dist1 = abs(target_hue - base_hue)
-                    base_dist2 = 360.0 - base_dist1
-                    base_dist = min(base_dist1, base_dist2)
-                    if base_dist < worst_dist:
-                        selected_colors[worst_idx] = base_color
-                        used_colors.add(base_color)
-
-    if len(selected_colors) < target_size:
-        for hex_color in vibrant_colors:
-            if hex_color not in used_colors and len(selected_colors) < target_size:
-                selected_colors.append(hex_color)
-                used_colors.add(hex_color)
+        min_hue_gap, min_lab_dist_for_order = _order_thresholds(target_size)
 
-    if target_size <= 16:
-        min_hue_gap = 50
-        min_lab_dist_for_order = 25
-    elif target_size <= 32:
-        min_hue_gap = 40
-        min_lab_dist_for_order = 20
-    elif target_size <= 64:
-        min_hue_gap = 35
-        min_lab_dist_for_order = 18
-    else:
-        min_hue_gap = 30
-        min_lab_dist_for_order = 15
+        ordered_colors = color_order(
+            selected_colors,
+            min_hue_gap=min_hue_gap,
+            min_lab_distance=min_lab_dist_for_order,
+            candidates=candidates,
+        )
+
+        return ordered_colors[:target_size]
+
+
+@lru_cache(maxsize=8)
+def _palette_generator(base_set8, all_colors, metric, cvd):
+    return PaletteGenerator(base_set8, all_colors, metric=metric, cvd=cvd)
+
+
+def palette_generator(
+    colors, base=BASE_CHINESE_COLORS, metric=DEFAULT_METRIC, cvd=None
+):
+    """Shared ``PaletteGenerator`` for ``colors``, ``base``, ``metric`` and ``cvd``.
 
-    ordered_colors = color_order(
-        selected_colors,
-        min_hue_gap=min_hue_gap,
-        min_lab_distance=min_lab_dist_for_order,
+    Generators are kept for the last few distinct combinations, so
+    ``generate_palette`` calls with the same arguments reuse them. Call
+    ``warm`` on the result to precompute the sizes a caller will ask for.
+    """
+    return _palette_generator(
+        tuple(base), tuple(colors), metric, tuple(cvd) if cvd else None
     )
 
-    return ordered_colors[:target_size]
+
+def generate_palette(
+    n, colors, base=BASE_CHINESE_COLORS, metric=DEFAULT_METRIC, engine="hue", cvd=None
+):
+    """Palette of ``n`` colors interpolated from ``colors`` around ``base``.
+
+    The candidate tables are shared with every other call for the same
+    colors, base and metric (see ``palette_generator``), and a size that
+    was generated before is returned from memory.
+
+    Args:
+        n: Number of colors; up to ``len(base)`` the base colors are returned
+        colors: Hex colors to interpolate from, e.g. the build's final colors
+        base: Base hex colors that the palette builds on
+        metric: Name of the distance metric in ``metrics.METRICS``
+        engine: "hue" or "dispersion"; see ``PaletteGenerator.palette``
+        cvd: Optional deficiency names whose simulated ΔE the palette must
+            also respect; see ``PaletteGenerator``
+
+    Returns:
+        List of ``n`` hex colors (fewer if ``colors`` runs out), ordered for
+        adjacent distinguishability
+    """
+    generator = palette_generator(colors, base=base, metric=metric, cvd=cvd)
+    return generator.palette(n, engine=engine)
+
+
+def interpolate_colors_from_set8(
+    base_set8, all_colors, target_size, metric=DEFAULT_METRIC, cvd=None
+):
+    """Interpolate colors based on ChineseSet8 hue positions.
+
+    Strategy:
+    1. Calculate hue positions of base_set8 colors
+    2. Create target hue positions evenly distributed on hue circle (target_size positions)
+    3. For each target position:
+       - If a base_set8 color matches (within threshold), use it
+       - Otherwise, find the closest color from all_colors that matches the target hue
+    4. Filter selected colors to ensure vibrancy
+
+    Args:
+        base_set8: List of 8 base hex colors (ChineseSet8)
+        all_colors: List of all available hex colors to choose from
+        target_size: Target total number of colors (16, 32, 64, 128)
+        metric: Name of the distance metric in ``metrics.METRICS``; the
+            minimum distances are in its units
+
+    Returns:
+        List of hex colors with base_set8 colors prioritized and interpolated colors,
+        sorted by hue position
+    """
+    return generate_palette(
+        target_size, all_colors, base=base_set8, metric=metric, cvd=cvd
+    )
 
 
 def _category_hue_center(category_name):
@@ -746,444 +907,791 @@ def _adjacent_path_cost(items, category_name):
     )
 
 
-def sort_colors_by_lab_improved(rows, category_name):
+def _transition_cost_matrix(lab, chroma, hue, category_name, metric=DEFAULT_METRIC):
+    """All pairwise ``_transition_cost`` values for one category at once,
+    with ΔE measured by ``metric``."""
+    cfg = _category_sort_config(category_name)
+    delta_e = get_metric(metric)(lab, lab)
+    count("distance_evaluations", len(lab) ** 2)
+    lightness_gap = np.abs(lab[None, :, 0] - lab[:, None, 0])
+    chroma_gap = np.abs(chroma[None, :] - chroma[:, None])
+    hue_gap = np.abs(hue[:, None] - hue[None, :]) % 360.0
+    hue_gap = np.minimum(hue_gap, 360.0 - hue_gap)
+    return (
+        delta_e
+        + cfg["hue_weight"] * hue_gap
+        + cfg["lightness_weight"] * lightness_gap
+        + cfg["chroma_weight"] * chroma_gap
+    )
+
+
+def sort_colors_by_lab_improved(
+    rows, category_name, max_passes=50, time_budget=None, metric=DEFAULT_METRIC
+):
     """
     Sort colors for smoother visual continuity inside each category.
 
     Strategy:
     1. Pick a clean category anchor instead of starting from a muddy extreme.
     2. Build a greedy path in LAB space with small hue/lightness penalties.
-    3. Apply a local swap optimization to reduce remaining adjacent jumps.
+    3. Improve the path with 2-opt and Or-opt moves over a precomputed
+       transition cost matrix until no move helps or the budget runs out.
+
+    Args:
+        rows: List of ColorRecord
+        category_name: Category used to pick the anchor and cost weights
+        max_passes: Maximum number of improvement sweeps (default 50)
+        time_budget: Optional wall-clock limit in seconds for the improvement
+        metric: Name of the ΔE metric in ``metrics.METRICS`` used in the
+            transition cost
     """
     if len(rows) <= 1:
         return rows
 
     cfg = _category_sort_config(category_name)
     center = _category_hue_center(category_name)
-    lab_data = []
-    for idx, row in enumerate(rows):
-        hex_color = row["hex"]
-        if not hex_color:
-            raise ValueError(f"Color hex code not found in row {idx}")
-        rgb = hex_to_rgb(hex_color)
-        lab = rgb_to_lab(rgb)
-        L, a, b = lab
-
-        chroma = calculate_chroma(lab)
-
-        hue_angle = math.degrees(math.atan2(b, a))
-        if hue_angle < 0:
-            hue_angle += 360
-
-        anchor_score = (
-            L
-            + cfg["start_chroma_weight"] * chroma
-            - cfg["start_hue_weight"] * _circular_hue_distance(hue_angle, center)
-        )
+    lab = lab_array(rows)
+    L, chroma, hue_angle = lab_to_lch_array(lab).T
+
+    center_distance = np.abs(hue_angle - center) % 360.0
+    center_distance = np.minimum(center_distance, 360.0 - center_distance)
+    anchor_score = (
+        L
+        + cfg["start_chroma_weight"] * chroma
+        - cfg["start_hue_weight"] * center_distance
+    )
+    start_idx = int(np.argmax(anchor_score))
 
-        lab_data.append((idx, lab, chroma, hue_angle, anchor_score, row))
+    cost = _transition_cost_matrix(lab, chroma, hue_angle, category_name, metric)
+    path = optimize_path(
+        cost, start_idx, max_passes=max_passes, time_budget=time_budget
+    )
+    return [rows[i] for i in path.tolist()]
 
-    start_idx = max(range(len(lab_data)), key=lambda i: lab_data[i][4])
-    ordered = [lab_data[start_idx]]
-    remaining = lab_data[:start_idx] + lab_data[start_idx + 1 :]
 
-    while remaining:
-        last_item = ordered[-1]
-        best_next_idx = min(
-            range(len(remaining)),
-            key=lambda i: _transition_cost(last_item, remaining[i], category_name),
-        )
-        ordered.append(remaining.pop(best_next_idx))
+def run_jobs(func, *arg_lists, jobs=1):
+    """Call ``func`` over zipped argument lists, optionally on a process pool.
 
-    for _ in range(4):
-        improved = False
-        for i in range(len(ordered) - 1):
-            current = ordered[:]
-            swapped = ordered[:]
-            swapped[i], swapped[i + 1] = swapped[i + 1], swapped[i]
+    Results come back in input order, so the output does not depend on
+    ``jobs`` or on which worker finishes first. Counters bumped in the
+    workers are added to this process's run report.
 
-            left = max(0, i - 2)
-            right = min(len(ordered), i + 4)
-            current_cost = _adjacent_path_cost(current[left:right], category_name)
-            swapped_cost = _adjacent_path_cost(swapped[left:right], category_name)
+    Args:
+        func: Top-level (picklable) function to call
+        *arg_lists: One list per positional argument of ``func``
+        jobs: Number of worker processes; 1 runs everything in this process
 
-            if swapped_cost + 1e-6 < current_cost:
-                ordered = swapped
-                improved = True
+    Returns:
+        List of results, one per call
+    """
+    n_tasks = min((len(args) for args in arg_lists), default=0)
+    if jobs <= 1 or n_tasks <= 1:
+        return [func(*args) for args in zip(*arg_lists)]
 
-        if not improved:
-            break
+    from concurrent.futures import ProcessPoolExecutor
 
-    return [item[5] for item in ordered]
+    with ProcessPoolExecutor(max_workers=min(jobs, n_tasks)) as executor:
+        outputs = list(executor.map(partial(counted_call, func), *arg_lists))
+    for _, counters in outputs:
+        merge_counters(counters)
+    return [result for result, _ in outputs]
 
 
-def main(delete_csv=False, filter_colors=False):
-    """
-    Main function to process Chinese colors.
+def load_workbook(excel_path, columns_dir=None, streaming=False):
+    """Read every sheet of the workbook into column arrays.
 
     Args:
-        delete_csv (bool): If True, delete CSV file after successfully saving RDA file.
-                           Default is False.
-        filter_colors (bool): If True, apply color quality filtering and distance optimization.
-                              If False, keep all unique colors without filtering.
-                              Default is False.
-    """
-    script_dir = Path(__file__).parent
-    project_root = script_dir.parent
+        excel_path: Path to the workbook
+        columns_dir: Optional directory for the columnar copy of the
+            workbook; reused when it was written from the same file, and
+            (re)written after parsing the Excel file otherwise
+        streaming: If True, parse the workbook with openpyxl's streaming
+            read-only reader
 
-    excel_path = script_dir / "ChineseColors5.0.xlsx"
-    csv_path = script_dir / "chinese_colors.csv"
-    data_dir = project_root / "data"
-    rda_path = data_dir / "chinese_colors.rda"
+    Returns:
+        Dict of column name to array, as produced by ``frame_to_columns``
 
-    if not excel_path.exists():
-        print(f"Error: Excel file not found: {excel_path}")
-        sys.exit(1)
+    Raises:
+        WorkbookError: If no sheet has any of the required columns
+    """
+    source_digest = file_digest(excel_path)
+    columns = None
+    if columns_dir is not None:
+        columns = load_columns(columns_dir, source_digest)
+    if columns is not None:
+        print(f"Loading columnar workbook data: {columns_dir}")
+        return columns
 
-    print(f"Reading Excel file: {excel_path}")
-
-    all_sheets = pd.ExcelFile(excel_path)
-    sheets = [s for s in all_sheets.sheet_names]
-
-    print(f"Found sheets: {', '.join(sheets)}")
-
-    required_columns = ["色名", "C", "M", "Y", "K", "R", "G", "B", "总"]
-
-    all_data = []
-    for sheet in sheets:
-        print(f"  Reading sheet: {sheet}...")
-        df = pd.read_excel(excel_path, sheet_name=sheet, header=1)
-
-        available_cols = list(df.columns)
-        missing_cols = [col for col in required_columns if col not in available_cols]
-        if missing_cols:
-            print(f"    Warning: Missing columns in sheet '{sheet}': {missing_cols}")
-            print(f"    Available columns: {available_cols}")
-            for missing_col in missing_cols:
-                similar = [
-                    c
-                    for c in available_cols
-                    if missing_col in str(c) or str(c) in missing_col
-                ]
-                if similar:
-                    print(f"      Similar to '{missing_col}': {similar}")
-
-        cols_to_use = [col for col in required_columns if col in df.columns]
-        if len(cols_to_use) == 0:
-            print(f"    Error: No required columns found in sheet '{sheet}'")
-            continue
+    df_all = read_workbook(excel_path, streaming=streaming)
+    if df_all is None:
+        raise WorkbookError("No data loaded from any sheet")
+    columns = frame_to_columns(df_all)
+    if columns_dir is not None:
+        save_columns(columns, columns_dir, source_digest)
+    return columns
 
-        df = df[cols_to_use]
-        df["sheet_name"] = sheet
-        all_data.append(df)
-        print(f"    Rows: {len(df)}, Cols: {len(df.columns)}")
 
-    if len(all_data) == 0:
-        print("\nError: No data loaded from any sheet")
-        sys.exit(1)
+NAME_COLUMN = "色名"
+RGB_COLUMNS = ("R", "G", "B")
 
-    df_all = pd.concat(all_data, ignore_index=True)
-    print(f"\nTotal rows after merging: {len(df_all)}")
-    print(f"Columns: {list(df_all.columns)}")
 
-    name_col = "色名"
-    r_col = "R"
-    g_col = "G"
-    b_col = "B"
+def iter_workbook_columns(
+    excel_path, columns_dir=None, streaming=False, chunk_rows=DEFAULT_CHUNK_ROWS
+):
+    """Yield the workbook as column-array chunks of at most ``chunk_rows`` rows.
 
-    if name_col not in df_all.columns:
-        print(f"\nError: Required column '{name_col}' not found")
-        print(f"  Available columns: {list(df_all.columns)}")
-        sys.exit(1)
+    A columnar copy in ``columns_dir`` written from the same file is
+    memory-mapped and sliced, so only the current chunk is paged in. With
+    ``streaming`` the Excel file is otherwise converted chunk by chunk as
+    openpyxl reads it; since the whole workbook is never held, no columnar
+    copy is written in that mode. Without it, ``load_workbook`` parses the
+    file with pandas and refreshes the copy.
 
-    if (
-        r_col not in df_all.columns
-        or g_col not in df_all.columns
-        or b_col not in df_all.columns
-    ):
-        print("\nError: Required RGB columns not found")
-        print(f"  Available columns: {list(df_all.columns)}")
-        print(f"  R column: {r_col if r_col in df_all.columns else 'NOT FOUND'}")
-        print(f"  G column: {g_col if g_col in df_all.columns else 'NOT FOUND'}")
-        print(f"  B column: {b_col if b_col in df_all.columns else 'NOT FOUND'}")
-        sys.exit(1)
+    Raises:
+        WorkbookError: If no sheet has any of the required columns
+    """
+    if not streaming:
+        columns = load_workbook(excel_path, columns_dir=columns_dir)
+    else:
+        columns = None
+        if columns_dir is not None:
+            columns = load_columns(columns_dir, file_digest(excel_path))
+        if columns is None:
+            n_chunks = 0
+            for frame in iter_workbook_frames(
+                excel_path, streaming=True, chunk_rows=chunk_rows
+            ):
+                n_chunks += 1
+                yield frame_to_columns(frame)
+            if n_chunks == 0:
+                raise WorkbookError("No data loaded from any sheet")
+            return
+        print(f"Loading columnar workbook data: {columns_dir}")
+
+    n_rows = len(next(iter(columns.values()), ()))
+    for start in range(0, max(n_rows, 1), chunk_rows):
+        yield {
+            column: values[start : start + chunk_rows]
+            for column, values in columns.items()
+        }
+
+
+def _missing_columns_error(available):
+    if NAME_COLUMN not in available:
+        return WorkbookError(
+            f"Required column '{NAME_COLUMN}' not found\n"
+            f"  Available columns: {available}"
+        )
+    found = {col: col if col in available else "NOT FOUND" for col in RGB_COLUMNS}
+    return WorkbookError(
+        "Required RGB columns not found\n"
+        f"  Available columns: {available}\n"
+        f"  R column: {found['R']}\n"
+        f"  G column: {found['G']}\n"
+        f"  B column: {found['B']}"
+    )
 
-    print("\nUsing columns:")
-    print(f"  Name: {name_col}")
-    print(f"  R: {r_col}, G: {g_col}, B: {b_col}")
-
-    category_map = {
-        "红": "red",
-        "橙": "orange",
-        "黄": "yellow",
-        "绿": "green",
-        "青": "cyan",
-        "蓝": "blue",
-        "紫": "purple",
-        "灰褐": "gray_brown",
-    }
 
-    print("\nProcessing colors...")
-    colors_list = []
+def iter_colors(chunks, lexicon=None, stats=None, short_names=None):
+    """Clean workbook column chunks into color records, one at a time.
 
-    short_names = []
-    skipped_rows = []
+    Each chunk is validated with whole-column operations and its names are
+    transliterated in one batch, so memory is bounded by the chunk size as
+    long as the caller does not collect the records (``spill_workbook_colors``
+    writes them to disk by category). A chunk from a sheet that lacks the
+    name or an RGB column has those rows skipped as missing; the columns
+    only have to exist somewhere.
 
-    for idx, row in df_all.iterrows():
-        name_ch_raw = row[name_col]
-        if pd.isna(name_ch_raw):
-            continue
+    Args:
+        chunks: Iterable of column-array dicts, e.g. from
+            ``iter_workbook_columns``
+        lexicon: PinyinLexicon used to transliterate the names; defaults to
+            an in-memory one
+        stats: Optional dict updated with the number of ``rows`` read, the
+            number ``kept`` and the count of each of ``SKIP_REASONS``
+        short_names: Optional list extended with the skipped
+            single-character names
+
+    Yields:
+        ColorRecord with pinyin names, LAB set and ``num`` set to None
+
+    Raises:
+        WorkbookError: If no chunk has the name column or all RGB columns
+    """
+    lexicon = _default_lexicon() if lexicon is None else lexicon
+    stats = {} if stats is None else stats
+    seen_columns = {}
+    row_offset = 0
+    for columns in chunks:
+        seen_columns.update(dict.fromkeys(columns))
+        n_rows = len(next(iter(columns.values()), ()))
+        columns = dict(columns)
+        if NAME_COLUMN not in columns:
+            columns[NAME_COLUMN] = np.full(n_rows, "", dtype="U1")
+        for col in RGB_COLUMNS:
+            if col not in columns:
+                columns[col] = np.full(n_rows, np.nan)
+
+        table, chunk_short_names, skipped = clean_workbook_rows(
+            columns, name_col=NAME_COLUMN, rgb_cols=RGB_COLUMNS, row_offset=row_offset
+        )
+        row_offset += n_rows
+        stats["rows"] = stats.get("rows", 0) + n_rows
+        stats["kept"] = stats.get("kept", 0) + len(table)
+        for reason, n in skipped.items():
+            stats[reason] = stats.get(reason, 0) + n
+        if short_names is not None:
+            short_names.extend(chunk_short_names)
 
-        name_ch = str(name_ch_raw).strip()
-        if name_ch == "nan" or name_ch == "":
-            continue
+        names = lexicon.transliterate_many(table["name_ch"].tolist())
+        yield from records_from_table(table, names)
 
-        name_ch = name_ch.replace("\n", " ").replace("\r", " ")
+    available = list(seen_columns)
+    if NAME_COLUMN not in available or any(c not in available for c in RGB_COLUMNS):
+        raise _missing_columns_error(available)
 
-        if "/" in name_ch:
-            name_ch = name_ch.split("/")[0].strip()
 
-        name_ch = name_ch.strip()
+def _print_clean_summary(stats):
+    print(f"  Kept {stats.get('kept', 0)} of {stats.get('rows', 0)} rows")
+    for reason in SKIP_REASONS:
+        if stats.get(reason):
+            print(f"  Skipped {stats[reason]} rows: {reason}")
 
-        chinese_chars = [c for c in name_ch if "\u4e00" <= c <= "\u9fff"]
-        if len(chinese_chars) == 0:
-            continue
 
-        if len(name_ch) > 10:
-            continue
+def clean_rows(columns, lexicon=None):
+    """Turn workbook columns into color records with pinyin names.
 
-        category_chars = [
-            "红",
-            "橙",
-            "黄",
-            "绿",
-            "青",
-            "蓝",
-            "紫",
-            "灰",
-            "褐",
-            "黑",
-            "白",
-        ]
-        r_val = row[r_col]
-        g_val = row[g_col]
-        b_val = row[b_col]
-
-        if len(name_ch) == 1 and name_ch in category_chars:
-            sheet_cat = str(row["sheet_name"]).strip()
-            if name_ch == sheet_cat or name_ch in sheet_cat:
-                rgb_str = "N/A"
-                if not pd.isna(r_val) and not pd.isna(g_val) and not pd.isna(b_val):
-                    try:
-                        r = int(float(r_val))
-                        g = int(float(g_val))
-                        b = int(float(b_val))
-                        rgb_str = f"({r}, {g}, {b})"
-                    except (ValueError, TypeError):
-                        pass
-                short_names.append(
-                    {"row": idx, "name": name_ch, "sheet": sheet_cat, "rgb": rgb_str}
-                )
-                continue
+    Args:
+        columns: Dict of column arrays from ``load_workbook``
+        lexicon: PinyinLexicon used to transliterate the names; defaults to
+            an in-memory one
 
-        if pd.isna(r_val) or pd.isna(g_val) or pd.isna(b_val):
-            continue
+    Returns:
+        Tuple of (colors_list, short_names): ColorRecord list with pinyin
+        names, and the single-character names that were skipped
 
-        try:
-            r = int(float(r_val))
-            g = int(float(g_val))
-            b = int(float(b_val))
-        except (ValueError, TypeError):
-            continue
+    Raises:
+        WorkbookError: If the name or RGB columns are missing
+    """
+    print("\nProcessing colors...")
+    stats = {}
+    short_names = []
+    colors_list = list(iter_colors([columns], lexicon, stats, short_names))
+    _print_clean_summary(stats)
+    return colors_list, short_names
+
+
+def read_workbook_colors(
+    excel_path,
+    columns_dir=None,
+    streaming=False,
+    lexicon=None,
+    chunk_rows=DEFAULT_CHUNK_ROWS,
+    stats=None,
+):
+    """Read the workbook in chunks and collect its cleaned color records.
 
-        if not (0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255):
-            continue
+    The raw rows pass through cleaning and transliteration in chunks of
+    ``chunk_rows``; every finished record is kept in the returned list.
+    The pipeline uses ``spill_workbook_colors`` instead, which does not
+    hold them all.
 
-        category_ch = str(row["sheet_name"]).strip()
-        if category_ch not in category_map:
-            print(f"  Warning: Skipping row {idx}: Unknown category '{category_ch}'")
-            continue
+    Args:
+        stats: Optional dict receiving the row counts of ``iter_colors``
 
-        category = category_map[category_ch]
-        hex_color = f"#{r:02X}{g:02X}{b:02X}"
-        rgb_str = f"({r}, {g}, {b})"
+    Returns:
+        Tuple of (colors_list, short_names)
+    """
+    print(f"\nProcessing colors (chunks of up to {chunk_rows} rows)...")
+    print(f"  Name: {NAME_COLUMN}")
+    print(f"  R: {RGB_COLUMNS[0]}, G: {RGB_COLUMNS[1]}, B: {RGB_COLUMNS[2]}")
+    stats = {} if stats is None else stats
+    short_names = []
+    chunks = iter_workbook_columns(
+        excel_path, columns_dir=columns_dir, streaming=streaming, chunk_rows=chunk_rows
+    )
+    colors_list = list(iter_colors(chunks, lexicon, stats, short_names))
+    _print_clean_summary(stats)
+    return colors_list, short_names
+
+
+def spill_workbook_colors(
+    excel_path,
+    directory,
+    columns_dir=None,
+    streaming=False,
+    lexicon=None,
+    chunk_rows=DEFAULT_CHUNK_ROWS,
+):
+    """Stream the workbook through cleaning into per-category files.
 
-        try:
-            name_pinyin = chinese_to_pinyin(name_ch)
-            colors_list.append(
-                {
-                    "num": None,
-                    "name": name_pinyin,
-                    "name_ch": name_ch,
-                    "rgb": rgb_str,
-                    "hex": hex_color,
-                    "category": category,
-                    "category_ch": category_ch,
-                }
-            )
-        except Exception as e:
-            print(f"  Warning: Failed to convert '{name_ch}' to pinyin: {e}")
+    Like ``read_workbook_colors``, but each batch of ``chunk_rows`` records
+    is appended to a ``CategorySpill`` in ``directory`` instead of a list,
+    so memory stays bounded by the chunk size however large the workbook.
 
-    print(f"Extracted {len(colors_list)} colors")
+    Returns:
+        Finished CategorySpill whose ``info`` holds ``short_names`` and the
+        ``stats`` of ``iter_colors``
+    """
+    print(f"\nProcessing colors (chunks of up to {chunk_rows} rows)...")
+    print(f"  Name: {NAME_COLUMN}")
+    print(f"  R: {RGB_COLUMNS[0]}, G: {RGB_COLUMNS[1]}, B: {RGB_COLUMNS[2]}")
+    stats = {}
+    short_names = []
+    spill = CategorySpill(directory)
+    chunks = iter_workbook_columns(
+        excel_path, columns_dir=columns_dir, streaming=streaming, chunk_rows=chunk_rows
+    )
+    for batch in _batched(iter_colors(chunks, lexicon, stats, short_names), chunk_rows):
+        spill.add(batch)
+    _print_clean_summary(stats)
+    return spill.finish(short_names=short_names, stats=stats)
 
-    if short_names:
-        print(
-            f"\nWarning: Found {len(short_names)} single-character color names that were skipped:"
-        )
-        print("  These might be truncated names")
-        for item in short_names[:10]:
-            print(
-                f"    Row {item['row']}: '{item['name']}' in sheet '{item['sheet']}' (RGB: {item['rgb']})"
-            )
-        if len(short_names) > 10:
-            print(f"    ... and {len(short_names) - 10} more")
 
-    if skipped_rows:
-        print(f"\nSkipped {len(skipped_rows)} rows due to missing data")
+def build_rda_object(colors, fieldnames, color_sets):
+    """The ``chinese_colors`` data.frame as R objects for ``write_rda``.
 
+    Mirrors what ``read.csv`` returns for the exported CSV (``num`` as
+    integer, every other column as UTF-8 character), with each color set
+    tagged ``type = "discrete"`` under the ``color_sets`` attribute and
+    the ``chinese_colors`` class in front of ``data.frame``.
+    """
+    rows = [color.as_row() for color in colors]
+    columns = {
+        field: (
+            integer([int(row[field]) for row in rows])
+            if field == "num"
+            else character([str(row[field]) for row in rows])
+        )
+        for field in fieldnames
+    }
+    sets = named_list(
+        {
+            set_name: character(list(set_colors), {"type": character(["discrete"])})
+            for set_name, set_colors in color_sets.items()
+        }
+    )
+    return data_frame(
+        columns,
+        classes=("chinese_colors", "data.frame"),
+        attributes={"color_sets": sets},
+    )
+
+
+def save_rda_rscript(script_dir, csv_path, rda_path, color_sets):
+    """Save the RDA file by running ``usethis::use_data`` through Rscript.
+
+    Returns:
+        True if Rscript succeeded
+    """
+    csv_abs_path = csv_path.resolve()
+    rda_abs_path = rda_path.resolve()
+
+    r_script = f'''chinese_colors <- read.csv("{csv_abs_path}", encoding="UTF-8", stringsAsFactors=FALSE)
+chinese_color_sets <- list(
+'''
+
+    for set_name, colors_list in color_sets.items():
+        colors_str = ", ".join([f'"{c}"' for c in colors_list])
+        r_script += f"  {set_name} = c({colors_str}),\n"
+
+    r_script = r_script.rstrip(",\n") + "\n)\n"
+    r_script += f"""
+for (set_name in names(chinese_color_sets)) {{
+  attr(chinese_color_sets[[set_name]], "type") <- "discrete"
+}}
+attr(chinese_colors, "color_sets") <- chinese_color_sets
+class(chinese_colors) <- c("chinese_colors", class(chinese_colors))
+`$.chinese_colors` <- function(x, name) {{
+  if (name %in% names(x)) {{
+    return(x[[name]])
+  }}
+  color_sets <- attr(x, "color_sets", exact = TRUE)
+  if (!is.null(color_sets) && name %in% names(color_sets)) {{
+    return(color_sets[[name]])
+  }}
+  return(NULL)
+}}
+
+usethis::use_data(chinese_colors, compress="xz", overwrite=TRUE)
+cat("RDA file saved to {rda_abs_path}\\n")
+"""
+
+    temp_r_script = script_dir / "temp_save_rda.R"
+    with open(temp_r_script, "w", encoding="utf-8") as f:
+        f.write(r_script)
+
+    try:
+        import subprocess
+
+        result = subprocess.run(
+            ["Rscript", str(temp_r_script)], capture_output=True, text=True, check=True
+        )
+        print(result.stdout)
+        if result.stderr:
+            print("R messages:")
+            print(result.stderr)
+        print("RDA file saved successfully!")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"Warning: Failed to save RDA file: {e}")
+        return False
+    finally:
+        if temp_r_script.exists():
+            temp_r_script.unlink()
+
+
+def _category_order(categories):
+    """``categories`` in ``CATEGORY_ORDER``, unknown ones last by name."""
+    remaining_cats = set(categories) - set(CATEGORY_ORDER)
+    sort_cats = [cat for cat in CATEGORY_ORDER if cat in categories]
+    return sort_cats + sorted(remaining_cats)
+
+
+def iter_sorted_categories(spill, jobs=1, cache=None, metric=DEFAULT_METRIC):
+    """Yield the colors of a spill category by category, dropping repeated hex codes.
+
+    Categories follow ``CATEGORY_ORDER`` (unknown ones last, by name) and
+    each is ordered with ``sort_colors_by_lab_improved``. A hex code that
+    appears twice in the same category keeps its first occurrence. Only
+    ``jobs`` categories are loaded from the spill, sorted and held at a
+    time, and each sorted category is cached on its own.
+
+    Args:
+        spill: CategorySpill with the colors, e.g. from
+            ``spill_workbook_colors``
+        jobs: Worker processes for sorting categories in parallel
+        cache: Optional BuildCache holding sorted categories
+        metric: Name of the ΔE metric used in the transition cost
+
+    Yields:
+        ColorRecord
+    """
     print("\nSorting colors by category...")
-    category_order = [
-        "blue",
-        "cyan",
-        "green",
-        "yellow",
-        "orange",
-        "red",
-        "purple",
-        "gray_brown",
-    ]
-
-    category_rows = {}
-    for color in colors_list:
-        cat = color["category"]
-        if cat not in category_rows:
-            category_rows[cat] = []
-        category_rows[cat].append(color)
-
-    sorted_colors = []
-    for cat in category_order:
-        if cat in category_rows:
-            cat_rows = category_rows[cat]
-            print(f"  Sorting {len(cat_rows)} colors in category '{cat}'...")
-            cat_rows_sorted = sort_colors_by_lab_improved(cat_rows, cat)
-            sorted_colors.extend(cat_rows_sorted)
-
-    remaining_cats = set(category_rows.keys()) - set(category_order)
-    for cat in sorted(remaining_cats):
-        cat_rows = category_rows[cat]
-        print(f"  Sorting {len(cat_rows)} colors in category '{cat}'...")
-        cat_rows_sorted = sort_colors_by_lab_improved(cat_rows, cat)
-        sorted_colors.extend(cat_rows_sorted)
+    sort_cats = _category_order(spill.categories())
+
+    def sort_missing(missing):
+        cats = [sort_cats[i] for i in missing]
+        for cat in cats:
+            print(f"  Sorting {spill.counts[cat]} colors in category '{cat}'...")
+        return run_jobs(
+            partial(sort_colors_by_lab_improved, metric=metric),
+            [spill.load(cat) for cat in cats],
+            cats,
+            jobs=jobs,
+        )
 
-    print("\nRemoving duplicate colors (same hex in same category)...")
-    seen_hex_category = set()
-    deduplicated_colors = []
-    duplicates_removed = []
+    if cache is None:
+        sorted_by_cat = (
+            cat_rows
+            for start in range(0, len(sort_cats), jobs)
+            for cat_rows in sort_missing(
+                range(start, min(start + jobs, len(sort_cats)))
+            )
+        )
+    else:
+        sorted_by_cat = cache.iter_cached_batch(
+            "sorted",
+            [cache.key(cat, spill.digest(cat), metric) for cat in sort_cats],
+            sort_missing,
+            batch_size=jobs,
+        )
 
-    for color in sorted_colors:
-        hex_cat_key = (color["hex"], color["category"])
-        if hex_cat_key not in seen_hex_category:
-            seen_hex_category.add(hex_cat_key)
-            deduplicated_colors.append(color)
-        else:
-            duplicates_removed.append(color)
+    duplicates_removed = []
+    for cat_rows in sorted_by_cat:
+        seen_hex = set()
+        for color in cat_rows:
+            if color.rgb in seen_hex:
+                duplicates_removed.append(color)
+            else:
+                seen_hex.add(color.rgb)
+                yield color
 
+    print("\nRemoving duplicate colors (same hex in same category)...")
+    note(
+        "duplicates_removed",
+        [
+            {"name_ch": dup.name_ch, "hex": dup.hex, "category": dup.category}
+            for dup in duplicates_removed
+        ],
+    )
     if duplicates_removed:
         print(f"  Removed {len(duplicates_removed)} duplicate colors:")
         for dup in duplicates_removed:
-            print(f"    - {dup['name_ch']} ({dup['hex']}) in {dup['category']}")
+            print(f"    - {dup.name_ch} ({dup.hex}) in {dup.category}")
     else:
         print("  No duplicates found.")
 
-    sorted_colors = deduplicated_colors
 
+def sort_categories(colors, jobs=1, cache=None, metric=DEFAULT_METRIC):
+    """List form of ``iter_sorted_categories`` for colors already in memory.
+
+    Args:
+        colors: ColorRecord iterable from ``clean_rows`` or ``iter_colors``
+
+    Returns:
+        List of ColorRecord
+    """
+    spill = CategorySpill()
+    spill.add(colors)
+    return list(iter_sorted_categories(spill, jobs=jobs, cache=cache, metric=metric))
+
+
+def _batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_selected_colors(
+    colors,
+    filter_colors=False,
+    stats=None,
+    chunk_rows=DEFAULT_CHUNK_ROWS,
+    metric=DEFAULT_METRIC,
+):
+    """Yield the first color of every hex code, optionally filtered.
+
+    With ``filter_colors`` the colors must also have 10 <= L <= 90 and
+    chroma >= 5, and any color within ΔE 5 of an earlier kept color is
+    dropped. LAB values are computed per batch of ``chunk_rows`` colors
+    and only the kept colors' coordinates are retained.
+
+    Args:
+        colors: Ordered ColorRecord iterable, e.g. from
+            ``iter_sorted_categories``
+        filter_colors: Apply the quality and distance filters
+        stats: Optional dict receiving the ``input``, ``unique``,
+            ``quality`` and ``kept`` counts
+        metric: Name of the ΔE metric for the near-duplicate check
+
+    Yields:
+        ColorRecord, in input order
+    """
+    stats = {} if stats is None else stats
+    stats.update(input=0, unique=0, quality=0, kept=0)
+    seen_rgb = set()
+
+    def first_of_each_rgb():
+        for color in colors:
+            stats["input"] += 1
+            if color.rgb not in seen_rgb:
+                seen_rgb.add(color.rgb)
+                yield color
+
+    unique_colors = first_of_each_rgb()
+
+    min_distance = 5.0
+    suppressor = StreamingSuppressor(min_distance, metric=metric)
+    for batch in _batched(unique_colors, chunk_rows):
+        stats["unique"] += len(batch)
+        if not filter_colors:
+            stats["kept"] += len(batch)
+            yield from batch
+            continue
+
+        lab = lab_array(batch)
+        L, a, b = lab.T
+        chroma = np.sqrt(a * a + b * b)
+        quality = np.flatnonzero((10 <= L) & (L <= 90) & (chroma >= 5))
+        stats["quality"] += len(quality)
+
+        keep = suppressor.add(lab[quality])
+        stats["kept"] += int(keep.sum())
+        for i in quality[keep].tolist():
+            yield batch[i]
+
+
+def select_colors(colors, filter_colors=False, metric=DEFAULT_METRIC):
+    """Keep one color per hex code and number the result from 1.
+
+    Args:
+        colors: Ordered ColorRecord iterable, e.g. from
+            ``iter_sorted_categories``
+        filter_colors: Apply the quality and distance filters of
+            ``iter_selected_colors``
+        metric: Name of the ΔE metric for the near-duplicate check
+
+    Returns:
+        List of ColorRecord with ``num`` set
+    """
     if filter_colors:
         print(f"\nOptimizing colors based on LAB color space distance...")
-        print(f"  Initial colors: {len(sorted_colors)}")
     else:
         print(f"\nSkipping color filtering (filter_colors=False)...")
-        print(f"  Total unique colors: {len(sorted_colors)}")
 
+    stats = {}
+    selected = []
+    for idx, color in enumerate(
+        iter_selected_colors(
+            colors, filter_colors=filter_colors, stats=stats, metric=metric
+        ),
+        start=1,
+    ):
+        color.num = idx
+        selected.append(color)
+
+    note("selection", {"filter_colors": filter_colors, **stats})
     if filter_colors:
-        seen_hex = set()
-        unique_colors = []
-        for color in sorted_colors:
-            if color["hex"] not in seen_hex:
-                seen_hex.add(color["hex"])
-                unique_colors.append(color)
-
-        print(f"  Unique colors: {len(unique_colors)}")
-
-        color_lab_data = []
-        for color in unique_colors:
-            hex_color = color["hex"]
-            rgb = hex_to_rgb(hex_color)
-            lab = rgb_to_lab(rgb)
-            color_lab_data.append(
-                {
-                    "color": color,
-                    "hex": hex_color,
-                    "lab": lab,
-                    "L": lab[0],
-                    "a": lab[1],
-                    "b": lab[2],
-                }
-            )
+        print(f"  Initial colors: {stats['input']}")
+        print(f"  Unique colors: {stats['unique']}")
+        print(f"  After quality filter: {stats['quality']} colors")
+        print(f"  After distance optimization: {stats['kept']} colors")
+        print(f"  Removed {stats['quality'] - stats['kept']} similar colors")
+    else:
+        print(f"  Total unique colors: {stats['unique']}")
+        print(f"  Kept all {len(selected)} unique colors (no filtering applied)")
+    return selected
+
+
+def _hue_name(hue):
+    if 0 <= hue < 30 or hue >= 330:
+        return "red"
+    if 30 <= hue < 60:
+        return "orange"
+    if 60 <= hue < 90:
+        return "yellow"
+    if 90 <= hue < 150:
+        return "green"
+    if 150 <= hue < 210:
+        return "cyan"
+    if 210 <= hue < 270:
+        return "blue"
+    if 270 <= hue < 330:
+        return "purple"
+    return ""
+
+
+def _set_hue_stats(size, selected_colors):
+    """Hue spread of one generated set.
+
+    Returns:
+        Tuple of (stats, color_hue_info): a dict with the color count and,
+        for more than one color, the hue range, span and min/max/avg
+        spacing; and per-color hue, saturation and value, ordered by hue
+    """
+    color_hue_info = []
+    selected_hsv = convert_hex_colors(selected_colors)["hsv"].tolist()
+    for hex_color, hsv in zip(selected_colors, selected_hsv):
+        color_hue_info.append(
+            {
+                "hex": hex_color,
+                "hue": hsv[0],
+                "saturation": hsv[1],
+                "value": hsv[2],
+            }
+        )
 
-        filtered_colors = []
-        for item in color_lab_data:
-            L, a, b = item["lab"]
-            chroma = calculate_chroma(item["lab"])
-            if 10 <= L <= 90 and chroma >= 5:
-                filtered_colors.append(item)
+    color_hue_info.sort(key=lambda x: x["hue"])
+    hues = [ci["hue"] for ci in color_hue_info]
 
-        print(f"  After quality filter: {len(filtered_colors)} colors")
+    stats = {"colors": len(selected_colors), "target_spacing": 360.0 / size}
+    if len(hues) > 1:
+        min_spacing = 360.0
+        max_spacing = 0.0
+        spacings = []
 
-        def delta_e_76(lab1, lab2):
-            """Calculate Delta E (CIE76) color difference."""
-            L1, a1, b1 = lab1
-            L2, a2, b2 = lab2
-            return math.sqrt((L2 - L1) ** 2 + (a2 - a1) ** 2 + (b2 - b1) ** 2)
+        for i in range(len(hues)):
+            next_i = (i + 1) % len(hues)
+            spacing = (hues[next_i] - hues[i]) % 360
+            spacings.append(spacing)
+            min_spacing = min(min_spacing, spacing)
+            max_spacing = max(max_spacing, spacing)
 
-        min_distance = 5.0
+        avg_spacing = sum(spacings) / len(spacings)
+
+        max_gap = max(spacings)
+
+        if max_gap > 180:
+            hue_range = 360.0 - max_gap
+        else:
+            hue_range = max(hues) - min(hues)
+
+        stats.update(
+            hue_min=min(hues),
+            hue_max=max(hues),
+            hue_span=hue_range,
+            spacing_min=min_spacing,
+            spacing_max=max_spacing,
+            spacing_avg=avg_spacing,
+        )
+    return stats, color_hue_info
 
-        optimized_colors = []
-        for i, item in enumerate(filtered_colors):
-            if i == 0:
-                optimized_colors.append(item)
-                continue
 
-            too_similar = False
-            for selected in optimized_colors:
-                distance = delta_e_76(item["lab"], selected["lab"])
-                if distance < min_distance:
-                    too_similar = True
-                    break
+def _min_delta_e(hex_colors, metric=DEFAULT_METRIC):
+    """Smallest ΔE between any two of ``hex_colors`` (None for fewer than two)."""
+    if len(set(hex_colors)) < 2:
+        return None
+    distances = PaletteCandidates(hex_colors, metric=get_metric(metric)).distances
+    return float(distances[np.triu_indices(len(distances), k=1)].min())
 
-            if not too_similar:
-                optimized_colors.append(item)
 
-        print(f"  After distance optimization: {len(optimized_colors)} colors")
+def _print_set_summary(size, selected_colors):
+    print(
+        f"  ChineseSet{size}: {len(selected_colors)} colors (interpolated from {len(BASE_CHINESE_COLORS)} base colors)"
+    )
+
+    stats, color_hue_info = _set_hue_stats(size, selected_colors)
+
+    print(f"    Generated ChineseSet{size}: {len(selected_colors)} colors")
+
+    if len(color_hue_info) > 1:
+        print(f"    Hue distribution:")
+        print(
+            f"      Range: {stats['hue_min']:.1f}° - {stats['hue_max']:.1f}° (span: {stats['hue_span']:.1f}°)"
+        )
         print(
-            f"  Removed {len(filtered_colors) - len(optimized_colors)} similar colors"
+            f"      Spacing: min={stats['spacing_min']:.1f}°, max={stats['spacing_max']:.1f}°, avg={stats['spacing_avg']:.1f}°"
         )
+        print(f"      Target spacing: {360.0 / size:.1f}°")
 
-        sorted_colors = [item["color"] for item in optimized_colors]
+        print(f"    Selected colors (ordered by hue):")
+        for ci in color_hue_info:
+            print(
+                f"      {ci['hex']}: hue={ci['hue']:.1f}° ({_hue_name(ci['hue'])}), S={ci['saturation']:.2f}, V={ci['value']:.2f}"
+            )
     else:
-        seen_hex = set()
-        unique_colors = []
-        for color in sorted_colors:
-            if color["hex"] not in seen_hex:
-                seen_hex.add(color["hex"])
-                unique_colors.append(color)
-        sorted_colors = unique_colors
-        print(f"  Kept all {len(sorted_colors)} unique colors (no filtering applied)")
+        print(f"    Only 1 color selected")
+    return stats
+
+
+def build_sets(
+    main_colors,
+    jobs=1,
+    cache=None,
+    set_sizes=SET_SIZES,
+    metric=DEFAULT_METRIC,
+    verbose=True,
+    engine="hue",
+    cvd=None,
+):
+    """Build the named color sets from the final color list.
 
-    for idx, color in enumerate(sorted_colors, start=1):
-        color["num"] = idx
+    ``ChineseSet8`` and ``Chinese`` are the fixed base and default
+    palettes; every size in ``set_sizes`` adds a ``ChineseSet<size>``
+    interpolated from the base colors.
 
-    print(f"\nFinal color count: {len(sorted_colors)}")
+    Args:
+        main_colors: Hex codes of the final colors, in output order
+        jobs: Worker processes for generating the sets in parallel
+        cache: Optional BuildCache holding generated sets
+        set_sizes: Sizes of the interpolated sets
+        metric: Name of the ΔE metric used for interpolation
+        verbose: Print the hue distribution and every color of each set;
+            the statistics are recorded in the run report either way
+        engine: Palette engine, "hue" or "dispersion"; see
+            ``PaletteGenerator.palette``
+        cvd: Optional deficiency names the interpolated sets must also be
+            distinguishable for; see ``PaletteGenerator``
 
+    Returns:
+        Dict of set name to list of hex codes
+    """
     print(f"\nGenerating Chinese color sets...")
 
     color_sets = {}
@@ -1194,234 +1702,97 @@ def main(delete_csv=False, filter_colors=False):
 
     print(f"    Base colors:")
     for hex_color in BASE_CHINESE_COLORS:
-        rgb = hex_to_rgb(hex_color)
-        hsv = rgb_to_hsv(rgb)
-        hue_name = ""
-        if 0 <= hsv[0] < 30 or hsv[0] >= 330:
-            hue_name = "red"
-        elif 30 <= hsv[0] < 60:
-            hue_name = "orange"
-        elif 60 <= hsv[0] < 90:
-            hue_name = "yellow"
-        elif 90 <= hsv[0] < 150:
-            hue_name = "green"
-        elif 150 <= hsv[0] < 210:
-            hue_name = "cyan"
-        elif 210 <= hsv[0] < 270:
-            hue_name = "blue"
-        elif 270 <= hsv[0] < 330:
-            hue_name = "purple"
+        hsv = hex_to_hsv(hex_color)
         print(
-            f"      {hex_color}: hue={hsv[0]:.1f}° ({hue_name}), S={hsv[1]:.2f}, V={hsv[2]:.2f}"
+            f"      {hex_color}: hue={hsv[0]:.1f}° ({_hue_name(hsv[0])}), S={hsv[1]:.2f}, V={hsv[2]:.2f}"
         )
 
-    main_color_list = [color["hex"] for color in sorted_colors]
-    seen = set()
-    unique_main_colors = []
-    for hex_color in main_color_list:
-        if hex_color not in seen:
-            seen.add(hex_color)
-            unique_main_colors.append(hex_color)
-
+    unique_main_colors = list(dict.fromkeys(main_colors))
     print(f"  Main color list: {len(unique_main_colors)} colors")
 
-    set_sizes = [16, 32, 64, 128]
-    for size in set_sizes:
-        selected_colors = interpolate_colors_from_set8(
-            BASE_CHINESE_COLORS, unique_main_colors, size
-        )
-        color_sets[f"ChineseSet{size}"] = selected_colors
-        print(
-            f"  ChineseSet{size}: {len(selected_colors)} colors (interpolated from {len(BASE_CHINESE_COLORS)} base colors)"
-        )
-
-        color_hue_info = []
-        for hex_color in selected_colors:
-            rgb = hex_to_rgb(hex_color)
-            hsv = rgb_to_hsv(rgb)
-            color_hue_info.append(
-                {
-                    "hex": hex_color,
-                    "hue": hsv[0],
-                    "saturation": hsv[1],
-                    "value": hsv[2],
-                }
-            )
-
-        color_hue_info.sort(key=lambda x: x["hue"])
-        hues = [ci["hue"] for ci in color_hue_info]
+    set_sizes = list(set_sizes)
 
-        print(
-            f"    Generated ChineseSet{size}: {len(color_sets[f'ChineseSet{size}'])} colors"
+    def generate_missing(missing):
+        return run_jobs(
+            partial(generate_palette, engine=engine, cvd=cvd),
+            [set_sizes[i] for i in missing],
+            [unique_main_colors] * len(missing),
+            [BASE_CHINESE_COLORS] * len(missing),
+            [metric] * len(missing),
+            jobs=jobs,
         )
 
-        if len(hues) > 1:
-            min_spacing = 360.0
-            max_spacing = 0.0
-            spacings = []
-
-            for i in range(len(hues)):
-                next_i = (i + 1) % len(hues)
-                spacing = (hues[next_i] - hues[i]) % 360
-                spacings.append(spacing)
-                min_spacing = min(min_spacing, spacing)
-                max_spacing = max(max_spacing, spacing)
+    if cache is None:
+        generated_sets = generate_missing(range(len(set_sizes)))
+    else:
+        generated_sets = cache.cached_batch(
+            "sets",
+            [
+                cache.key(unique_main_colors, size, metric, engine, cvd)
+                for size in set_sizes
+            ],
+            generate_missing,
+        )
+    set_stats = {}
+    for size, selected_colors in zip(set_sizes, generated_sets):
+        color_sets[f"ChineseSet{size}"] = selected_colors
+        if verbose:
+            stats = _print_set_summary(size, selected_colors)
+        else:
+            stats = _set_hue_stats(size, selected_colors)[0]
+        stats["min_delta_e"] = _min_delta_e(selected_colors, metric)
+        if verbose:
+            print(f"    Min pairwise ΔE ({metric}): {stats['min_delta_e']:.2f}")
+        set_stats[f"ChineseSet{size}"] = stats
+    note("color_sets", set_stats)
 
-            avg_spacing = sum(spacings) / len(spacings)
+    return color_sets
 
-            max_gap = max(spacings)
 
-            if max_gap > 180:
-                hue_range = 360.0 - max_gap
-            else:
-                hue_range = max(hues) - min(hues)
+def check_pinyin(colors, lexicon=None):
+    """Report names whose category character got an unexpected reading.
 
-            print(f"    Hue distribution:")
-            print(
-                f"      Range: {min(hues):.1f}° - {max(hues):.1f}° (span: {hue_range:.1f}°)"
-            )
-            print(
-                f"      Spacing: min={min_spacing:.1f}°, max={max_spacing:.1f}°, avg={avg_spacing:.1f}°"
-            )
-            print(f"      Target spacing: {360.0 / size:.1f}°")
-
-            print(f"    Selected colors (ordered by hue):")
-            for ci in color_hue_info:
-                hue_name = ""
-                if 0 <= ci["hue"] < 30 or ci["hue"] >= 330:
-                    hue_name = "red"
-                elif 30 <= ci["hue"] < 60:
-                    hue_name = "orange"
-                elif 60 <= ci["hue"] < 90:
-                    hue_name = "yellow"
-                elif 90 <= ci["hue"] < 150:
-                    hue_name = "green"
-                elif 150 <= ci["hue"] < 210:
-                    hue_name = "cyan"
-                elif 210 <= ci["hue"] < 270:
-                    hue_name = "blue"
-                elif 270 <= ci["hue"] < 330:
-                    hue_name = "purple"
-
-                print(
-                    f"      {ci['hex']}: hue={ci['hue']:.1f}° ({hue_name}), S={ci['saturation']:.2f}, V={ci['value']:.2f}"
-                )
-        else:
-            print(f"    Only 1 color selected")
+    Returns:
+        Number of flagged names
+    """
+    lexicon = _default_lexicon() if lexicon is None else lexicon
 
     print("\nSample colors (verifying pinyin):")
-    for color in sorted_colors[:10]:
-        print(f"  {color['name_ch']} -> {color['name']}")
+    for color in colors[:10]:
+        print(f"  {color.name_ch} -> {color.name}")
 
     print(
         "\nChecking for potential pinyin issues by category (final optimized colors)..."
     )
 
     colors_by_category = {}
-    for color in sorted_colors:
-        cat = color["category"]
+    for color in colors:
+        cat = color.category
         if cat not in colors_by_category:
             colors_by_category[cat] = []
         colors_by_category[cat].append(color)
 
-    category_checks = {
-        "blue": {"char": "蓝", "expected": "lan", "wrong": "la"},
-        "red": {"char": "红", "expected": "hong"},
-        "green": {"char": "绿", "expected": ["lv", "lu"]},
-        "yellow": {"char": "黄", "expected": "huang"},
-        "orange": {"char": "橙", "expected": "cheng"},
-        "purple": {"char": "紫", "expected": "zi"},
-        "cyan": {"char": "青", "expected": "qing"},
-        "gray_brown": {"char": ["灰", "褐"], "expected": ["hui", "he"]},
-    }
-
-    issues_found = False
+    total_issues = 0
     total_checked = 0
+    issues_by_category = {}
 
-    for cat in [
-        "blue",
-        "cyan",
-        "green",
-        "yellow",
-        "orange",
-        "red",
-        "purple",
-        "gray_brown",
-    ]:
-        if cat not in colors_by_category or cat not in category_checks:
+    for cat in CATEGORY_ORDER:
+        if cat not in colors_by_category or cat not in PINYIN_CHECK_CHARS:
             continue
 
         cat_colors = colors_by_category[cat]
-        check = category_checks[cat]
-        issues = []
-        checked_count = 0
-
-        for c in cat_colors:
-            name_ch = c["name_ch"]
-            name_pinyin = c["name"]
-
-            if cat == "blue":
-                if "蓝" in name_ch:
-                    checked_count += 1
-                    if "lan" not in name_pinyin and "la" in name_pinyin:
-                        issues.append(c)
-            elif cat == "red":
-                if "红" in name_ch:
-                    checked_count += 1
-                    if "hong" not in name_pinyin:
-                        issues.append(c)
-            elif cat == "green":
-                if "绿" in name_ch:
-                    checked_count += 1
-                    expected_list = (
-                        check["expected"]
-                        if isinstance(check["expected"], list)
-                        else [check["expected"]]
-                    )
-                    if not any(exp in name_pinyin for exp in expected_list):
-                        issues.append(c)
-            elif cat == "yellow":
-                if "黄" in name_ch:
-                    checked_count += 1
-                    if "huang" not in name_pinyin:
-                        issues.append(c)
-            elif cat == "orange":
-                if "橙" in name_ch:
-                    checked_count += 1
-                    if "cheng" not in name_pinyin:
-                        issues.append(c)
-            elif cat == "purple":
-                if "紫" in name_ch:
-                    checked_count += 1
-                    if "zi" not in name_pinyin:
-                        issues.append(c)
-            elif cat == "cyan":
-                if "青" in name_ch:
-                    checked_count += 1
-                    if "qing" not in name_pinyin:
-                        issues.append(c)
-            elif cat == "gray_brown":
-                chars = (
-                    check["char"]
-                    if isinstance(check["char"], list)
-                    else [check["char"]]
-                )
-                expected_list = (
-                    check["expected"]
-                    if isinstance(check["expected"], list)
-                    else [check["expected"]]
-                )
-                for char, exp in zip(chars, expected_list):
-                    if char in name_ch:
-                        checked_count += 1
-                        if exp not in name_pinyin:
-                            issues.append(c)
-                            break
+        chars = PINYIN_CHECK_CHARS[cat]
+        checked = [c for c in cat_colors if any(ch in c.name_ch for ch in chars)]
+        checked_count = len(checked)
+        issues = [
+            c for c in checked if lexicon.misread(c.name_ch, chars, CATEGORY_READINGS)
+        ]
 
         total_checked += checked_count
+        total_issues += len(issues)
 
         if issues:
-            issues_found = True
+            issues_by_category[cat] = [f"{c.name_ch}->{c.name}" for c in issues]
             print(
                 f"\n{cat.upper()} ({len(cat_colors)} colors, checked {checked_count}) - Found {len(issues)} issues:"
             )
@@ -1429,9 +1800,7 @@ def main(delete_csv=False, filter_colors=False):
             display_count = min(5, len(issues))
             for i in range(0, display_count, 3):
                 row_issues = issues[i : i + 3]
-                row_str = " | ".join(
-                    [f"{c['name_ch']}->{c['name']}" for c in row_issues]
-                )
+                row_str = " | ".join([f"{c.name_ch}->{c.name}" for c in row_issues])
                 print(f"  {row_str}")
             if len(issues) > 5:
                 print(f"  ... and {len(issues) - 5} more")
@@ -1441,85 +1810,311 @@ def main(delete_csv=False, filter_colors=False):
             )
 
     print(f"\nTotal: Checked {total_checked} color names across all categories")
-    if not issues_found:
+    if not total_issues:
         print("✓ No pinyin issues found in any category!")
+    note("pinyin_issues", issues_by_category)
+    return total_issues
+
+
+def export(
+    colors,
+    color_sets,
+    csv_path,
+    rda_path,
+    rda_writer="native",
+    delete_csv=False,
+    cache=None,
+):
+    """Write the colors to CSV and the package data file.
+
+    Args:
+        colors: Final ColorRecord list
+        color_sets: Dict of set name to hex codes
+        csv_path: Output CSV path
+        rda_path: Output ``.rda`` path; its directory is created if needed
+        rda_writer: "native" to write the file from Python, "rscript" to run
+            usethis::use_data through Rscript
+        delete_csv: Delete the CSV once the RDA file is saved
+        cache: Optional BuildCache; skips the RDA export when neither the
+            inputs nor the existing file changed since the last export
+
+    Returns:
+        True if the RDA file was saved or already up to date
+    """
+    csv_path = Path(csv_path)
+    rda_path = Path(rda_path)
 
     print(f"\nSaving CSV to {csv_path}...")
-    fieldnames = ["num", "name", "name_ch", "rgb", "hex", "category", "category_ch"]
     with open(csv_path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
         writer.writeheader()
-        for color in sorted_colors:
-            writer.writerow(color)
+        for color in colors:
+            writer.writerow(color.as_row())
 
     print(f"CSV file saved: {csv_path}")
-    print(f"Total optimized colors: {len(sorted_colors)}")
+    print(f"Total optimized colors: {len(colors)}")
 
     print(f"\nSaving RDA file to {rda_path}...")
-    data_dir.mkdir(exist_ok=True)
+    rda_path.parent.mkdir(exist_ok=True)
+
+    export_key = None
+    hit, rda_digest = False, None
+    if cache is not None:
+        export_key = cache.key(file_digest(csv_path), color_sets, rda_writer)
+        hit, rda_digest = cache.load("export", export_key)
+    if hit and rda_path.exists() and file_digest(rda_path) == rda_digest:
+        print(f"  RDA file is up to date ({export_key[:12]}), skipping export")
+        saved = True
+    elif rda_writer == "rscript":
+        saved = save_rda_rscript(csv_path.parent, csv_path, rda_path, color_sets)
+    else:
+        rda_object = build_rda_object(colors, CSV_FIELDS, color_sets)
+        write_rda(rda_path, {"chinese_colors": rda_object}, compress="xz")
+        print(f"RDA file saved to {rda_path.resolve()}")
+        saved = True
+
+    if saved:
+        if export_key is not None:
+            cache.store("export", export_key, file_digest(rda_path))
+        if delete_csv and csv_path.exists():
+            try:
+                csv_path.unlink()
+                print(f"CSV file deleted: {csv_path}")
+            except Exception as e:
+                print(f"Warning: Failed to delete CSV file: {e}")
+    return saved
+
+
+def main(
+    delete_csv=False,
+    filter_colors=False,
+    jobs=1,
+    use_cache=True,
+    stream_excel=False,
+    rda_writer="native",
+    metric=DEFAULT_METRIC,
+    quiet=False,
+    report_path=None,
+    palette_engine="hue",
+    cvd_threshold=DEFAULT_CVD_THRESHOLD,
+    cvd_strict=False,
+    cvd_safe=False,
+    pinyin_overrides=None,
+):
+    """
+    Main function to process Chinese colors.
 
-    csv_abs_path = csv_path.resolve()
-    rda_abs_path = rda_path.resolve()
+    Args:
+        delete_csv (bool): If True, delete CSV file after successfully saving RDA file.
+                           Default is False.
+        filter_colors (bool): If True, apply color quality filtering and distance optimization.
+                              If False, keep all unique colors without filtering.
+                              Default is False.
+        jobs (int): Number of worker processes used to sort categories and
+                    generate the color sets in parallel. Default is 1 (serial).
+        use_cache (bool): If True, reuse stage results stored under colors/.cache/
+                          when their inputs are unchanged. Default is True.
+        stream_excel (bool): If True, read the workbook with openpyxl's streaming
+                             read-only reader instead of pandas. Default is False.
+        rda_writer (str): "native" writes data/chinese_colors.rda directly from
+                          Python; "rscript" runs usethis::use_data through
+                          Rscript. Default is "native".
+        metric (str): Color-difference metric used for sorting, near-duplicate
+                      removal and color set interpolation: "cie76", "cie94",
+                      "ciede2000" or "cam16ucs". Default is "cie76".
+        quiet (bool): If True, print only a one-line summary; the details go
+                      to the run report. Default is False.
+        report_path (Path): Where to write the JSON run report with per-stage
+                            timings, counters and diagnostics. Default is
+                            colors/build_report.json.
+        palette_engine (str): How the ChineseSet<n> palettes are chosen: "hue"
+                              fills evenly spaced hue slots, "dispersion"
+                              maximizes the smallest ΔE between any two
+                              colors. Default is "hue".
+        cvd_threshold (float): Smallest ΔE between two colors of a set under
+                               simulated protan, deutan or tritan vision
+                               before the set is flagged. Default is 5.0.
+        cvd_strict (bool): If True, raise PaletteAuditError instead of only
+                           flagging a set that falls below cvd_threshold.
+                           Default is False.
+        cvd_safe (bool): If True, generate the ChineseSet<n> palettes with
+                         the simulated distances as an extra constraint.
+                         Needs palette_engine="dispersion": the hue engine
+                         fills slots it cannot satisfy by hue alone, so it
+                         cannot guarantee a minimum ΔE. Default is False.
+        pinyin_overrides (Path): JSON file of phrase -> pinyin reading that
+                                 corrects names pypinyin reads wrongly, on
+                                 top of PINYIN_OVERRIDES. Default is None.
+    """
+    if cvd_safe and palette_engine != "dispersion":
+        raise ValueError(
+            "cvd_safe needs the dispersion palette engine; the hue engine "
+            "cannot guarantee a minimum ΔE"
+        )
 
-    r_script = f'''chinese_colors <- read.csv("{csv_abs_path}", encoding="UTF-8", stringsAsFactors=FALSE)
-chinese_color_sets <- list(
-'''
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
 
-    for set_name, colors_list in color_sets.items():
-        colors_str = ", ".join([f'"{c}"' for c in colors_list])
-        r_script += f"  {set_name} = c({colors_str}),\n"
+    excel_path = script_dir / "ChineseColors5.0.xlsx"
+    csv_path = script_dir / "chinese_colors.csv"
+    search_path = script_dir / "chinese_colors_search.json"
+    data_dir = project_root / "data"
+    rda_path = data_dir / "chinese_colors.rda"
 
-    r_script = r_script.rstrip(",\n") + "\n)\n"
-    r_script += f"""
-for (set_name in names(chinese_color_sets)) {{
-  attr(chinese_color_sets[[set_name]], "type") <- "discrete"
-}}
-attr(chinese_colors, "color_sets") <- chinese_color_sets
-class(chinese_colors) <- c("chinese_colors", class(chinese_colors))
-`$.chinese_colors` <- function(x, name) {{
-  if (name %in% names(x)) {{
-    return(x[[name]])
-  }}
-  color_sets <- attr(x, "color_sets", exact = TRUE)
-  if (!is.null(color_sets) && name %in% names(color_sets)) {{
-    return(color_sets[[name]])
-  }}
-  return(NULL)
-}}
+    if not excel_path.exists():
+        raise WorkbookError(f"Excel file not found: {excel_path}")
+
+    if report_path is None:
+        report_path = script_dir / "build_report.json"
+
+    report = RunReport(
+        settings={
+            "filter_colors": filter_colors,
+            "jobs": jobs,
+            "use_cache": use_cache,
+            "stream_excel": stream_excel,
+            "rda_writer": rda_writer,
+            "metric": metric,
+            "palette_engine": palette_engine,
+            "cvd_threshold": cvd_threshold,
+            "cvd_strict": cvd_strict,
+            "cvd_safe": cvd_safe,
+            "pinyin_overrides": (
+                None if pinyin_overrides is None else str(pinyin_overrides)
+            ),
+        }
+    )
+    cache = BuildCache(
+        script_dir / ".cache", enabled=use_cache, salt=code_digest(script_dir)
+    )
+    columns_dir = script_dir / ".cache" / "workbook" if use_cache else None
+    lexicon = PinyinLexicon(
+        script_dir / ".cache" / "pinyin_lexicon.json" if use_cache else None,
+        overrides=(
+            None if pinyin_overrides is None else load_overrides(pinyin_overrides)
+        ),
+    )
 
-usethis::use_data(chinese_colors, compress="xz", overwrite=TRUE)
-cat("RDA file saved to {rda_abs_path}\\n")
-"""
+    def ingest(directory):
+        return spill_workbook_colors(
+            excel_path,
+            directory,
+            columns_dir=columns_dir,
+            streaming=stream_excel,
+            lexicon=lexicon,
+        )
 
-    temp_r_script = script_dir / "temp_save_rda.R"
-    with open(temp_r_script, "w", encoding="utf-8") as f:
-        f.write(r_script)
+    with contextlib.ExitStack() as stack:
+        if quiet:
+            devnull = stack.enter_context(open(os.devnull, "w"))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
 
-    try:
-        import subprocess
+        # Used for the per-category record files when the cache is off
+        scratch_dir = stack.enter_context(
+            tempfile.TemporaryDirectory(prefix="chinese_colors_")
+        )
+        with report.stage("rows"):
+            spill = cache.cached_dir(
+                "rows",
+                cache.key(
+                    file_digest(excel_path),
+                    LEXICON_FORMAT,
+                    lexicon.version,
+                    sorted(lexicon.overrides.items()),
+                ),
+                CategorySpill.open,
+                ingest,
+                scratch=scratch_dir,
+            )
+        short_names = spill.info["short_names"]
+        note("workbook_rows", {**spill.info["stats"], "short_names": len(short_names)})
 
-        result = subprocess.run(
-            ["Rscript", str(temp_r_script)], capture_output=True, text=True, check=True
+        print(f"Extracted {len(spill)} colors")
+
+        if short_names:
+            print(
+                f"\nWarning: Found {len(short_names)} single-character color names that were skipped:"
+            )
+            print("  These might be truncated names")
+            for item in short_names[:10]:
+                print(
+                    f"    Row {item['row']}: '{item['name']}' in sheet '{item['sheet']}' (RGB: {item['rgb']})"
+                )
+            if len(short_names) > 10:
+                print(f"    ... and {len(short_names) - 10} more")
+
+        print(f"\nColor difference metric: {metric}")
+        # Categories are sorted as selection consumes them, one stage
+        with report.stage("sort_select"):
+            sorted_colors = select_colors(
+                iter_sorted_categories(spill, jobs=jobs, cache=cache, metric=metric),
+                filter_colors=filter_colors,
+                metric=metric,
+            )
+
+        print(f"\nFinal color count: {len(sorted_colors)}")
+
+        with report.stage("sets"):
+            color_sets = build_sets(
+                [color.hex for color in sorted_colors],
+                jobs=jobs,
+                cache=cache,
+                metric=metric,
+                verbose=not quiet,
+                engine=palette_engine,
+                cvd=CVD_TYPES if cvd_safe else None,
+            )
+        with report.stage("cvd"):
+            audit = audit_palettes(color_sets, metric=metric, threshold=cvd_threshold)
+        note("cvd_audit", audit)
+        flagged = flagged_palettes(audit)
+        print(f"\nColor vision deficiency audit (min ΔE, threshold {cvd_threshold}):")
+        for name, views in audit.items():
+            values = ", ".join(
+                f"{view} {result['min_delta_e']:.2f}{'*' if result['flagged'] else ''}"
+                for view, result in views.items()
+            )
+            print(f"  {name}: {values}")
+        if flagged:
+            print(f"  * {len(flagged)} palette/deficiency pair(s) below the threshold")
+            if cvd_strict:
+                report.save(report_path)
+                names = ", ".join(f"{name} ({view})" for name, view in flagged)
+                raise PaletteAuditError(
+                    f"Palettes below ΔE {cvd_threshold} under simulated CVD: {names}"
+                )
+        with report.stage("pinyin"):
+            check_pinyin(sorted_colors, lexicon)
+        with report.stage("search"):
+            search_index = NameSearchIndex.from_colors(sorted_colors, lexicon)
+            search_index.save(search_path)
+        note(
+            "search_index",
+            {"keys": len(search_index.keys), "grams": len(search_index.grams)},
         )
-        print(result.stdout)
-        if result.stderr:
-            print("R messages:")
-            print(result.stderr)
-        print("RDA file saved successfully!")
+        print(f"\nName search index saved to {search_path}")
+        with report.stage("export"):
+            export(
+                sorted_colors,
+                color_sets,
+                csv_path,
+                rda_path,
+                rda_writer=rda_writer,
+                delete_csv=delete_csv,
+                cache=cache,
+            )
 
-        if delete_csv and csv_path.exists():
-            try:
-                csv_path.unlink()
-                print(f"CSV file deleted: {csv_path}")
-            except Exception as e:
-                print(f"Warning: Failed to delete CSV file: {e}")
-    except subprocess.CalledProcessError as e:
-        print(f"Warning: Failed to save RDA file: {e}")
-    finally:
-        if temp_r_script.exists():
-            temp_r_script.unlink()
+        note("cache", {"hits": cache.hits, "misses": cache.misses})
+        report.save(report_path)
+        print(f"\nRun report saved to {report_path}")
+        print("\nDone!")
 
-    print("\nDone!")
+    if quiet:
+        summary = report.to_dict()
+        print(
+            f"{len(sorted_colors)} colors, {len(color_sets)} color sets in "
+            f"{summary['wall_seconds']:.2f} s (report: {report_path})"
+        )
 
 
 if __name__ == "__main__":
@@ -1542,6 +2137,36 @@ Examples:
   
   # Combine options
   python3 colors/ChineseColors.py --no-filter-colors --delete-csv
+  
+  # Sort categories and generate color sets on 8 worker processes
+  python3 colors/ChineseColors.py --jobs 8
+  
+  # Rebuild every stage, ignoring colors/.cache/
+  python3 colors/ChineseColors.py --no-cache
+  
+  # Stream the workbook with openpyxl's read-only reader
+  python3 colors/ChineseColors.py --stream-excel
+  
+  # Save the RDA file through R (usethis::use_data) instead of natively
+  python3 colors/ChineseColors.py --rda-writer rscript
+  
+  # Measure color differences with CIEDE2000 instead of CIE76
+  python3 colors/ChineseColors.py --metric ciede2000
+  
+  # Choose the color sets by maximizing their smallest pairwise ΔE
+  python3 colors/ChineseColors.py --palette-engine dispersion
+  
+  # Generate the color sets so they stay apart for protan, deutan and tritan viewers
+  python3 colors/ChineseColors.py --palette-engine dispersion --cvd-safe
+  
+  # Fail when a color set has two colors closer than ΔE 8 under simulated CVD
+  python3 colors/ChineseColors.py --cvd-strict --cvd-threshold 8
+  
+  # Print a one-line summary and keep the details in a run report
+  python3 colors/ChineseColors.py --quiet --report build_report.json
+  
+  # Correct names pypinyin reads wrongly, e.g. {"茜红": "qian hong"}
+  python3 colors/ChineseColors.py --pinyin-overrides pinyin_overrides.json
         """,
     )
     parser.add_argument(
@@ -1563,8 +2188,112 @@ Examples:
         help="Disable color filtering (keep all unique colors without filtering)",
     )
 
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes for category sorting and color set generation (default: 1)",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Recompute every stage instead of reusing results from colors/.cache/",
+    )
+    parser.add_argument(
+        "--stream-excel",
+        action="store_true",
+        default=False,
+        help="Read the workbook with openpyxl's streaming read-only reader (default: False)",
+    )
+    parser.add_argument(
+        "--rda-writer",
+        choices=["native", "rscript"],
+        default="native",
+        help="How to save data/chinese_colors.rda: directly from Python or via Rscript (default: native)",
+    )
+    parser.add_argument(
+        "--metric",
+        choices=list(METRICS),
+        default=DEFAULT_METRIC,
+        help="Color difference metric for sorting, near-duplicate removal and set interpolation (default: cie76)",
+    )
+    parser.add_argument(
+        "--palette-engine",
+        choices=list(PALETTE_ENGINES),
+        default="hue",
+        help="How to choose the ChineseSet<n> palettes: evenly spaced hue slots or max-min ΔE dispersion (default: hue)",
+    )
+    parser.add_argument(
+        "--cvd-threshold",
+        type=float,
+        default=DEFAULT_CVD_THRESHOLD,
+        help=f"Smallest ΔE between two set colors under simulated CVD before the set is flagged (default: {DEFAULT_CVD_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--cvd-strict",
+        action="store_true",
+        default=False,
+        help="Fail instead of only warning when a color set is below --cvd-threshold (default: False)",
+    )
+    parser.add_argument(
+        "--cvd-safe",
+        action="store_true",
+        default=False,
+        help="Keep the ChineseSet<n> colors apart under simulated protan, deutan and tritan vision too; needs --palette-engine dispersion (default: False)",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        default=False,
+        help="Print only a one-line summary instead of the per-stage details (default: False)",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        default=None,
+        help="Write the JSON run report here (default: colors/build_report.json)",
+    )
+    parser.add_argument(
+        "--pinyin-overrides",
+        type=Path,
+        default=None,
+        help="JSON file of phrase -> pinyin reading for names pypinyin reads wrongly (default: None)",
+    )
+
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.cvd_safe and args.palette_engine != "dispersion":
+        parser.error(
+            "--cvd-safe needs --palette-engine dispersion; the hue engine cannot guarantee a minimum ΔE"
+        )
+    if args.pinyin_overrides is not None:
+        try:
+            PinyinLexicon(overrides=load_overrides(args.pinyin_overrides))
+        except (OSError, ValueError) as e:
+            parser.error(f"--pinyin-overrides: {e}")
 
     filter_colors = args.filter_colors if args.filter_colors is not None else False
 
-    main(delete_csv=args.delete_csv, filter_colors=filter_colors)
+    try:
+        main(
+            delete_csv=args.delete_csv,
+            filter_colors=filter_colors,
+            jobs=args.jobs,
+            use_cache=args.use_cache,
+            stream_excel=args.stream_excel,
+            rda_writer=args.rda_writer,
+            metric=args.metric,
+            quiet=args.quiet,
+            report_path=args.report,
+            palette_engine=args.palette_engine,
+            cvd_threshold=args.cvd_threshold,
+            cvd_strict=args.cvd_strict,
+            cvd_safe=args.cvd_safe,
+            pinyin_overrides=args.pinyin_overrides,
+        )
+    except (ImportError, WorkbookError, PaletteAuditError) as e:
+        print(f"\nError: {e}")
+        sys.exit(1)
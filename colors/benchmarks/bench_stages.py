@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark the palette build stages and flag regressions against a baseline.
+
+Each stage runs on the bundled workbook and on synthetic libraries of
+random swatches. The script records the best wall time over ``--repeat``
+runs. Peak memory is measured with tracemalloc in a separate run, so the
+tracing overhead does not affect the timing. numpy reports its buffers to
+tracemalloc, so array memory is included.
+
+Module-level memo caches (pinyin, the default lexicon, the scalar color
+conversions) are cleared before every run, so repeats after the first
+measure a cold stage too.
+
+Stages whose cost grows with n² (sorting, ordering) are
+capped by ``STAGE_LIMITS``. Larger cases are listed as skipped instead of
+exhausting memory. That leaves out the 100k libraries for both: sorting
+takes about 6 s and 80 MiB at 10k colors, and ordering about 150 MiB at
+2k, with both growing quadratically.
+
+Usage:
+  python3 colors/benchmarks/bench_stages.py --save baseline.json
+  # ... change the code ...
+  python3 colors/benchmarks/bench_stages.py --baseline baseline.json
+
+With ``--baseline`` the exit status is 1 if any stage got slower or used
+more memory than the baseline by more than the tolerances allow.
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR.parent))
+
+import numpy as np  # noqa: E402
+
+import ChineseColors as cc  # noqa: E402
+import colorspace  # noqa: E402
+import pinyin_lexicon  # noqa: E402
+from color_record import ColorRecord  # noqa: E402
+
+BENCH_FORMAT = 1
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+STAGES = ("ingest", "sort", "dedup", "interpolate", "color_order")
+
+# Largest library each quadratic stage is run on
+STAGE_LIMITS = {"sort": 10_000, "color_order": 2_000}
+
+# Allowed relative increase over the baseline before a stage fails
+TIME_TOLERANCE = 0.30
+MEMORY_TOLERANCE = 0.20
+
+# Timings below this are dominated by noise and never fail
+MIN_TIME = 0.005
+
+
+def synthetic_colors(n, seed=0):
+    """``n`` random swatches spread evenly over the workbook categories."""
+    rng = np.random.default_rng(seed)
+    packed = rng.integers(0, 1 << 24, size=n).tolist()
+    categories = rng.integers(0, len(cc.CATEGORY_ORDER), size=n).tolist()
+    return [
+        ColorRecord(f"color{i}", "色", rgb, cc.CATEGORY_ORDER[cat], "色")
+        for i, (rgb, cat) in enumerate(zip(packed, categories))
+    ]
+
+
+def workbook_colors():
+    colors, _ = cc.read_workbook_colors(SCRIPT_DIR.parent / "ChineseColors5.0.xlsx")
+    return colors
+
+
+def clear_caches():
+    """Empty the memo caches a stage would otherwise inherit from earlier runs."""
+    cc._default_lexicon.cache_clear()
+    pinyin_lexicon._transliterate.cache_clear()
+    colorspace.hex_to_lab.cache_clear()
+    colorspace.hex_to_hsv.cache_clear()
+
+
+def _fresh(colors):
+    """Unnumbered copies, so no run sees state left by the previous one."""
+    return [
+        ColorRecord(c.name, c.name_ch, c.rgb, c.category, c.category_ch, c.lab)
+        for c in colors
+    ]
+
+
+def stage_runner(stage, colors):
+    """Zero-argument callable that runs ``stage`` once on ``colors``."""
+    if stage == "ingest":
+        return workbook_colors
+    if stage == "sort":
+        return lambda: cc.sort_categories(_fresh(colors))
+    if stage == "dedup":
+        return lambda: cc.select_colors(_fresh(colors), filter_colors=True)
+
+    hex_colors = list(dict.fromkeys(color.hex for color in colors))
+    if stage == "interpolate":
+
+        def interpolate():
+            # A fresh generator per run, so no palette comes from memory
+            generator = cc.PaletteGenerator(cc.BASE_CHINESE_COLORS, hex_colors)
+            return [generator.palette(size) for size in cc.SET_SIZES]
+
+        return interpolate
+    if stage == "color_order":
+        return lambda: cc.color_order(hex_colors)
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def measure(run, repeat):
+    """Best wall time over ``repeat`` runs and the peak traced memory."""
+    best = float("inf")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            clear_caches()
+            gc.collect()
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+
+        clear_caches()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(stages, sizes, repeat):
+    """Run every stage on every dataset.
+
+    Returns:
+        Dict of ``"<stage>/<dataset>"`` to a result dict with ``seconds``
+        and ``peak_bytes``, or with ``skipped`` giving the reason
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        datasets = {"workbook": workbook_colors()}
+    for n in sizes:
+        datasets[f"random{n}"] = synthetic_colors(n)
+
+    results = {}
+    for stage in stages:
+        for dataset, colors in datasets.items():
+            if stage == "ingest" and dataset != "workbook":
+                continue
+            name = f"{stage}/{dataset}"
+            limit = STAGE_LIMITS.get(stage)
+            if limit is not None and len(colors) > limit:
+                results[name] = {"skipped": f"more than {limit} colors"}
+                print(f"  {name:<28} skipped (more than {limit} colors)")
+                continue
+            seconds, peak = measure(stage_runner(stage, colors), repeat)
+            results[name] = {
+                "colors": len(colors),
+                "seconds": seconds,
+                "peak_bytes": peak,
+            }
+            print(f"  {name:<28} {seconds:9.3f} s {peak / 2**20:10.1f} MiB")
+    return results
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    """Regressions of ``results`` relative to ``baseline``.
+
+    Returns:
+        List of human-readable regression messages
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or "skipped" in result or "skipped" in base:
+            continue
+        limit = base["seconds"] * (1 + time_tolerance)
+        if result["seconds"] > max(limit, MIN_TIME):
+            regressions.append(
+                f"{name}: {result['seconds']:.3f} s vs baseline "
+                f"{base['seconds']:.3f} s (+{time_tolerance:.0%} allowed)"
+            )
+        limit = base["peak_bytes"] * (1 + memory_tolerance)
+        if result["peak_bytes"] > limit:
+            regressions.append(
+                f"{name}: {result['peak_bytes'] / 2**20:.1f} MiB vs baseline "
+                f"{base['peak_bytes'] / 2**20:.1f} MiB (+{memory_tolerance:.0%} allowed)"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Chinese color build stages.",
+    )
+    parser.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help=f"Comma-separated stages to run (default: {','.join(STAGES)})",
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(n) for n in DEFAULT_SIZES),
+        help="Comma-separated sizes of the synthetic swatch libraries (default: 1000,10000,100000)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Timed runs per case; the fastest is kept (default: 3)",
+    )
+    parser.add_argument("--save", type=Path, help="Write the results to this JSON file")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        help="Compare against results saved with --save and fail on regressions",
+    )
+    parser.add_argument(
+        "--time-tolerance",
+        type=float,
+        default=TIME_TOLERANCE,
+        help=f"Allowed relative slowdown (default: {TIME_TOLERANCE})",
+    )
+    parser.add_argument(
+        "--memory-tolerance",
+        type=float,
+        default=MEMORY_TOLERANCE,
+        help=f"Allowed relative growth of peak memory (default: {MEMORY_TOLERANCE})",
+    )
+    args = parser.parse_args(argv)
+
+    stages = [stage for stage in args.stages.split(",") if stage]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    print(f"Benchmarking {', '.join(stages)} (best of {args.repeat})")
+    results = run_benchmarks(stages, sizes, args.repeat)
+
+    if args.save is not None:
+        report = {
+            "format": BENCH_FORMAT,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to {args.save}")
+
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("format") != BENCH_FORMAT:
+            print(f"\nError: {args.baseline} was written by another benchmark format")
+            return 2
+        regressions = compare(
+            results, baseline["results"], args.time_tolerance, args.memory_tolerance
+        )
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
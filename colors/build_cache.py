@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Content-addressed stage cache for the Chinese color build.
+
+Each stage result is pickled under ``<root>/<stage>-<key>.pkl`` where the
+key is a hash of everything the stage depends on (input digests, constants,
+the pipeline source). A stage whose result is several files, such as the
+per-category record spill, gets the directory ``<root>/<stage>-<key>``
+instead. A changed input yields a new key, so stale entries
+are never read; they are simply left behind until ``clear`` is called.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+CACHE_FORMAT = 1
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_digest(source_dir):
+    """Digest of every Python source in ``source_dir``.
+
+    Any edit to the pipeline code, including its constants, thresholds and
+    weights, changes this digest and so invalidates every cached stage.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(Path(source_dir).glob("*.py")):
+        digest.update(path.name.encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def stage_key(*parts):
+    """Stable hash of JSON-serializable key parts."""
+    payload = json.dumps(
+        [CACHE_FORMAT, *parts], ensure_ascii=False, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class BuildCache:
+    """Pickle-backed store for stage results, addressed by ``stage_key``.
+
+    Args:
+        root: Cache directory; created on first write
+        enabled: When False, every lookup misses and nothing is written
+        salt: Mixed into every ``key``; pass ``code_digest`` so that editing
+            the pipeline invalidates all stages
+    """
+
+    def __init__(self, root, enabled=True, salt=""):
+        self.root = Path(root)
+        self.enabled = enabled
+        self.salt = salt
+        self.hits = []
+        self.misses = []
+
+    def key(self, *parts):
+        """``stage_key`` of ``parts`` combined with this cache's salt."""
+        return stage_key(self.salt, *parts)
+
+    def _path(self, stage, key):
+        return self.root / f"{stage}-{key}.pkl"
+
+    def load(self, stage, key):
+        """Return ``(True, value)`` on a hit and ``(False, None)`` on a miss."""
+        if not self.enabled:
+            return False, None
+        path = self._path(stage, key)
+        try:
+            with open(path, "rb") as f:
+                return True, pickle.load(f)
+        except FileNotFoundError:
+            return False, None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            # A truncated or incompatible entry is treated as missing
+            return False, None
+
+    def store(self, stage, key, value):
+        """Write ``value`` atomically so readers never see a partial entry."""
+        if not self.enabled:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(stage, key)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def cached(self, stage, key, compute):
+        """Return the cached value for ``(stage, key)``, computing it on a miss."""
+        hit, value = self.load(stage, key)
+        if hit:
+            self.hits.append(stage)
+            print(f"  Using cached '{stage}' stage ({key[:12]})")
+            return value
+        self.misses.append(stage)
+        value = compute()
+        self.store(stage, key, value)
+        return value
+
+    def cached_batch(self, stage, keys, compute):
+        """Batch form of ``cached`` for independent entries of one stage.
+
+        Args:
+            stage: Stage name
+            keys: One key per entry
+            compute: Called once with the positions of the missing entries;
+                must return their values in the same order
+
+        Returns:
+            List of values, one per key
+        """
+        values = [None] * len(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            hit, value = self.load(stage, key)
+            if hit:
+                values[i] = value
+            else:
+                missing.append(i)
+
+        if len(missing) < len(keys):
+            self.hits.append(stage)
+            print(
+                f"  Using cached '{stage}' stage for {len(keys) - len(missing)} of {len(keys)} entries"
+            )
+        if missing:
+            self.misses.append(stage)
+            for i, value in zip(missing, compute(missing)):
+                values[i] = value
+                self.store(stage, keys[i], value)
+        return values
+
+    def iter_cached_batch(self, stage, keys, compute, batch_size=1):
+        """Lazy form of ``cached_batch`` that holds one batch of values at a time.
+
+        Entries are loaded, and missing ones computed, ``batch_size`` at a
+        time as the values are consumed, so a stage over many large entries
+        never has all of them in memory.
+
+        Args:
+            stage: Stage name
+            keys: One key per entry
+            compute: Called with the positions of the missing entries of
+                each batch; must return their values in the same order
+            batch_size: Entries per batch
+
+        Yields:
+            Values, one per key, in order
+        """
+        hits = 0
+        missed = False
+        for start in range(0, len(keys), batch_size):
+            positions = range(start, min(start + batch_size, len(keys)))
+            values = {}
+            missing = []
+            for i in positions:
+                hit, value = self.load(stage, keys[i])
+                if hit:
+                    values[i] = value
+                else:
+                    missing.append(i)
+            hits += len(values)
+            if missing:
+                missed = True
+                for i, value in zip(missing, compute(missing)):
+                    values[i] = value
+                    self.store(stage, keys[i], value)
+            for i in positions:
+                yield values[i]
+
+        if hits:
+            self.hits.append(stage)
+            print(f"  Used cached '{stage}' stage for {hits} of {len(keys)} entries")
+        if missed:
+            self.misses.append(stage)
+
+    def cached_dir(self, stage, key, open_dir, compute, scratch):
+        """Form of ``cached`` for a result stored as files in a directory.
+
+        Args:
+            stage: Stage name
+            key: Stage key
+            open_dir: Called with the stage directory; returns the stored
+                result, or None if the directory holds no complete one
+            compute: Called with a directory to write a fresh result into;
+                returns that result
+            scratch: Directory used instead when the cache is disabled
+
+        Returns:
+            The stored or freshly computed result
+        """
+        if not self.enabled:
+            return compute(Path(scratch))
+        path = self.root / f"{stage}-{key}"
+        value = open_dir(path) if path.is_dir() else None
+        if value is not None:
+            self.hits.append(stage)
+            print(f"  Using cached '{stage}' stage ({key[:12]})")
+            return value
+        self.misses.append(stage)
+        return compute(path)
+
+    def clear(self):
+        """Remove every cache entry."""
+        if not self.root.exists():
+            return
+        for path in self.root.glob("*.pkl"):
+            path.unlink()
+        for path in self.root.glob("*-*"):
+            if path.is_dir():
+                shutil.rmtree(path)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Shared LAB table and pairwise distance matrix for a pool of candidate colors."""
+
+import numpy as np
+
+from colorspace import convert_hex_colors
+from run_report import count
+
+
+def pairwise_lab_distance(lab1, lab2):
+    """Euclidean (CIE76) distance between every row of ``lab1`` and ``lab2``.
+
+    Args:
+        lab1: (n, 3) LAB array
+        lab2: (m, 3) LAB array
+
+    Returns:
+        (n, m) distance array
+    """
+    lab1 = np.asarray(lab1, dtype=np.float64)
+    lab2 = np.asarray(lab2, dtype=np.float64)
+    dL = lab2[None, :, 0] - lab1[:, None, 0]
+    da = lab2[None, :, 1] - lab1[:, None, 1]
+    db = lab2[None, :, 2] - lab1[:, None, 2]
+    return np.sqrt(dL**2 + da**2 + db**2)
+
+
+class PaletteCandidates:
+    """Candidate colors with LAB/HSV coordinates and a ΔE matrix computed once.
+
+    Colors are addressed either by hex string or by their row index in
+    ``hex_colors``. The full distance matrix is built on first access of
+    ``distances`` (or of the hex-based lookups, which read from it); until
+    then ``delta_e`` computes the requested block only, so large pools that
+    are only queried in blocks never pay for n x n.
+
+    Args:
+        hex_colors: Sequence of hex color strings; duplicates are dropped,
+            keeping the first occurrence
+        metric: Pairwise distance function over LAB arrays, e.g. one of
+            ``metrics.METRICS``; defaults to ``pairwise_lab_distance``
+    """
+
+    def __init__(self, hex_colors, metric=None):
+        self.hex_colors = list(dict.fromkeys(hex_colors))
+        self.index = {hex_color: i for i, hex_color in enumerate(self.hex_colors)}
+        self.table = convert_hex_colors(self.hex_colors)
+        self.lab = self.table["lab"]
+        self.hsv = self.table["hsv"]
+        self.metric = pairwise_lab_distance if metric is None else metric
+        self._distances = None
+
+    def __len__(self):
+        return len(self.hex_colors)
+
+    def __contains__(self, hex_color):
+        return hex_color in self.index
+
+    @property
+    def distances(self):
+        """(n, n) ΔE matrix between all candidates."""
+        if self._distances is None:
+            self._distances = self.metric(self.lab, self.lab)
+            count("distance_evaluations", len(self.lab) ** 2)
+        return self._distances
+
+    def indices(self, hex_colors):
+        """Row indices of the given hex colors."""
+        return np.fromiter(
+            (self.index[hex_color] for hex_color in hex_colors),
+            dtype=np.intp,
+            count=len(hex_colors),
+        )
+
+    def delta_e(self, rows, cols):
+        """ΔE between candidate rows and columns, given as index arrays.
+
+        Returns:
+            (len(rows), len(cols)) distance array
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = np.asarray(cols, dtype=np.intp)
+        if self._distances is not None:
+            return self._distances[np.ix_(rows, cols)]
+        count("distance_evaluations", len(rows) * len(cols))
+        return self.metric(self.lab[rows], self.lab[cols])
+
+    def distance(self, color1_hex, color2_hex):
+        """ΔE between two candidate colors given as hex strings."""
+        return float(self.distances[self.index[color1_hex], self.index[color2_hex]])
+
+    def min_distance_to(self, hex_color, others):
+        """Smallest ΔE from ``hex_color`` to any color in ``others``.
+
+        Returns ``inf`` when ``others`` is empty.
+        """
+        if len(others) == 0:
+            return float("inf")
+        row = self.distances[self.index[hex_color]]
+        return float(row[self.indices(others)].min())
+
+
+class NearestSelected:
+    """Running minimum ΔE from every candidate to a growing selected set.
+
+    Adding a color updates the minimum for all candidates with one
+    vectorized ``np.minimum`` against that color's distance row, so the
+    distance from each candidate to the selected set never has to be
+    recomputed from scratch. The row is read from the candidates' ΔE
+    matrix if it has been built, and otherwise computed for the tracked
+    rows only, so a large pool never needs the n x n matrix.
+
+    Args:
+        candidates: PaletteCandidates holding every color that can be selected
+        rows: Optional candidate rows whose minimum is tracked; the others
+            stay at ``inf``. Defaults to all candidates.
+    """
+
+    def __init__(self, candidates, rows=None):
+        self.candidates = candidates
+        self.min_distance = np.full(len(candidates), np.inf)
+        self.rows = np.arange(len(candidates)) if rows is None else np.unique(rows)
+        self.used = np.zeros(len(candidates), dtype=bool)
+        self.selected = []
+
+    def __len__(self):
+        return len(self.selected)
+
+    def add(self, row):
+        """Mark candidate ``row`` as selected and update the running minimum."""
+        distances = self.candidates.delta_e([row], self.rows)[0]
+        self.min_distance[self.rows] = np.minimum(
+            self.min_distance[self.rows], distances
+        )
+        self.used[row] = True
+        self.selected.append(row)
+
+    def unused(self, rows):
+        """The subset of ``rows`` that has not been selected yet, in order."""
+        rows = np.asarray(rows, dtype=np.intp)
+        return rows[~self.used[rows]]
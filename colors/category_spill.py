@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Color records grouped by category, spilled to disk chunk by chunk.
+
+Ingestion yields records in workbook order, but the sort works one
+category at a time. ``CategorySpill`` sits between the two: each batch of
+records is split by category and appended, as one pickle per batch, to
+that category's file. While the workbook is read only the current batch
+is in memory, and ``load`` later brings back a single category.
+
+A spill is complete once ``finish`` has written its manifest, which also
+carries the ingestion counters. ``open`` only accepts complete spills, so
+a directory left behind by an interrupted run is rebuilt, not read.
+"""
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+from build_cache import file_digest
+
+SPILL_FORMAT = 1
+MANIFEST = "manifest.pkl"
+
+
+class CategorySpill:
+    """Per-category record files in ``directory``, appended batch by batch.
+
+    Args:
+        directory: Directory for the category files; any files already in
+            it are removed. None keeps the batches in memory instead, for
+            callers that hold every record anyway
+    """
+
+    def __init__(self, directory=None):
+        self.directory = None if directory is None else Path(directory)
+        # Category -> number of records, in the order categories first appear
+        self.counts = {}
+        self.info = {}
+        self._files = {}
+        self._chunks = {}
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for path in self.directory.iterdir():
+                path.unlink()
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def categories(self):
+        """Categories in the order their first record was added."""
+        return list(self.counts)
+
+    def _path(self, category):
+        return self.directory / self._files[category]
+
+    def add(self, records):
+        """Append a batch of ColorRecords, keeping their order per category."""
+        groups = {}
+        for record in records:
+            groups.setdefault(record.category, []).append(record)
+        for category, chunk in groups.items():
+            if category not in self.counts:
+                self.counts[category] = 0
+                self._files[category] = f"{len(self._files):03d}.pkl"
+            self.counts[category] += len(chunk)
+            if self.directory is None:
+                self._chunks.setdefault(category, []).extend(chunk)
+            else:
+                with open(self._path(category), "ab") as f:
+                    pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, category):
+        """Every record of ``category``, in the order they were added."""
+        if self.directory is None:
+            return list(self._chunks[category])
+        records = []
+        with open(self._path(category), "rb") as f:
+            while True:
+                try:
+                    records.extend(pickle.load(f))
+                except EOFError:
+                    return records
+
+    def digest(self, category):
+        """Hex digest of the records of ``category``, e.g. for a cache key."""
+        if self.directory is None:
+            chunk = pickle.dumps(self._chunks[category], pickle.HIGHEST_PROTOCOL)
+            return hashlib.sha256(chunk).hexdigest()
+        return file_digest(self._path(category))
+
+    def finish(self, **info):
+        """Mark the spill complete, storing ``info`` alongside the records.
+
+        Returns:
+            The spill itself
+        """
+        self.info = info
+        if self.directory is None:
+            return self
+        manifest = {
+            "format": SPILL_FORMAT,
+            "counts": self.counts,
+            "files": self._files,
+            "info": info,
+        }
+        tmp_path = self.directory / f"{MANIFEST}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(manifest, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.directory / MANIFEST)
+        return self
+
+    @classmethod
+    def open(cls, directory):
+        """Reopen a finished spill, or None if ``directory`` holds none."""
+        directory = Path(directory)
+        try:
+            with open(directory / MANIFEST, "rb") as f:
+                manifest = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        if manifest.get("format") != SPILL_FORMAT:
+            return None
+        spill = cls.__new__(cls)
+        spill.directory = directory
+        spill.counts = manifest["counts"]
+        spill.info = manifest["info"]
+        spill._files = manifest["files"]
+        spill._chunks = {}
+        return spill
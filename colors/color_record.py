@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Compact record for one named color, shared by every pipeline stage.
+
+A ``ColorRecord`` uses ``__slots__`` instead of a per-color dict. The RGB
+value is packed into one ``0xRRGGBB`` integer, and the hex code and the
+``(r, g, b)`` text are derived from it on demand. LAB coordinates are
+computed once, in batches, when the records are created. After that, no
+stage needs to parse a hex string again. LAB stays in float64 so every
+distance and sort cost matches the array conversions bit for bit.
+"""
+
+import numpy as np
+
+from colorspace import convert_rgb_colors
+
+RECORD_FIELDS = ("num", "name", "name_ch", "rgb", "hex", "category", "category_ch")
+
+
+def pack_rgb(rgb):
+    """Pack an (n, 3) RGB array (0-255) into ``0xRRGGBB`` integers."""
+    rgb = np.asarray(rgb, dtype=np.uint32).reshape(-1, 3)
+    return (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+
+
+def unpack_rgb(packed):
+    """Inverse of ``pack_rgb``: an (n, 3) uint8 RGB array."""
+    packed = np.asarray(packed, dtype=np.uint32).reshape(-1)
+    return np.stack(
+        [(packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF], axis=1
+    ).astype(np.uint8)
+
+
+class ColorRecord:
+    """A named color from the workbook.
+
+    Args:
+        name: Pinyin name
+        name_ch: Chinese name
+        rgb: Packed ``0xRRGGBB`` integer
+        category: Category key, e.g. "blue"
+        category_ch: Category as written in the workbook, e.g. "蓝"
+        lab: Optional (L, a, b) tuple; see ``annotate_lab``
+        num: Position in the final list, once numbered
+    """
+
+    __slots__ = ("num", "name", "name_ch", "rgb", "category", "category_ch", "lab")
+
+    def __init__(self, name, name_ch, rgb, category, category_ch, lab=None, num=None):
+        self.num = num
+        self.name = name
+        self.name_ch = name_ch
+        self.rgb = int(rgb)
+        self.category = category
+        self.category_ch = category_ch
+        self.lab = lab
+
+    @property
+    def hex(self):
+        return f"#{self.rgb:06X}"
+
+    @property
+    def rgb_tuple(self):
+        return (self.rgb >> 16, (self.rgb >> 8) & 0xFF, self.rgb & 0xFF)
+
+    @property
+    def rgb_text(self):
+        """RGB as ``(r, g, b)``, the form used in the CSV export."""
+        return "({}, {}, {})".format(*self.rgb_tuple)
+
+    def as_row(self):
+        """Dict of ``RECORD_FIELDS``, as written to the CSV."""
+        return {
+            "num": self.num,
+            "name": self.name,
+            "name_ch": self.name_ch,
+            "rgb": self.rgb_text,
+            "hex": self.hex,
+            "category": self.category,
+            "category_ch": self.category_ch,
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, ColorRecord):
+            return NotImplemented
+        return all(
+            getattr(self, slot) == getattr(other, slot) for slot in self.__slots__
+        )
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{slot}={getattr(self, slot)!r}" for slot in self.__slots__)
+        return f"ColorRecord({fields})"
+
+
+def records_from_table(table, names):
+    """Build records from a ``workbook.clean_rows`` table.
+
+    LAB is computed for the whole table in one batch.
+
+    Args:
+        table: DataFrame with r, g, b, name_ch, category and category_ch
+        names: Pinyin name for every row
+    """
+    rgb = np.column_stack(
+        [table["r"].to_numpy(), table["g"].to_numpy(), table["b"].to_numpy()]
+    ).reshape(-1, 3)
+    lab = convert_rgb_colors(rgb)["lab"].tolist()
+    return [
+        ColorRecord(name, name_ch, packed, category, category_ch, tuple(point))
+        for name, name_ch, packed, category, category_ch, point in zip(
+            names,
+            table["name_ch"].tolist(),
+            pack_rgb(rgb).tolist(),
+            table["category"].tolist(),
+            table["category_ch"].tolist(),
+            lab,
+        )
+    ]
+
+
+def annotate_lab(records):
+    """Fill in ``lab`` for any record that lacks it, in one batch."""
+    missing = [record for record in records if record.lab is None]
+    if missing:
+        rgb = unpack_rgb([record.rgb for record in missing])
+        for record, point in zip(missing, convert_rgb_colors(rgb)["lab"].tolist()):
+            record.lab = tuple(point)
+    return records
+
+
+def lab_array(records):
+    """(n, 3) float64 LAB array of ``records``, annotating them if needed."""
+    annotate_lab(records)
+    return np.array([record.lab for record in records], dtype=np.float64).reshape(-1, 3)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Vectorized color-space conversions for the Chinese color pipeline.
+
+Every function here works on whole arrays of colors at once. The scalar
+helpers at the bottom (``hex_to_rgb``, ``rgb_to_lab`` ...) keep the old
+one-color-at-a-time signatures and simply call the batch versions, so the
+numeric results are the same whichever entry point is used.
+"""
+
+import re
+from functools import lru_cache
+
+import numpy as np
+
+# D65 white point
+WHITE_D65 = (95.047, 100.000, 108.883)
+
+_HEX_COLOR = re.compile(r"#?[0-9A-Fa-f]{6}")
+
+
+def _srgb_to_linear(c):
+    if c > 0.04045:
+        return ((c + 0.055) / 1.055) ** 2.4
+    else:
+        return c / 12.92
+
+
+# Gamma-expanded value for every 8-bit channel level
+_LINEAR_LUT = np.array([_srgb_to_linear(v / 255.0) for v in range(256)])
+
+COLOR_DTYPE = np.dtype(
+    [
+        ("rgb", np.uint8, (3,)),
+        ("xyz", np.float64, (3,)),
+        ("lab", np.float64, (3,)),
+        ("hsv", np.float64, (3,)),
+        ("lch", np.float64, (3,)),
+    ]
+)
+
+
+def hex_to_rgb_array(hex_colors):
+    """Parse a sequence of hex strings into an (n, 3) uint8 RGB array.
+
+    Raises:
+        ValueError: If an entry is not ``RRGGBB`` or ``#RRGGBB``
+    """
+    if len(hex_colors) == 0:
+        return np.empty((0, 3), dtype=np.uint8)
+    for h in hex_colors:
+        if not (isinstance(h, str) and _HEX_COLOR.fullmatch(h)):
+            raise ValueError(f"Hex color must have exactly 6 hex digits: {h!r}")
+    digits = "".join(h[-6:] for h in hex_colors)
+    return np.frombuffer(bytes.fromhex(digits), dtype=np.uint8).reshape(-1, 3)
+
+
+def rgb_array_to_hex(rgb):
+    """Format an (n, 3) RGB array as uppercase ``#RRGGBB`` strings."""
+    rgb = np.asarray(rgb, dtype=np.uint8).reshape(-1, 3)
+    return [f"#{r:02X}{g:02X}{b:02X}" for r, g, b in rgb.tolist()]
+
+
+def rgb_to_xyz_array(rgb):
+    """Convert an (n, 3) RGB array (0-255) to XYZ (D65 illuminant)."""
+    rgb = np.asarray(rgb)
+    if rgb.dtype == np.uint8 or (
+        np.issubdtype(rgb.dtype, np.integer)
+        and rgb.size > 0
+        and rgb.min() >= 0
+        and rgb.max() <= 255
+    ):
+        # Apply gamma correction through the per-level lookup table
+        c = _LINEAR_LUT[rgb]
+    else:
+        c = rgb.astype(np.float64) / 255.0
+        c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    return linear_rgb_to_xyz_array(c)
+
+
+def linear_rgb_to_xyz_array(c):
+    """Convert an (n, 3) linear RGB array (0-1) to XYZ (D65 illuminant)."""
+    r, g, b = c[:, 0], c[:, 1], c[:, 2]
+
+    # Convert to XYZ using sRGB matrix, term by term to keep the scalar
+    # summation order
+    xyz = np.empty_like(c, dtype=np.float64)
+    xyz[:, 0] = (r * 0.4124564 + g * 0.3575761 + b * 0.1804375) * 100
+    xyz[:, 1] = (r * 0.2126729 + g * 0.7151522 + b * 0.0721750) * 100
+    xyz[:, 2] = (r * 0.0193339 + g * 0.1191920 + b * 0.9503041) * 100
+    return xyz
+
+
+def xyz_to_lab_array(xyz):
+    """Convert an (n, 3) XYZ array to LAB (D65 illuminant)."""
+    t = np.asarray(xyz, dtype=np.float64) / np.array(WHITE_D65)
+    f = np.where(
+        t > (6 / 29) ** 3,
+        t ** (1 / 3),
+        (1 / 3) * ((29 / 6) ** 2) * t + 4 / 29,
+    )
+    fx, fy, fz = f[:, 0], f[:, 1], f[:, 2]
+
+    lab = np.empty_like(f)
+    lab[:, 0] = 116 * fy - 16
+    lab[:, 1] = 500 * (fx - fy)
+    lab[:, 2] = 200 * (fy - fz)
+    return lab
+
+
+def rgb_to_lab_array(rgb):
+    """Convert an (n, 3) RGB array (0-255) to LAB."""
+    return xyz_to_lab_array(rgb_to_xyz_array(rgb))
+
+
+def rgb_to_hsv_array(rgb):
+    """Convert an (n, 3) RGB array (0-255) to HSV.
+
+    Returns:
+        (n, 3) array of (H, S, V) where H is hue in degrees (0-360), S and V are 0-1
+    """
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    r, g, b = c[:, 0], c[:, 1], c[:, 2]
+
+    max_val = c.max(axis=1)
+    min_val = c.min(axis=1)
+    delta = max_val - min_val
+    safe_delta = np.where(delta == 0, 1.0, delta)
+    safe_max = np.where(max_val == 0, 1.0, max_val)
+
+    hue = np.select(
+        [delta == 0, max_val == r, max_val == g],
+        [
+            0.0,
+            60 * (((g - b) / safe_delta) % 6),
+            60 * (((b - r) / safe_delta) + 2),
+        ],
+        60 * (((r - g) / safe_delta) + 4),
+    )
+    hue = np.where(hue < 0, hue + 360, hue)
+
+    hsv = np.empty_like(c)
+    hsv[:, 0] = hue
+    hsv[:, 1] = np.where(max_val == 0, 0.0, delta / safe_max)
+    hsv[:, 2] = max_val
+    return hsv
+
+
+def lab_to_lch_array(lab):
+    """Convert an (n, 3) LAB array to LCh (chroma and hue angle in degrees)."""
+    lab = np.asarray(lab, dtype=np.float64)
+    a, b = lab[:, 1], lab[:, 2]
+    hue = np.degrees(np.arctan2(b, a))
+
+    lch = np.empty_like(lab)
+    lch[:, 0] = lab[:, 0]
+    lch[:, 1] = np.sqrt(a * a + b * b)
+    lch[:, 2] = np.where(hue < 0, hue + 360, hue)
+    return lch
+
+
+def convert_rgb_colors(rgb):
+    """Convert an (n, 3) RGB array to every color space in one pass.
+
+    Returns:
+        Structured array of ``COLOR_DTYPE`` with ``rgb``, ``xyz``, ``lab``,
+        ``hsv`` and ``lch`` fields, each an (n, 3) view
+    """
+    rgb = np.asarray(rgb, dtype=np.uint8).reshape(-1, 3)
+    table = np.empty(len(rgb), dtype=COLOR_DTYPE)
+    table["rgb"] = rgb
+    table["xyz"] = rgb_to_xyz_array(rgb)
+    table["lab"] = xyz_to_lab_array(table["xyz"])
+    table["hsv"] = rgb_to_hsv_array(rgb)
+    table["lch"] = lab_to_lch_array(table["lab"])
+    return table
+
+
+def convert_hex_colors(hex_colors):
+    """Convert a sequence of hex strings to every color space in one pass.
+
+    Args:
+        hex_colors: Sequence of ``#RRGGBB`` strings
+
+    Returns:
+        Structured array of ``COLOR_DTYPE``, one row per input color
+    """
+    return convert_rgb_colors(hex_to_rgb_array(hex_colors))
+
+
+def hex_to_rgb(hex_color):
+    """Convert hex color to RGB tuple (0-255)."""
+    return tuple(hex_to_rgb_array([hex_color])[0].tolist())
+
+
+def rgb_to_xyz(r, g, b):
+    """Convert RGB to XYZ color space (D65 illuminant)."""
+    return tuple(rgb_to_xyz_array([[r, g, b]])[0].tolist())
+
+
+def xyz_to_lab(x, y, z):
+    """Convert XYZ to LAB color space (D65 illuminant)."""
+    return tuple(xyz_to_lab_array([[x, y, z]])[0].tolist())
+
+
+def rgb_to_lab(rgb):
+    """Convert RGB (0-255) to LAB color space."""
+    return tuple(rgb_to_lab_array([rgb])[0].tolist())
+
+
+def rgb_to_hsv(rgb):
+    """Convert RGB (0-255) to HSV color space.
+
+    Returns:
+        tuple: (H, S, V) where H is hue in degrees (0-360), S and V are 0-1
+    """
+    return tuple(rgb_to_hsv_array([rgb])[0].tolist())
+
+
+@lru_cache(maxsize=65536)
+def hex_to_lab(hex_color):
+    """Convert hex color to a LAB tuple, memoized per hex string."""
+    return tuple(convert_hex_colors([hex_color])["lab"][0].tolist())
+
+
+@lru_cache(maxsize=65536)
+def hex_to_hsv(hex_color):
+    """Convert hex color to an HSV tuple, memoized per hex string."""
+    return tuple(convert_hex_colors([hex_color])["hsv"][0].tolist())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Color-vision-deficiency simulation and a distinguishability audit for palettes.
+
+Dichromacy is simulated with the full-severity matrices of Machado,
+Oliveira and Fernandes (2009). They are applied to linear sRGB and the
+result is clipped to the gamut. Simulation and conversion work on whole
+arrays, so one call handles every palette color for every deficiency.
+
+``audit_palettes`` converts all colors of all palettes once and computes
+one ΔE matrix per deficiency over them. Each palette's smallest pairwise
+ΔE is then read from its block of that matrix. ``cvd_metric`` wraps a
+``metrics`` distance so that it also takes the simulated distances into
+account, which lets the palette engines use them as a constraint.
+"""
+
+import numpy as np
+
+from candidates import PaletteCandidates
+from colorspace import linear_rgb_to_xyz_array, xyz_to_lab_array
+from metrics import DEFAULT_METRIC, get_metric, lab_to_xyz_array
+
+CVD_MATRICES = {
+    "protan": np.array(
+        [
+            [0.152286, 1.052583, -0.204868],
+            [0.114503, 0.786281, 0.099216],
+            [-0.003882, -0.048116, 1.051998],
+        ]
+    ),
+    "deutan": np.array(
+        [
+            [0.367322, 0.860646, -0.227968],
+            [0.280085, 0.672501, 0.047413],
+            [-0.011820, 0.042940, 0.968881],
+        ]
+    ),
+    "tritan": np.array(
+        [
+            [1.255528, -0.076749, -0.178779],
+            [-0.078411, 0.930809, 0.147602],
+            [0.004733, 0.691367, 0.303900],
+        ]
+    ),
+}
+CVD_TYPES = tuple(CVD_MATRICES)
+
+# Smallest simulated ΔE at which two palette colors count as distinguishable
+DEFAULT_CVD_THRESHOLD = 5.0
+
+
+class PaletteAuditError(ValueError):
+    """A palette is not distinguishable enough under simulated CVD."""
+
+
+_XYZ_TO_LINEAR = np.linalg.inv(
+    np.array(
+        [
+            [0.4124564, 0.3575761, 0.1804375],
+            [0.2126729, 0.7151522, 0.0721750],
+            [0.0193339, 0.1191920, 0.9503041],
+        ]
+    )
+)
+
+
+def simulate_lab(lab, deficiencies=CVD_TYPES):
+    """LAB of ``lab`` as seen with each of ``deficiencies``.
+
+    Args:
+        lab: (n, 3) LAB array of sRGB colors
+        deficiencies: Names in ``CVD_MATRICES``
+
+    Returns:
+        (len(deficiencies), n, 3) LAB array
+    """
+    lab = np.asarray(lab, dtype=np.float64).reshape(-1, 3)
+    linear = np.clip(lab_to_xyz_array(lab) / 100.0 @ _XYZ_TO_LINEAR.T, 0.0, 1.0)
+    matrices = np.stack([CVD_MATRICES[name] for name in deficiencies])
+    simulated = np.clip(np.einsum("kij,nj->kni", matrices, linear), 0.0, 1.0)
+    return np.stack(
+        [xyz_to_lab_array(linear_rgb_to_xyz_array(rgb)) for rgb in simulated]
+    ).reshape(len(deficiencies), len(lab), 3)
+
+
+def cvd_metric(metric, deficiencies=CVD_TYPES):
+    """Distance function: the smaller of ``metric`` for normal and simulated vision.
+
+    Args:
+        metric: Pairwise distance function over LAB arrays
+        deficiencies: Names in ``CVD_MATRICES`` to take into account
+    """
+    deficiencies = tuple(deficiencies)
+
+    def distance(lab1, lab2):
+        result = metric(lab1, lab2)
+        for sim1, sim2 in zip(
+            simulate_lab(lab1, deficiencies), simulate_lab(lab2, deficiencies)
+        ):
+            np.minimum(result, metric(sim1, sim2), out=result)
+        return result
+
+    return distance
+
+
+def audit_palettes(
+    palettes,
+    metric=DEFAULT_METRIC,
+    threshold=DEFAULT_CVD_THRESHOLD,
+    deficiencies=CVD_TYPES,
+):
+    """Smallest pairwise ΔE of every palette under normal and simulated vision.
+
+    Args:
+        palettes: Dict of palette name to list of hex colors
+        metric: Name of the distance metric in ``metrics.METRICS``
+        threshold: ΔE below which a palette is flagged
+        deficiencies: Names in ``CVD_MATRICES`` to simulate
+
+    Returns:
+        Dict of palette name to a dict with, for "normal" and each
+        deficiency, ``{"min_delta_e", "closest", "flagged"}``, where
+        ``closest`` is the hex pair at that distance. Palettes with fewer
+        than two distinct colors are left out.
+    """
+    distance = get_metric(metric)
+    candidates = PaletteCandidates(
+        [hex_color for colors in palettes.values() for hex_color in colors]
+    )
+    views = {"normal": candidates.lab}
+    views.update(zip(deficiencies, simulate_lab(candidates.lab, deficiencies)))
+    matrices = {view: distance(lab, lab) for view, lab in views.items()}
+
+    audit = {}
+    for name, colors in palettes.items():
+        colors = list(dict.fromkeys(colors))
+        if len(colors) < 2:
+            continue
+        rows = candidates.indices(colors)
+        upper = np.triu_indices(len(rows), k=1)
+        audit[name] = {}
+        for view, matrix in matrices.items():
+            pairs = matrix[np.ix_(rows, rows)][upper]
+            closest = int(np.argmin(pairs))
+            audit[name][view] = {
+                "min_delta_e": float(pairs[closest]),
+                "closest": [colors[upper[0][closest]], colors[upper[1][closest]]],
+                "flagged": bool(pairs[closest] < threshold),
+            }
+    return audit
+
+
+def flagged_palettes(audit, deficiencies=CVD_TYPES):
+    """``(palette, deficiency)`` pairs of ``audit`` below the threshold."""
+    return [
+        (name, view)
+        for name, views in audit.items()
+        for view in deficiencies
+        if view in views and views[view]["flagged"]
+    ]
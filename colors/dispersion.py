@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Max-min dispersion: pick colors whose smallest pairwise ΔE is as large as possible.
+
+Some colors are pinned and always part of the result. The free picks are
+found in three steps:
+
+1. Farthest-point sampling repeatedly adds the candidate farthest from
+   everything chosen so far. This gives a feasible starting distance.
+2. A binary search looks for the largest distance ``d`` at which a greedy
+   packing still fits all picks. The packing repeatedly adds the
+   candidate that is at least ``d`` from everything chosen, and among
+   those the closest one, which leaves the most room for later picks.
+3. Local search swaps the pick at the closest pair for the candidate
+   farthest from the rest, for as long as that increases the distance.
+
+Distances come from a callable such as ``PaletteCandidates.delta_e``.
+Pools of up to ``DENSE_MAX`` candidates get their full distance matrix
+once; larger pools compute one column per pick, so memory stays linear.
+"""
+
+import time
+
+import numpy as np
+
+# Largest candidate pool whose full distance matrix is computed up front
+DENSE_MAX = 2048
+
+
+def _greedy_picks(column, base_min, count, threshold=None):
+    """Greedy picks, as positions into the candidates.
+
+    Without ``threshold`` this is farthest-point sampling. With it, each
+    step picks the candidate whose distance to the chosen colors is the
+    smallest one still at or above ``threshold``.
+
+    Returns:
+        Tuple of (positions, smallest distance of a pick when it was made)
+    """
+    min_distance = base_min.copy()
+    picks = []
+    worst = np.inf
+    for _ in range(count):
+        if threshold is None:
+            pos = int(np.argmax(min_distance))
+            if not min_distance[pos] > -np.inf:
+                break
+        else:
+            eligible = np.flatnonzero(min_distance >= threshold)
+            if len(eligible) == 0:
+                break
+            pos = int(eligible[np.argmin(min_distance[eligible])])
+        worst = min(worst, min_distance[pos])
+        picks.append(pos)
+        np.minimum(min_distance, column(pos), out=min_distance)
+        min_distance[pos] = -np.inf
+    return picks, float(worst)
+
+
+def _swap_improve(column, base_min, picks, max_swaps, tol, deadline):
+    """Replace the pick at the closest pair while that raises its distance."""
+    picks = list(picks)
+    columns = np.column_stack([column(pos) for pos in picks])
+    for _ in range(max_swaps):
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        own = columns[picks]
+        np.fill_diagonal(own, np.inf)
+        pick_min = np.minimum(own.min(axis=1), base_min[picks])
+        worst = int(np.argmin(pick_min))
+
+        others = np.delete(columns, worst, axis=1).min(axis=1, initial=np.inf)
+        others = np.minimum(others, base_min)
+        others[picks] = -np.inf
+        best = int(np.argmax(others))
+        if not others[best] > pick_min[worst] + tol:
+            break
+        picks[worst] = best
+        columns[:, worst] = column(best)
+    return picks
+
+
+def max_min_dispersion(
+    distance,
+    pinned,
+    free,
+    size,
+    tol=0.05,
+    max_swaps=None,
+    time_budget=None,
+):
+    """Choose ``size`` rows, ``pinned`` included, maximizing the smallest ΔE.
+
+    Args:
+        distance: Callable ``(rows, cols)`` returning the (len(rows),
+            len(cols)) distance array, e.g. ``PaletteCandidates.delta_e``
+        pinned: Rows that are always chosen
+        free: Candidate rows to choose the rest from
+        size: Number of rows to return, including ``pinned``
+        tol: Precision of the binary search over the minimum distance,
+            and the smallest gain a swap must bring
+        max_swaps: Most local-search swaps (default: 4 per free pick)
+        time_budget: Optional wall-clock limit in seconds for the search
+            and the swaps. Farthest-point sampling always completes, so
+            the result is always feasible. It is deterministic when this
+            is None.
+
+    Returns:
+        Tuple of (rows, min_distance): ``pinned`` followed by the picks,
+        fewer than ``size`` if ``free`` runs out; and the smallest distance
+        between any two of them (``inf`` for fewer than two rows)
+    """
+    pinned = np.asarray(pinned, dtype=np.intp)
+    free = np.asarray(free, dtype=np.intp)
+    if size <= len(pinned):
+        rows = pinned[:size]
+    else:
+        count = min(size - len(pinned), len(free))
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        if len(pinned):
+            base_min = distance(free, pinned).min(axis=1)
+        else:
+            base_min = np.full(len(free), np.inf)
+
+        if len(free) <= DENSE_MAX:
+            matrix = distance(free, free)
+
+            def column(pos):
+                return matrix[:, pos]
+
+        else:
+
+            def column(pos):
+                return distance(free, free[[pos]])[:, 0]
+
+        picks, low = _greedy_picks(column, base_min, count)
+        if len(pinned):
+            high = float(base_min.max(initial=0.0))
+        else:
+            high = 2.0 * low
+        while np.isfinite(high) and high - low > tol:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            mid = (low + high) / 2.0
+            packed, worst = _greedy_picks(column, base_min, count, mid)
+            if len(packed) == count:
+                picks, low = packed, worst
+            else:
+                high = mid
+
+        if max_swaps is None:
+            max_swaps = 4 * count
+        if picks and (len(picks) > 1 or len(pinned)):
+            picks = _swap_improve(column, base_min, picks, max_swaps, tol, deadline)
+        rows = np.concatenate([pinned, free[picks]]).astype(np.intp)
+
+    if len(rows) < 2:
+        return rows, float("inf")
+    pairwise = distance(rows, rows)
+    np.fill_diagonal(pairwise, np.inf)
+    return rows, float(pairwise.min())
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Spatial index over LAB coordinates for radius and nearest-neighbor queries.
+
+The index is a uniform grid (cell list): every color is bucketed into a
+cube of side ``cell_size`` in LAB space, and a query only looks at the
+cells around it. For the fixed small radii used by the pipeline this is
+the cheapest exact index there is, and it needs nothing beyond numpy.
+"""
+
+import math
+
+import numpy as np
+
+from candidates import pairwise_lab_distance
+from colorspace import convert_hex_colors
+from metrics import BOUNDED, EMBEDDINGS, get_metric
+from run_report import count
+
+# A query switches to measuring every point once its neighborhood covers
+# 1 / EXHAUSTIVE_SHARE of the occupied cells
+EXHAUSTIVE_SHARE = 16
+
+# Distances per dense block in the exhaustive search
+EXHAUSTIVE_BLOCK = 262_144
+
+# Candidates beyond k that the exhaustive search measures exactly
+EXHAUSTIVE_SLACK = 8
+
+# Points a StreamingSuppressor screens against the kept ones at a time
+SCREEN_BLOCK = 64
+
+
+class LabIndex:
+    """Uniform-grid index over an (n, 3) array of LAB points.
+
+    Args:
+        lab: (n, 3) LAB array
+        cell_size: Edge length of a grid cell in ΔE units
+    """
+
+    def __init__(self, lab, cell_size=5.0):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.lab = np.ascontiguousarray(lab, dtype=np.float64).reshape(-1, 3)
+        self.cell_size = float(cell_size)
+
+        cells = np.floor(self.lab / self.cell_size).astype(np.int64)
+        self._origin = cells.min(axis=0) if len(cells) else np.zeros(3, np.int64)
+        self._shape = (
+            cells.max(axis=0) - self._origin + 1 if len(cells) else np.ones(3, np.int64)
+        )
+
+        keys = self._cell_keys(cells)
+        self._order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self._order]
+        self._keys, self._starts = np.unique(sorted_keys, return_index=True)
+        self._ends = np.append(self._starts[1:], len(sorted_keys))
+
+    def __len__(self):
+        return len(self.lab)
+
+    def _cell_keys(self, cells):
+        c = cells - self._origin
+        return (c[:, 0] * self._shape[1] + c[:, 1]) * self._shape[2] + c[:, 2]
+
+    def _cells_of(self, points):
+        return np.floor(points / self.cell_size).astype(np.int64)
+
+    def _gather(self, cells, reach):
+        """Points in every cell within ``reach`` cells of each query cell.
+
+        Returns:
+            (query_ids, point_ids) arrays listing every candidate pair
+        """
+        query_ids = []
+        point_ids = []
+        span = range(-reach, reach + 1)
+        for offset in ((dx, dy, dz) for dx in span for dy in span for dz in span):
+            neighbor = cells + np.array(offset, dtype=np.int64)
+            inside = np.all(
+                (neighbor >= self._origin) & (neighbor < self._origin + self._shape),
+                axis=1,
+            )
+            queries = np.flatnonzero(inside)
+            if len(queries) == 0:
+                continue
+            keys = self._cell_keys(neighbor[queries])
+            pos = np.searchsorted(self._keys, keys)
+            pos = np.minimum(pos, len(self._keys) - 1)
+            found = self._keys[pos] == keys
+            queries, pos = queries[found], pos[found]
+            counts = self._ends[pos] - self._starts[pos]
+            if counts.sum() == 0:
+                continue
+            # Expand each (query, cell) pair into one entry per point in the cell
+            first = np.repeat(self._starts[pos] - np.cumsum(counts) + counts, counts)
+            slots = first + np.arange(counts.sum())
+            query_ids.append(np.repeat(queries, counts))
+            point_ids.append(self._order[slots])
+        if not query_ids:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty
+        return np.concatenate(query_ids), np.concatenate(point_ids)
+
+    def _reach(self, radius):
+        return max(1, int(math.ceil(radius / self.cell_size)))
+
+    def query_radius(self, point, radius):
+        """Indices of all points strictly closer than ``radius`` to ``point``.
+
+        Returns:
+            Sorted array of point indices
+        """
+        point = np.asarray(point, dtype=np.float64).reshape(1, 3)
+        if len(self.lab) == 0:
+            return np.empty(0, dtype=np.intp)
+        _, ids = self._gather(self._cells_of(point), self._reach(radius))
+        distances = pairwise_lab_distance(point, self.lab[ids])[0]
+        return np.sort(ids[distances < radius])
+
+    def query_pairs(self, radius):
+        """All pairs ``(i, j)`` with ``j < i`` that are closer than ``radius``.
+
+        Returns:
+            (i, j) index arrays, sorted by ``i`` and then ``j``
+        """
+        if len(self.lab) == 0:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty
+        i, j = self._gather(self._cells_of(self.lab), self._reach(radius))
+        earlier = j < i
+        i, j = i[earlier], j[earlier]
+        d = self._pair_distances(i, j)
+        i, j = i[d < radius], j[d < radius]
+        order = np.lexsort((j, i))
+        return i[order], j[order]
+
+    def _pair_distances(self, i, j):
+        diff = self.lab[i] - self.lab[j]
+        return np.sqrt(diff[:, 0] ** 2 + diff[:, 1] ** 2 + diff[:, 2] ** 2)
+
+    def greedy_suppress(self, radius):
+        """Greedy first-wins suppression of near duplicates.
+
+        Points are visited in index order; a point is kept unless it is
+        closer than ``radius`` to a point that was already kept. This is
+        the same result as comparing every point against the kept list,
+        but only pairs that share a neighborhood are ever measured.
+
+        Returns:
+            Boolean keep mask of length n
+        """
+        n = len(self.lab)
+        i, j = self.query_pairs(radius)
+        bounds = np.searchsorted(i, np.arange(n + 1)).tolist()
+        earlier = j.tolist()
+
+        keep = [True] * n
+        for point in range(n):
+            for other in earlier[bounds[point] : bounds[point + 1]]:
+                if keep[other]:
+                    keep[point] = False
+                    break
+        return np.array(keep, dtype=bool)
+
+    def query_knn(self, points, k=1):
+        """Exact k nearest neighbors for a batch of query points.
+
+        The neighborhood around each query grows one ring of cells at a
+        time until its k-th candidate is provably the k-th nearest point.
+        Once a neighborhood would hold a sizable share of the index, the
+        remaining queries are measured against every point instead, in
+        dense blocks (``_knn_exhaustive``).
+
+        Args:
+            points: (m, 3) LAB array of query points
+            k: Number of neighbors per query
+
+        Returns:
+            Tuple of (distances, indices), both (m, k); rows are ordered by
+            increasing distance, ties broken by index. Missing neighbors
+            (k larger than the index) are padded with ``inf`` and -1.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        m = len(points)
+        distances = np.full((m, k), np.inf)
+        indices = np.full((m, k), -1, dtype=np.intp)
+        if m == 0 or len(self.lab) == 0 or k <= 0:
+            return distances, indices
+
+        k_found = min(k, len(self.lab))
+        cells = self._cells_of(points)
+        pending = np.arange(m)
+        reach = 1
+        while len(pending):
+            if (2 * reach + 1) ** 3 * EXHAUSTIVE_SHARE >= len(self._keys):
+                # The neighborhood now spans a large share of the occupied
+                # cells; one dense block per chunk of queries is cheaper
+                # than gathering and sorting candidate pairs.
+                d, ids = self._knn_exhaustive(points[pending], k_found)
+                distances[pending, :k_found] = d
+                indices[pending, :k_found] = ids
+                break
+            batch, pending = pending, pending[:0]
+            q, ids = self._gather(cells[batch], reach)
+            reach += 1
+            d = self._pair_distances_to(points[batch][q], ids)
+
+            order = np.lexsort((ids, d, q))
+            q, ids, d = q[order], ids[order], d[order]
+            starts = np.searchsorted(q, np.arange(len(batch)))
+            counts = np.bincount(q, minlength=len(batch))
+            rank = np.arange(len(q)) - np.repeat(starts, counts)
+            top = rank < k_found
+
+            # A neighbor found within reach * cell_size is certainly among the
+            # true nearest; anything farther may be beaten by an unseen cell.
+            kth = np.full(len(batch), np.inf)
+            has_k = counts >= k_found
+            kth[has_k] = d[starts[has_k] + k_found - 1]
+            done = has_k & (kth <= (reach - 1) * self.cell_size)
+
+            sel = top & done[q]
+            rows = batch[q[sel]]
+            distances[rows, rank[sel]] = d[sel]
+            indices[rows, rank[sel]] = ids[sel]
+
+            pending = np.concatenate([batch[~done], pending])
+        return distances, indices
+
+    def _knn_exhaustive(self, points, k):
+        """k nearest neighbors of ``points`` by measuring every point.
+
+        Squared distances are first screened in (chunk, n) blocks through
+        the matrix-product expansion |p|² + |q|² - 2 p·q, which is fast
+        but not exact. The ``k + EXHAUSTIVE_SLACK`` closest candidates of
+        each query are then measured exactly. A query whose k-th exact
+        distance is not clearly below every screened-out candidate, e.g.
+        because of ties, is measured against all points instead, so the
+        result always equals the exact search, ties broken by index.
+
+        Returns:
+            Tuple of (distances, indices), both (len(points), k)
+        """
+        n = len(self.lab)
+        distances = np.empty((len(points), k))
+        indices = np.empty((len(points), k), dtype=np.intp)
+        screened = min(n, k + EXHAUSTIVE_SLACK)
+        lab_sq = np.einsum("ij,ij->i", self.lab, self.lab)
+        chunk = max(1, EXHAUSTIVE_BLOCK // n)
+        for start in range(0, len(points), chunk):
+            block = points[start : start + chunk]
+            rows = np.arange(start, start + len(block))
+            block_sq = np.einsum("ij,ij->i", block, block)
+            approx = block @ self.lab.T
+            approx *= -2.0
+            approx += block_sq[:, None]
+            approx += lab_sq
+            count("distance_evaluations", approx.size)
+
+            if screened < n:
+                cand = np.argpartition(approx, screened - 1, axis=1)[:, :screened]
+                bound = np.take_along_axis(approx, cand, axis=1).max(axis=1)
+            else:
+                cand = np.broadcast_to(np.arange(n), approx.shape)
+                bound = np.full(len(block), np.inf)
+            d = self._pair_distances_to(
+                np.repeat(block, screened, axis=0), cand.ravel()
+            ).reshape(len(block), screened)
+            order = np.lexsort((cand, d))
+            d = np.take_along_axis(d, order, axis=1)[:, :k]
+            cand = np.take_along_axis(cand, order, axis=1)[:, :k]
+
+            # Every screened-out point has an expanded distance of at least
+            # ``bound``; allow for the rounding error of the expansion.
+            margin = 1e-9 * (1.0 + block_sq.max() + lab_sq.max())
+            exact = d[:, -1] ** 2 * (1.0 + 1e-9) + margin < bound
+            distances[rows[exact]] = d[exact]
+            indices[rows[exact]] = cand[exact]
+            if not exact.all():
+                retry = rows[~exact]
+                distances[retry], indices[retry] = self._knn_dense(points[retry], k)
+        return distances, indices
+
+    def _knn_dense(self, points, k):
+        """k nearest neighbors from the exact distances to every point."""
+        n = len(self.lab)
+        d = np.empty((len(points), n))
+        for axis in range(3):
+            diff = self.lab[:, axis] - points[:, axis, None]
+            if axis == 0:
+                np.square(diff, out=d)
+            else:
+                d += diff * diff
+        np.sqrt(d, out=d)
+        count("distance_evaluations", d.size)
+
+        kth = np.partition(d, k - 1, axis=1)[:, k - 1]
+        rows, cols = np.nonzero(d <= kth[:, None])
+        near = d[rows, cols]
+        order = np.lexsort((cols, near, rows))
+        rows, cols, near = rows[order], cols[order], near[order]
+        starts = np.searchsorted(rows, np.arange(len(points)))
+        rank = np.arange(len(rows)) - starts[rows]
+        top = rank < k
+        distances = np.empty((len(points), k))
+        indices = np.empty((len(points), k), dtype=np.intp)
+        distances[rows[top], rank[top]] = near[top]
+        indices[rows[top], rank[top]] = cols[top]
+        return distances, indices
+
+    def _pair_distances_to(self, query_points, ids):
+        diff = self.lab[ids] - query_points
+        return np.sqrt(diff[:, 0] ** 2 + diff[:, 1] ** 2 + diff[:, 2] ** 2)
+
+
+class StreamingSuppressor:
+    """Incremental form of ``LabIndex.greedy_suppress`` for streamed points.
+
+    Points arrive one batch at a time and only the kept ones are stored,
+    bucketed into a grid of side ``cell_size``, so memory grows with the
+    number of survivors rather than with the input. Given the same points in
+    the same order the keep decisions equal ``greedy_suppress(radius)``.
+
+    A metric named in ``metrics.EMBEDDINGS`` (CAM16-UCS) uses the same grid
+    in its own space. One in ``metrics.BOUNDED`` (CIE94, CIEDE2000) has no
+    grid neighborhood; blocks of ``SCREEN_BLOCK`` points are screened
+    against every kept point with CIE76-based bounds, and the metric only
+    runs on the pairs the bounds cannot settle. The screen is still linear
+    in the kept points, but at a few arithmetic operations per pair. Any
+    other metric function compares each point against every kept point,
+    which is quadratic in the input.
+
+    Args:
+        radius: Points closer than this to a kept point are dropped
+        cell_size: Grid cell edge length; defaults to ``radius``
+        metric: Optional name in ``metrics.METRICS`` or pairwise distance
+            function over LAB arrays; None uses Euclidean LAB distance
+    """
+
+    def __init__(self, radius, cell_size=None, metric=None):
+        self._embedding = None
+        self._bounded = None
+        if isinstance(metric, str):
+            self._embedding = EMBEDDINGS.get(metric)
+            self._bounded = BOUNDED.get(metric)
+            metric = get_metric(metric)
+        self.radius = float(radius)
+        self.cell_size = float(radius if cell_size is None else cell_size)
+        if self.cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self._reach = max(1, int(math.ceil(self.radius / self.cell_size)))
+        self._cells = {}
+        self.kept = 0
+        self.comparisons = 0
+        self.metric = metric
+        self._kept_points = np.empty((16, 3))
+
+    def __len__(self):
+        return self.kept
+
+    def _near_kept(self, point, cell):
+        span = range(-self._reach, self._reach + 1)
+        cx, cy, cz = cell
+        L, a, b = point
+        for dx in span:
+            for dy in span:
+                for dz in span:
+                    bucket = self._cells.get((cx + dx, cy + dy, cz + dz), ())
+                    self.comparisons += len(bucket)
+                    for kL, ka, kb in bucket:
+                        d = math.sqrt((L - kL) ** 2 + (a - ka) ** 2 + (b - kb) ** 2)
+                        if d < self.radius:
+                            return True
+        return False
+
+    def add(self, points):
+        """Offer a batch of points in order.
+
+        Args:
+            points: (n, 3) LAB array
+
+        Returns:
+            Boolean keep mask of length n
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        before = self.comparisons
+        if self._embedding is not None:
+            keep = self._add_with_grid(self._embedding(points))
+        elif self._bounded is not None:
+            keep = self._add_screened(points)
+        elif self.metric is not None:
+            keep = self._add_with_metric(points)
+        else:
+            keep = self._add_with_grid(points)
+        count("distance_evaluations", self.comparisons - before)
+        return keep
+
+    def _add_with_grid(self, points):
+        cells = np.floor(points / self.cell_size).astype(np.int64).tolist()
+        keep = []
+        for point, cell in zip(points.tolist(), cells):
+            kept = not self._near_kept(point, cell)
+            if kept:
+                self._cells.setdefault(tuple(cell), []).append(tuple(point))
+                self.kept += 1
+            keep.append(kept)
+        return np.array(keep, dtype=bool)
+
+    def _keep_points(self, points):
+        while self.kept + len(points) > len(self._kept_points):
+            self._kept_points = np.concatenate(
+                [self._kept_points, np.empty_like(self._kept_points)]
+            )
+        self._kept_points[self.kept : self.kept + len(points)] = points
+        self.kept += len(points)
+
+    def _add_with_metric(self, points):
+        keep = np.zeros(len(points), dtype=bool)
+        for i, point in enumerate(points):
+            kept = self._kept_points[: self.kept]
+            self.comparisons += self.kept
+            if self.kept and (self.metric(point[None, :], kept)[0] < self.radius).any():
+                continue
+            self._keep_points(point[None, :])
+            keep[i] = True
+        return keep
+
+    def _close_pairs(self, points, others):
+        """(n, m) mask of the pairs closer than ``radius`` under the metric."""
+        kernel, bounds = self._bounded
+        lower, upper = bounds(points[:, None, :], others[None, :, :])
+        close = upper < self.radius
+        rows, cols = np.nonzero((lower < self.radius) & ~close)
+        self.comparisons += len(rows)
+        close[rows, cols] = kernel(points[rows], others[cols]) < self.radius
+        return close
+
+    def _add_screened(self, points):
+        keep = np.zeros(len(points), dtype=bool)
+        for start in range(0, len(points), SCREEN_BLOCK):
+            block = points[start : start + SCREEN_BLOCK]
+            rows = np.arange(len(block))
+            if self.kept:
+                near = self._close_pairs(block, self._kept_points[: self.kept])
+                rows = np.flatnonzero(~near.any(axis=1))
+            # Greedy pass over the block's survivors, in input order
+            close = self._close_pairs(block[rows], block[rows])
+            chosen = []
+            for i in range(len(rows)):
+                if not close[i, chosen].any():
+                    chosen.append(i)
+            self._keep_points(block[rows[chosen]])
+            keep[start + rows[chosen]] = True
+        return keep
+
+
+class ColorIndex:
+    """LAB spatial index over a list of hex colors.
+
+    Args:
+        hex_colors: Sequence of hex color strings
+        cell_size: Grid cell size in ΔE units (default 5.0)
+    """
+
+    def __init__(self, hex_colors, cell_size=5.0):
+        self.hex_colors = list(hex_colors)
+        self.lab = convert_hex_colors(self.hex_colors)["lab"]
+        self.index = LabIndex(self.lab, cell_size=cell_size)
+
+    def __len__(self):
+        return len(self.hex_colors)
+
+    def suppress_near_duplicates(self, min_distance=5.0):
+        """Keep mask after greedy first-wins removal of colors closer than
+        ``min_distance`` to an earlier kept color."""
+        return self.index.greedy_suppress(min_distance)
+
+    def nearest_colors(self, hex_color, k=5):
+        """The ``k`` indexed colors closest to ``hex_color``.
+
+        Returns:
+            List of (hex, ΔE) tuples ordered by increasing distance
+        """
+        lab = convert_hex_colors([hex_color])["lab"]
+        distances, indices = self.index.query_knn(lab, k)
+        return [
+            (self.hex_colors[i], float(d))
+            for d, i in zip(distances[0].tolist(), indices[0].tolist())
+            if i >= 0
+        ]
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Long-lived local lookup server over the built Chinese color table.
+
+The server loads ``data/chinese_colors.rda`` (the table and color sets
+written by ``ChineseColors.py``) and ``data/palette_list.rda`` once. It
+then keeps these in memory:
+
+- hash indexes from number, hex code and every name column to table rows,
+  and from hex code to the palettes that contain it
+- a ``NamedColorIndex`` over the table colors for nearest-color queries
+- warm ``PaletteGenerator`` instances, so "generate n colors" requests
+  reuse the candidate arrays and every palette already generated
+
+Requests are JSON over HTTP/1.1 with keep-alive, either on localhost TCP
+or on a Unix socket:
+
+  GET  /health                            table and palette counts
+  POST /lookup    {"queries": [...]}      like R's get_colors(), batched
+  POST /nearest   {"colors": [...], "k": 3}
+  POST /generate  {"n": 12, "engine": "hue", "metric": "cie76"}
+
+Usage:
+  python3 colors/lookup_server.py --port 8765
+  python3 colors/lookup_server.py --socket /tmp/chinese_colors.sock
+  curl -s localhost:8765/lookup -d '{"queries": ["pinlan", 44, "ChineseSet8"]}'
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from ChineseColors import BASE_CHINESE_COLORS, PALETTE_ENGINES, palette_generator
+from metrics import DEFAULT_METRIC, METRICS
+from named_colors import NamedColorIndex, table_columns
+from rda import read_rda
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+NAME_COLUMNS = ("name", "name_ch", "category", "category_ch")
+
+# Largest palette a /generate request may ask for
+MAX_GENERATE = 1024
+
+
+class RequestError(ValueError):
+    """A request the server cannot answer; sent back as HTTP 400."""
+
+
+class ColorTable:
+    """In-memory indexes over the color table and its palettes.
+
+    Args:
+        table: ``chinese_colors`` RObject as read by ``rda.read_rda``
+        palettes: Optional dict of palette name to list of hex codes,
+            searched in addition to the table's own color sets
+        metric: Metric the table's color sets were built with; palettes
+            generated without an explicit metric use it
+    """
+
+    def __init__(self, table, palettes=None, metric=DEFAULT_METRIC):
+        self.columns = table_columns(table)
+        self.rows = [
+            dict(zip(self.columns, values)) for values in zip(*self.columns.values())
+        ]
+        self.hex_colors = [hex_color.upper() for hex_color in self.columns["hex"]]
+        self.metric = metric
+
+        color_sets = table.attributes.get("color_sets")
+        self.palettes = dict(palettes or {})
+        if color_sets is not None:
+            names = color_sets.attributes["names"].values
+            self.palettes.update(
+                (name, colors.values) for name, colors in zip(names, color_sets.values)
+            )
+
+        self.by_num = {num: row for row, num in enumerate(self.columns["num"])}
+        self.by_hex = {}
+        for row, hex_color in enumerate(self.hex_colors):
+            self.by_hex.setdefault(hex_color, []).append(row)
+        self.by_name = {}
+        for column in NAME_COLUMNS:
+            for row, value in enumerate(self.columns.get(column, ())):
+                self.by_name.setdefault(value, []).append(row)
+        self.palettes_of = {}
+        for name, colors in self.palettes.items():
+            for hex_color in dict.fromkeys(c.upper() for c in colors):
+                self.palettes_of.setdefault(hex_color, []).append(name)
+
+        self.named = NamedColorIndex(self.columns)
+        self._generate_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, data_dir=DATA_DIR, metric=DEFAULT_METRIC):
+        """Table from ``chinese_colors.rda`` plus ``palette_list.rda`` if present."""
+        data_dir = Path(data_dir)
+        table = read_rda(data_dir / "chinese_colors.rda")["chinese_colors"]
+        palettes = {}
+        palette_path = data_dir / "palette_list.rda"
+        if palette_path.exists():
+            palette_list = read_rda(palette_path)["palette_list"]
+            names = palette_list.attributes["names"].values
+            palettes = {
+                name: colors.values for name, colors in zip(names, palette_list.values)
+            }
+        return cls(table, palettes, metric=metric)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _record(self, row):
+        record = dict(self.rows[row])
+        record["palettes"] = self.palettes_of.get(self.hex_colors[row], [])
+        return record
+
+    def _rows_for(self, query):
+        if isinstance(query, (int, float)) and not isinstance(query, bool):
+            row = self.by_num.get(query)
+            return [] if row is None else [row]
+        query = str(query)
+        if query.startswith("#"):
+            return list(self.by_hex.get(query.upper(), []))
+        try:
+            row = self.by_num.get(float(query))
+        except ValueError:
+            return list(self.by_name.get(query, []))
+        return [] if row is None else [row]
+
+    def lookup(self, queries):
+        """Resolve each query by palette name, number, hex code or name.
+
+        The order of checks follows R's ``get_colors``: palette names
+        first, then exact matches on any table column.
+
+        Returns:
+            List with one dict per query. A palette hit has ``palette`` with
+            its hex codes; otherwise ``colors`` lists the matching table
+            records, each with the palettes that contain it.
+        """
+        results = []
+        for query in queries:
+            if isinstance(query, str) and query in self.palettes:
+                results.append({"query": query, "palette": self.palettes[query]})
+            else:
+                rows = self._rows_for(query)
+                results.append(
+                    {"query": query, "colors": [self._record(row) for row in rows]}
+                )
+        return results
+
+    def nearest(self, hex_colors, k=1):
+        """The ``k`` table colors closest (CIE76) to each of ``hex_colors``.
+
+        Returns:
+            List with one list per query of records with a ``delta_e`` field
+        """
+        if not hex_colors:
+            return []
+        try:
+            distances, indices = self.named.query(hex_colors, k)
+        except (AttributeError, TypeError, ValueError) as e:
+            raise RequestError(f"Invalid color: {e}") from None
+        return [
+            [
+                {**self._record(i), "delta_e": d}
+                for d, i in zip(row_distances, row_indices)
+                if i >= 0
+            ]
+            for row_distances, row_indices in zip(distances.tolist(), indices.tolist())
+        ]
+
+    def generate(self, n, engine="hue", metric=None):
+        """``n`` colors interpolated from the table, as ``ChineseSet<n>`` is."""
+        engine = "hue" if engine is None else engine
+        metric = self.metric if metric is None else metric
+        if not isinstance(engine, str):
+            raise RequestError('"engine" must be a string')
+        if not isinstance(metric, str):
+            raise RequestError('"metric" must be a string')
+        if engine not in PALETTE_ENGINES:
+            raise RequestError(f"Unknown palette engine: {engine}")
+        if metric not in METRICS:
+            raise RequestError(f"Unknown metric: {metric}")
+        with self._generate_lock:
+            generator = palette_generator(
+                self.hex_colors, base=BASE_CHINESE_COLORS, metric=metric
+            )
+            return generator.palette(n, engine=engine)
+
+    def warm(self, sizes, engine="hue"):
+        """Generate ``sizes`` up front, so the first requests find them ready."""
+        for size in sizes:
+            self.generate(size, engine=engine)
+
+
+def _int_field(request, name, default, low, high):
+    value = request.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise RequestError(f'"{name}" must be an integer')
+    if not low <= value <= high:
+        raise RequestError(f'"{name}" must be between {low} and {high}')
+    return value
+
+
+class LookupHandler(BaseHTTPRequestHandler):
+    """JSON request handler; the ``ColorTable`` is ``self.server.table``."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            table = self.server.table
+            self._send(200, {"colors": len(table), "palettes": len(table.palettes)})
+        else:
+            self._send(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise RequestError("Request body must be a JSON object")
+            body = self._answer(request)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            self._send(400, {"error": f"Invalid JSON: {e}"})
+        except RequestError as e:
+            self._send(400, {"error": str(e)})
+        else:
+            self._send(200, body)
+
+    def _answer(self, request):
+        table = self.server.table
+        if self.path == "/lookup":
+            queries = request.get("queries", [])
+            if not isinstance(queries, list):
+                queries = [queries]
+            return {"results": table.lookup(queries)}
+        if self.path == "/nearest":
+            colors = request.get("colors", [])
+            if not isinstance(colors, list):
+                colors = [colors]
+            k = _int_field(request, "k", 1, 1, len(table))
+            return {"results": table.nearest(colors, k)}
+        if self.path == "/generate":
+            n = _int_field(request, "n", None, 1, MAX_GENERATE)
+            colors = table.generate(
+                n,
+                engine=request.get("engine", "hue"),
+                metric=request.get("metric"),
+            )
+            return {"colors": colors}
+        raise RequestError(f"Unknown path: {self.path}")
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """``ThreadingHTTPServer`` counterpart listening on a Unix socket."""
+
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        return request, ("local", 0)
+
+
+def make_server(table, port=8765, socket_path=None, verbose=False):
+    """HTTP server answering lookups from ``table``.
+
+    Args:
+        table: ``ColorTable`` to serve
+        port: localhost TCP port; ignored when ``socket_path`` is given
+        socket_path: Optional Unix socket path to listen on instead
+        verbose: Log every request to stderr
+    """
+    if socket_path is not None:
+        socket_path = Path(socket_path)
+        if socket_path.is_socket():
+            socket_path.unlink()
+        server = UnixHTTPServer(str(socket_path), LookupHandler)
+    else:
+        server = ThreadingHTTPServer(("127.0.0.1", port), LookupHandler)
+    server.table = table
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve Chinese color lookups from memory over localhost HTTP or a Unix socket.",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="localhost TCP port to listen on (default: 8765)",
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=None,
+        help="Listen on this Unix socket instead of TCP",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=DATA_DIR,
+        help="Directory with chinese_colors.rda and palette_list.rda (default: data/)",
+    )
+    parser.add_argument(
+        "--metric",
+        choices=list(METRICS),
+        default=DEFAULT_METRIC,
+        help="Metric the table's color sets were built with, used by /generate (default: cie76)",
+    )
+    parser.add_argument(
+        "--warm",
+        default="16,32,64,128",
+        help="Comma-separated palette sizes to generate at startup (default: 16,32,64,128)",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        default=False,
+        help="Log every request to stderr (default: False)",
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        table = ColorTable.load(args.data_dir, metric=args.metric)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Error: cannot load the color table from {args.data_dir}: {e}")
+        return 1
+    table.warm(int(size) for size in args.warm.split(",") if size)
+    server = make_server(table, args.port, args.socket, args.verbose)
+    where = args.socket if args.socket is not None else f"http://127.0.0.1:{args.port}"
+    print(
+        f"Serving {len(table)} colors and {len(table.palettes)} palettes on {where} "
+        f"(ready in {time.perf_counter() - start:.2f} s)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket is not None and args.socket.is_socket():
+            os.unlink(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
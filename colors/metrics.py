@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Pluggable perceptual color-difference metrics, vectorized over LAB arrays.
+
+Every metric takes two LAB arrays of shape (n, 3) and (m, 3). It returns the
+full (n, m) matrix of color differences, so it can stand in for
+``pairwise_lab_distance`` wherever a precomputed distance matrix is built.
+The metrics are:
+
+- ``cie76``: Euclidean distance in CIELAB. This is the default, and the
+  pipeline's thresholds were tuned for it.
+- ``cie94``: CIE94 with the graphic-arts weights. It is made symmetric by
+  using the geometric mean chroma of the pair, as CIE 116 allows when
+  neither color is the reference.
+- ``ciede2000``: CIEDE2000 with kL = kC = kH = 1.
+- ``cam16ucs``: Euclidean distance in CAM16-UCS (J', a', b'). It uses
+  sRGB viewing conditions: D65, L_A = 64/π/5 cd/m², Y_b = 20 and an
+  average surround.
+
+Large matrices are computed in row blocks, so the per-element temporaries
+of CIEDE2000 stay bounded however many colors are compared.
+
+Callers that only need to know which pairs are closer than a radius can
+avoid most of the metric's cost. ``EMBEDDINGS`` lists the metrics that are
+Euclidean distances in some space, with the conversion from LAB into it.
+``BOUNDED`` gives CIE94 and CIEDE2000 as an elementwise kernel plus
+lower and upper bounds built from the CIE76 components of each pair.
+"""
+
+import numpy as np
+
+from candidates import pairwise_lab_distance
+from colorspace import WHITE_D65
+
+DEFAULT_METRIC = "cie76"
+
+# Upper bound on elements per intermediate array in the blocked metrics
+_BLOCK_ELEMENTS = 1 << 20
+
+# Relative widening of the bounds, so rounding never puts a distance
+# outside them
+_BOUND_SLACK = 1e-9
+
+# Largest |sin(2 Δθ)| in CIEDE2000's rotation term (Δθ <= 30°)
+_SIN_60 = np.sin(np.radians(60.0))
+
+
+def _as_lab(lab):
+    return np.asarray(lab, dtype=np.float64).reshape(-1, 3)
+
+
+def _pairwise_blocks(kernel, lab1, lab2):
+    """Apply an elementwise ``kernel(lab1, lab2)`` to every pair of rows."""
+    lab1 = _as_lab(lab1)
+    lab2 = _as_lab(lab2)
+    out = np.empty((len(lab1), len(lab2)))
+    block = max(1, _BLOCK_ELEMENTS // max(len(lab2), 1))
+    for start in range(0, len(lab1), block):
+        stop = start + block
+        out[start:stop] = kernel(lab1[start:stop, None, :], lab2[None, :, :])
+    return out
+
+
+def delta_e_cie76(lab1, lab2):
+    """CIE76 ΔE*ab (Euclidean LAB distance) between all rows."""
+    return pairwise_lab_distance(_as_lab(lab1), _as_lab(lab2))
+
+
+def _cie94(lab1, lab2):
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+    C1 = np.hypot(a1, b1)
+    C2 = np.hypot(a2, b2)
+    dL = L1 - L2
+    dC = C1 - C2
+    dH2 = np.maximum((a1 - a2) ** 2 + (b1 - b2) ** 2 - dC**2, 0.0)
+    C = np.sqrt(C1 * C2)
+    SC = 1.0 + 0.045 * C
+    SH = 1.0 + 0.015 * C
+    return np.sqrt(dL**2 + (dC / SC) ** 2 + dH2 / SH**2)
+
+
+def _lab_components(lab1, lab2):
+    """Squared ΔL, squared Δa*b* distance and the chroma of both colors."""
+    dL2 = (lab1[..., 0] - lab2[..., 0]) ** 2
+    dab2 = (lab1[..., 1] - lab2[..., 1]) ** 2 + (lab1[..., 2] - lab2[..., 2]) ** 2
+    C1 = np.hypot(lab1[..., 1], lab1[..., 2])
+    C2 = np.hypot(lab2[..., 1], lab2[..., 2])
+    return dL2, dab2, C1, C2
+
+
+def _widen(lower, upper):
+    return lower * (1.0 - _BOUND_SLACK), upper * (1.0 + _BOUND_SLACK)
+
+
+def _cie94_bounds(lab1, lab2):
+    """Lower and upper bounds of ``_cie94`` for each pair.
+
+    ΔC² + ΔH² is the squared a*b* distance, and 1 <= SH <= SC, so the
+    chroma and hue terms together lie between that distance over SC² and
+    the distance itself.
+    """
+    dL2, dab2, C1, C2 = _lab_components(lab1, lab2)
+    SC = 1.0 + 0.045 * np.sqrt(C1 * C2)
+    return _widen(np.sqrt(dL2 + dab2 / SC**2), np.sqrt(dL2 + dab2))
+
+
+def delta_e_cie94(lab1, lab2):
+    """Symmetric CIE94 ΔE*94 (graphic arts weights) between all rows."""
+    return _pairwise_blocks(_cie94, lab1, lab2)
+
+
+def _ciede2000(lab1, lab2):
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    C_mean = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2.0
+    C7 = C_mean**7
+    G = 0.5 * (1.0 - np.sqrt(C7 / (C7 + 25.0**7)))
+    a1p = (1.0 + G) * a1
+    a2p = (1.0 + G) * a2
+    C1p = np.hypot(a1p, b1)
+    C2p = np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360.0
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360.0
+
+    chroma_product = C1p * C2p
+    achromatic = chroma_product == 0
+
+    dLp = L2 - L1
+    dCp = C2p - C1p
+    dhp = h2p - h1p
+    dhp = np.where(dhp > 180.0, dhp - 360.0, np.where(dhp < -180.0, dhp + 360.0, dhp))
+    dhp = np.where(achromatic, 0.0, dhp)
+    dHp = 2.0 * np.sqrt(chroma_product) * np.sin(np.radians(dhp) / 2.0)
+
+    Lp_mean = (L1 + L2) / 2.0
+    Cp_mean = (C1p + C2p) / 2.0
+    h_sum = h1p + h2p
+    hp_mean = np.where(
+        np.abs(h1p - h2p) <= 180.0,
+        h_sum / 2.0,
+        np.where(h_sum < 360.0, (h_sum + 360.0) / 2.0, (h_sum - 360.0) / 2.0),
+    )
+    hp_mean = np.where(achromatic, h_sum, hp_mean)
+
+    T = (
+        1.0
+        - 0.17 * np.cos(np.radians(hp_mean - 30.0))
+        + 0.24 * np.cos(np.radians(2.0 * hp_mean))
+        + 0.32 * np.cos(np.radians(3.0 * hp_mean + 6.0))
+        - 0.20 * np.cos(np.radians(4.0 * hp_mean - 63.0))
+    )
+    d_theta = 30.0 * np.exp(-(((hp_mean - 275.0) / 25.0) ** 2))
+    Cp7 = Cp_mean**7
+    RC = 2.0 * np.sqrt(Cp7 / (Cp7 + 25.0**7))
+    L50 = (Lp_mean - 50.0) ** 2
+    SL = 1.0 + 0.015 * L50 / np.sqrt(20.0 + L50)
+    SC = 1.0 + 0.045 * Cp_mean
+    SH = 1.0 + 0.015 * Cp_mean * T
+    RT = -np.sin(np.radians(2.0 * d_theta)) * RC
+
+    lightness = dLp / SL
+    chroma = dCp / SC
+    hue = dHp / SH
+    return np.sqrt(lightness**2 + chroma**2 + hue**2 + RT * chroma * hue)
+
+
+def _ciede2000_bounds(lab1, lab2):
+    """Lower and upper bounds of ``_ciede2000`` for each pair.
+
+    ΔC'² + ΔH'² is the squared a'b' distance, which is between 1 and
+    (1 + G)² times the a*b* one. SL is exact, 1 <= SH <= SC (T < 3) and SC
+    is at most its value for the mean chroma times 1 + G. The rotation
+    term adds at most |RT| / 2 of the chroma and hue terms, with RC taken
+    at that largest mean chroma.
+    """
+    dL2, dab2, C1, C2 = _lab_components(lab1, lab2)
+    C_mean = (C1 + C2) / 2.0
+    C7 = C_mean**7
+    stretch = 1.5 - 0.5 * np.sqrt(C7 / (C7 + 25.0**7))
+    Cp_max = stretch * C_mean
+    Cp7 = Cp_max**7
+    RT_max = 2.0 * np.sqrt(Cp7 / (Cp7 + 25.0**7)) * _SIN_60
+    L50 = ((lab1[..., 0] + lab2[..., 0]) / 2.0 - 50.0) ** 2
+    SL = 1.0 + 0.015 * L50 / np.sqrt(20.0 + L50)
+    SC_max = 1.0 + 0.045 * Cp_max
+    lower = np.sqrt(dL2 / SL**2 + (1.0 - RT_max / 2.0) * dab2 / SC_max**2)
+    upper = np.sqrt(dL2 / SL**2 + (1.0 + RT_max / 2.0) * stretch**2 * dab2)
+    return _widen(lower, upper)
+
+
+def delta_e_ciede2000(lab1, lab2):
+    """CIEDE2000 ΔE00 between all rows."""
+    return _pairwise_blocks(_ciede2000, lab1, lab2)
+
+
+def lab_to_xyz_array(lab, white=WHITE_D65):
+    """Inverse of ``colorspace.xyz_to_lab_array`` (D65, Y of white = 100)."""
+    lab = _as_lab(lab)
+    fy = (lab[:, 0] + 16.0) / 116.0
+    f = np.stack([fy + lab[:, 1] / 500.0, fy, fy - lab[:, 2] / 200.0], axis=1)
+    xyz = np.where(f > 6 / 29, f**3, 3 * (6 / 29) ** 2 * (f - 4 / 29))
+    return xyz * np.asarray(white)
+
+
+_M16 = np.array(
+    [
+        [0.401288, 0.650173, -0.051461],
+        [-0.250268, 1.204414, 0.045854],
+        [-0.002079, 0.048952, 0.953127],
+    ]
+)
+
+
+def _cam16_viewing_conditions(white=WHITE_D65, L_A=64.0 / np.pi / 5.0, Y_b=20.0):
+    F, c, N_c = 1.0, 0.69, 1.0
+    rgb_w = _M16 @ np.asarray(white)
+    D = np.clip(F * (1.0 - (1.0 / 3.6) * np.exp((-L_A - 42.0) / 92.0)), 0.0, 1.0)
+    D_rgb = D * white[1] / rgb_w + 1.0 - D
+    k = 1.0 / (5.0 * L_A + 1.0)
+    F_L = 0.2 * k**4 * (5.0 * L_A) + 0.1 * (1.0 - k**4) ** 2 * np.cbrt(5.0 * L_A)
+    n = Y_b / white[1]
+    z = 1.48 + np.sqrt(n)
+    N_bb = 0.725 * n**-0.2
+    rgb_aw = _cam16_compress(D_rgb * rgb_w, F_L)
+    A_w = (2.0 * rgb_aw[0] + rgb_aw[1] + 0.05 * rgb_aw[2] - 0.305) * N_bb
+    return {
+        "c": c,
+        "N_c": N_c,
+        "D_rgb": D_rgb,
+        "F_L": F_L,
+        "n": n,
+        "z": z,
+        "N_bb": N_bb,
+        "A_w": A_w,
+    }
+
+
+def _cam16_compress(rgb, F_L):
+    x = (F_L * np.abs(rgb) / 100.0) ** 0.42
+    return np.sign(rgb) * 400.0 * x / (x + 27.13) + 0.1
+
+
+def lab_to_cam16ucs_array(lab):
+    """Convert an (n, 3) LAB array to CAM16-UCS (J', a', b')."""
+    vc = _cam16_viewing_conditions()
+    rgb = lab_to_xyz_array(lab) @ _M16.T
+    rgb_a = _cam16_compress(rgb * vc["D_rgb"], vc["F_L"])
+    R, G, B = rgb_a[:, 0], rgb_a[:, 1], rgb_a[:, 2]
+
+    a = R - 12.0 * G / 11.0 + B / 11.0
+    b = (R + G - 2.0 * B) / 9.0
+    h = np.arctan2(b, a)
+    e_t = 0.25 * (np.cos(h + 2.0) + 3.8)
+    A = (2.0 * R + G + 0.05 * B - 0.305) * vc["N_bb"]
+    J = 100.0 * np.maximum(A / vc["A_w"], 0.0) ** (vc["c"] * vc["z"])
+    t = (50000.0 / 13.0 * vc["N_c"] * vc["N_bb"] * e_t * np.hypot(a, b)) / (
+        R + G + 21.0 * B / 20.0
+    )
+    C = t**0.9 * np.sqrt(J / 100.0) * (1.64 - 0.29 ** vc["n"]) ** 0.73
+    M = C * vc["F_L"] ** 0.25
+
+    J_ucs = 1.7 * J / (1.0 + 0.007 * J)
+    M_ucs = np.log1p(0.0228 * M) / 0.0228
+    return np.stack([J_ucs, M_ucs * np.cos(h), M_ucs * np.sin(h)], axis=1)
+
+
+def delta_e_cam16ucs(lab1, lab2):
+    """Euclidean ΔE' in CAM16-UCS between all rows."""
+    return pairwise_lab_distance(
+        lab_to_cam16ucs_array(lab1), lab_to_cam16ucs_array(lab2)
+    )
+
+
+METRICS = {
+    "cie76": delta_e_cie76,
+    "cie94": delta_e_cie94,
+    "ciede2000": delta_e_ciede2000,
+    "cam16ucs": delta_e_cam16ucs,
+}
+
+# Metrics that are Euclidean distances after converting LAB with these
+EMBEDDINGS = {
+    "cie76": _as_lab,
+    "cam16ucs": lab_to_cam16ucs_array,
+}
+
+# Metric -> (kernel, bounds): both take two broadcastable LAB arrays; the
+# kernel returns the distance of each pair and bounds its (lower, upper)
+BOUNDED = {
+    "cie94": (_cie94, _cie94_bounds),
+    "ciede2000": (_ciede2000, _ciede2000_bounds),
+}
+
+
+def get_metric(name):
+    """Pairwise distance function registered under ``name``.
+
+    Raises:
+        ValueError: If ``name`` is not one of ``METRICS``
+    """
+    try:
+        return METRICS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown color metric '{name}' (choose from {', '.join(METRICS)})"
+        ) from None
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Prefix and typo-tolerant search over the color names.
+
+The index is built once at pipeline time from the final colors and saved
+as JSON next to the CSV. It holds two structures:
+
+- a sorted key list for prefix lookups, a flattened trie searched with
+  ``bisect``. The keys of each color are its pinyin (``pinlan``), every
+  syllable-aligned suffix of it (``lan``), its syllable initials (``pl``)
+  and its Chinese name (``品蓝``), each mapping to the colors it came from
+- an inverted index of character n-grams: bigrams of the padded pinyin
+  and single characters and bigrams of the Chinese name
+
+``search`` ranks exact key matches first, then prefixes, then substrings
+and finally names within a small edit distance. Substring and fuzzy
+candidates come from the n-gram postings, and only those are compared
+character by character. Queries too short for the n-grams to bound the
+edit distance are the exception; they are length-checked against every
+name.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+
+SEARCH_FORMAT = 2
+
+# Length of the n-grams indexed for pinyin
+PINYIN_GRAM = 2
+
+# Match tiers, best first
+EXACT, PREFIX, SUBSTRING, FUZZY = range(4)
+
+_SEPARATORS = re.compile(r"[\s'’\-_]+")
+
+
+def normalize(query):
+    """Lowercase ``query`` and drop spaces, apostrophes and dashes."""
+    return _SEPARATORS.sub("", query).lower()
+
+
+def is_hanzi(text):
+    return any("㐀" <= ch <= "鿿" for ch in text)
+
+
+def _pinyin_grams(text, padded=True):
+    if padded:
+        text = f"^{text}$"
+    return {text[i : i + PINYIN_GRAM] for i in range(len(text) - PINYIN_GRAM + 1)}
+
+
+def _hanzi_grams(text):
+    return set(text) | {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+def edit_distance(a, b, limit):
+    """Edit distance of ``a`` and ``b``, or ``limit + 1`` once it is certain
+    to exceed ``limit``.
+
+    Insertions, deletions, substitutions and swaps of two adjacent
+    characters count as one edit each (optimal string alignment). Only
+    the band of cells within ``limit`` of the diagonal is computed.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    before = None
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        best = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cb = b[j - 1]
+            cost = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)
+            )
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current[j] = cost
+            best = min(best, cost)
+        if best > limit:
+            return over
+        before, previous = previous, current
+    return min(previous[-1], over)
+
+
+def default_max_edits(query):
+    """Edits tolerated for ``query``: none below 3 characters, then 1, and 2
+    from 9 characters on (Chinese names: 1 from 2 characters on)."""
+    if is_hanzi(query):
+        return 1 if len(query) >= 2 else 0
+    if len(query) < 3:
+        return 0
+    return 1 if len(query) < 9 else 2
+
+
+class NameSearchIndex:
+    """Search index over color names.
+
+    Args:
+        entries: List of ``(num, name, name_ch, syllables)`` tuples, where
+            ``syllables`` is the list of pinyin syllables of ``name_ch``
+    """
+
+    def __init__(self, entries):
+        self.entries = [
+            (num, name, name_ch, list(syllables))
+            for num, name, name_ch, syllables in entries
+        ]
+        key_rows = {}
+        grams = {}
+        for row, (_, name, name_ch, syllables) in enumerate(self.entries):
+            if "".join(syllables) != name:
+                syllables = [name]
+            keys = {name, name_ch, "".join(s[0] for s in syllables if s)}
+            keys.update("".join(syllables[i:]) for i in range(1, len(syllables)))
+            for key in keys:
+                if key:
+                    key_rows.setdefault(key, []).append(row)
+            for gram in _pinyin_grams(name) | _hanzi_grams(name_ch):
+                grams.setdefault(gram, []).append(row)
+        self.keys = sorted(key_rows)
+        self.key_rows = [key_rows[key] for key in self.keys]
+        self.grams = grams
+
+    @classmethod
+    def from_colors(cls, colors, lexicon):
+        """Index for ``ColorRecord``s, with syllables from ``lexicon``."""
+        return cls(
+            (color.num, color.name, color.name_ch, lexicon.syllables(color.name_ch))
+            for color in colors
+        )
+
+    def __len__(self):
+        return len(self.entries)
+
+    def to_dict(self):
+        return {
+            "format": SEARCH_FORMAT,
+            "entries": [list(entry) for entry in self.entries],
+            "keys": self.keys,
+            "key_rows": self.key_rows,
+            "grams": self.grams,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("format") != SEARCH_FORMAT:
+            raise ValueError("Search index was written by another format version")
+        index = cls.__new__(cls)
+        index.entries = [
+            (num, name, name_ch, list(syllables))
+            for num, name, name_ch, syllables in data["entries"]
+        ]
+        index.keys = data["keys"]
+        index.key_rows = data["key_rows"]
+        index.grams = data["grams"]
+        return index
+
+    def save(self, path):
+        """Write the index as compact JSON, atomically."""
+        path = Path(path)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def prefix(self, query):
+        """Rows with a key starting with ``query``, in key order."""
+        if not query:
+            return []
+        rows = {}
+        pos = bisect_left(self.keys, query)
+        while pos < len(self.keys) and self.keys[pos].startswith(query):
+            rows.update(dict.fromkeys(self.key_rows[pos]))
+            pos += 1
+        return list(rows)
+
+    def _posting_counts(self, grams):
+        counts = Counter()
+        for gram in grams:
+            counts.update(self.grams.get(gram, ()))
+        return counts
+
+    def _substrings(self, query, hanzi):
+        if hanzi:
+            grams = set(query)
+        elif len(query) >= PINYIN_GRAM:
+            grams = _pinyin_grams(query, padded=False)
+        else:
+            return []
+        counts = self._posting_counts(grams)
+        field = 2 if hanzi else 1
+        return [
+            row
+            for row, n in counts.items()
+            if n == len(grams) and query in self.entries[row][field]
+        ]
+
+    def _fuzzy(self, query, hanzi, max_edits):
+        if hanzi:
+            grams = set(query)
+            # One edit changes at most one character
+            needed = len(grams) - max_edits
+        else:
+            grams = _pinyin_grams(query)
+            # One edit changes at most PINYIN_GRAM + 1 padded n-grams (a swap)
+            needed = len(grams) - (PINYIN_GRAM + 1) * max_edits
+        field = 2 if hanzi else 1
+        if needed > 0:
+            counts = self._posting_counts(grams)
+            candidates = [row for row, n in counts.items() if n >= needed]
+        else:
+            # Too short for the n-gram bound; the length check in
+            # edit_distance rejects most names at once
+            candidates = range(len(self.entries))
+        matches = {}
+        for row in candidates:
+            edits = edit_distance(query, self.entries[row][field], max_edits)
+            if edits <= max_edits:
+                matches[row] = edits
+        return matches
+
+    def search(self, query, limit=20, max_edits=None):
+        """Colors matching ``query`` by prefix, substring or within a few edits.
+
+        Args:
+            query: Pinyin (with or without spaces) or Chinese characters
+            limit: Most results to return
+            max_edits: Edit distance tolerated by the fuzzy tier; defaults
+                to ``default_max_edits(query)``
+
+        Returns:
+            List of dicts with ``num``, ``name``, ``name_ch``, ``match``
+            ("exact", "prefix", "substring" or "fuzzy") and ``edits``,
+            best matches first and ties in color order
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        hanzi = is_hanzi(query)
+        if max_edits is None:
+            max_edits = default_max_edits(query)
+
+        ranked = {}
+        for row in self.prefix(query):
+            _, name, name_ch, _ = self.entries[row]
+            ranked[row] = (EXACT if query in (name, name_ch) else PREFIX, 0)
+        for row in self._substrings(query, hanzi):
+            ranked.setdefault(row, (SUBSTRING, 0))
+        if max_edits > 0:
+            for row, edits in self._fuzzy(query, hanzi, max_edits).items():
+                ranked.setdefault(row, (FUZZY, edits))
+
+        names = ("exact", "prefix", "substring", "fuzzy")
+        order = sorted(ranked, key=lambda row: (*ranked[row], row))
+        return [
+            {
+                "num": self.entries[row][0],
+                "name": self.entries[row][1],
+                "name_ch": self.entries[row][2],
+                "match": names[ranked[row][0]],
+                "edits": ranked[row][1],
+            }
+            for row in order[:limit]
+        ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Search the color names by pinyin or Chinese characters.",
+    )
+    parser.add_argument(
+        "query", nargs="+", help="Pinyin or Chinese name, or a part of it"
+    )
+    parser.add_argument(
+        "--index",
+        type=Path,
+        default=Path(__file__).resolve().parent / "chinese_colors_search.json",
+        help="Search index written by ChineseColors.py (default: colors/chinese_colors_search.json)",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="Most results to show (default: 20)",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        index = NameSearchIndex.load(args.index)
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot load the search index {args.index}: {e}")
+        return 1
+    for result in index.search(" ".join(args.query), limit=args.limit):
+        match = result["match"]
+        if result["edits"]:
+            match += f" (edits: {result['edits']})"
+        print(
+            f"{result['num']:>5}  {result['name']:<16} {result['name_ch']:<6} {match}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Reverse lookup: the nearest named Chinese colors for arbitrary colors.
+
+``NamedColorIndex`` builds one ``LabIndex`` over the table in
+``data/chinese_colors.rda``. ``nearest`` answers a whole batch with a
+single ``query_knn`` call and gathers the name columns with array
+indexing, so labeling tens of thousands of colors has no per-color
+Python loop. ΔE is CIE76, the distance the grid index is exact for.
+
+Usage:
+  python3 colors/named_colors.py brand_colors.txt -k 3 -o labels.csv
+
+The input has one color per line, as ``#RRGGBB``; anything after the
+first comma is ignored, so the first column of a CSV works too.
+"""
+
+import argparse
+import csv
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from colorspace import hex_to_rgb_array, rgb_to_xyz_array, xyz_to_lab_array
+from lab_index import LabIndex
+from rda import read_rda
+
+DEFAULT_TABLE = Path(__file__).resolve().parent.parent / "data" / "chinese_colors.rda"
+LABEL_COLUMNS = ("num", "name", "name_ch", "category", "category_ch", "hex")
+
+
+def table_columns(table):
+    """Dict of column name to list of values of an R data.frame RObject."""
+    names = table.attributes["names"].values
+    return {name: column.values for name, column in zip(names, table.values)}
+
+
+def colors_to_lab(colors):
+    """LAB array for a sequence of hex strings or an (n, 3) RGB array (0-255)."""
+    if len(colors) and isinstance(colors[0], str):
+        rgb = hex_to_rgb_array(colors)
+    else:
+        rgb = np.asarray(colors).reshape(-1, 3)
+        if rgb.size and (rgb.min() < 0 or rgb.max() > 255):
+            raise ValueError("RGB values must be between 0 and 255")
+        rgb = rgb.astype(np.uint8)
+    return xyz_to_lab_array(rgb_to_xyz_array(rgb))
+
+
+class NamedColorIndex:
+    """LAB index over the named colors of the table.
+
+    Args:
+        columns: Dict of column name to list of values, with at least
+            ``hex`` and the ``LABEL_COLUMNS`` to report
+        cell_size: Grid cell size of the ``LabIndex`` in ΔE units
+    """
+
+    def __init__(self, columns, cell_size=5.0):
+        self.columns = {
+            name: np.asarray(values, dtype=object) for name, values in columns.items()
+        }
+        self.lab_index = LabIndex(colors_to_lab(list(columns["hex"])), cell_size)
+
+    @classmethod
+    def from_rda(cls, path=DEFAULT_TABLE):
+        return cls(table_columns(read_rda(path)["chinese_colors"]))
+
+    def __len__(self):
+        return len(self.lab_index)
+
+    def query(self, colors, k=1):
+        """Distances and table rows of the ``k`` nearest named colors.
+
+        Args:
+            colors: Sequence of hex strings or (n, 3) RGB array
+            k: Neighbors per color; capped at the table size
+
+        Returns:
+            Tuple of (distances, rows), both (n, k), nearest first
+        """
+        k = min(k, len(self))
+        return self.lab_index.query_knn(colors_to_lab(colors), k)
+
+    def nearest(self, colors, k=1):
+        """The ``k`` nearest named colors of every color in ``colors``.
+
+        Returns:
+            Dict with ``delta_e`` and every ``LABEL_COLUMNS`` entry present
+            in the table, each an (n, k) array, nearest first
+        """
+        distances, rows = self.query(colors, k)
+        labels = {
+            name: self.columns[name][rows]
+            for name in LABEL_COLUMNS
+            if name in self.columns
+        }
+        labels["delta_e"] = distances
+        return labels
+
+
+def read_colors(lines):
+    """Hex codes from the first comma-separated field of each non-blank line."""
+    colors = []
+    for line in lines:
+        field = line.split(",", 1)[0].strip().strip('"')
+        if field and field.lower() != "hex":
+            colors.append(field if field.startswith("#") else f"#{field}")
+    return colors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Label colors with their nearest named Chinese colors.",
+    )
+    parser.add_argument(
+        "input",
+        type=Path,
+        help="File with one hex color per line (or a CSV whose first column is hex); - for stdin",
+    )
+    parser.add_argument(
+        "-k",
+        type=int,
+        default=1,
+        help="Nearest named colors per input color (default: 1)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=None,
+        help="CSV file to write (default: stdout)",
+    )
+    parser.add_argument(
+        "--table",
+        type=Path,
+        default=DEFAULT_TABLE,
+        help="chinese_colors.rda to label with (default: data/chinese_colors.rda)",
+    )
+    args = parser.parse_args(argv)
+    if args.k < 1:
+        parser.error("-k must be at least 1")
+
+    if str(args.input) == "-":
+        colors = read_colors(sys.stdin)
+    else:
+        with open(args.input, encoding="utf-8") as f:
+            colors = read_colors(f)
+    try:
+        index = NamedColorIndex.from_rda(args.table)
+        labels = index.nearest(colors, args.k)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    n, k = labels["delta_e"].shape
+    fields = ["query", "rank", *(name for name in labels if name != "delta_e")]
+    columns = [
+        np.repeat(np.asarray(colors, dtype=object), k),
+        np.tile(np.arange(1, k + 1), n),
+    ]
+    columns += [labels[name].ravel() for name in fields[2:]]
+    fields.append("delta_e")
+    columns.append(np.round(labels["delta_e"].ravel(), 4))
+
+    out = (
+        open(args.output, "w", newline="", encoding="utf-8")
+        if args.output
+        else sys.stdout
+    )
+    try:
+        writer = csv.writer(out)
+        writer.writerow(fields)
+        writer.writerows(zip(*(column.tolist() for column in columns)))
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
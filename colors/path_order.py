@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Open-path ordering over a precomputed symmetric cost matrix.
+
+Used to sort colors inside a category so that neighbors in the output are
+as similar as possible. The path starts at a fixed anchor, is built by
+nearest-neighbor construction and then improved with 2-opt and Or-opt
+moves. Every move is judged by its cost delta alone, so evaluating a move
+never copies the path.
+"""
+
+import time
+
+import numpy as np
+
+
+def path_cost(path, cost):
+    """Total cost of the consecutive transitions along ``path``."""
+    path = np.asarray(path, dtype=np.intp)
+    if len(path) <= 1:
+        return 0.0
+    return float(cost[path[:-1], path[1:]].sum())
+
+
+def greedy_path(cost, start):
+    """Nearest-neighbor path through every node, beginning at ``start``.
+
+    Ties go to the lowest node index.
+    """
+    n = len(cost)
+    remaining = np.ones(n, dtype=bool)
+    remaining[start] = False
+    path = [start]
+    for _ in range(n - 1):
+        candidates = np.flatnonzero(remaining)
+        best = candidates[int(np.argmin(cost[path[-1], candidates]))]
+        path.append(best)
+        remaining[best] = False
+    return np.array(path, dtype=np.intp)
+
+
+def _edge_costs(path, cost):
+    return cost[path[:-1], path[1:]]
+
+
+def _two_opt_pass(path, cost, tol):
+    """One sweep of first-improvement 2-opt with the first node fixed."""
+    n = len(path)
+    edges = _edge_costs(path, cost)
+    improved = False
+    for i in range(1, n - 1):
+        a, b = path[i - 1], path[i]
+        # Reversing path[i..j] swaps edges (a, b), (path[j], path[j + 1])
+        # for (a, path[j]), (b, path[j + 1]); the last j has no right edge.
+        delta = cost[a][path[i + 1 :]] - edges[i - 1]
+        delta[:-1] += cost[b][path[i + 2 :]] - edges[i + 1 :]
+        best = int(np.argmin(delta))
+        if delta[best] < -tol:
+            j = i + 1 + best
+            path[i : j + 1] = path[i : j + 1][::-1]
+            edges = _edge_costs(path, cost)
+            improved = True
+    return improved
+
+
+def _or_opt_pass(path, cost, tol, max_segment):
+    """One sweep of Or-opt: move runs of up to ``max_segment`` nodes."""
+    n = len(path)
+    edges = _edge_costs(path, cost)
+    improved = False
+    for length in range(1, max_segment + 1):
+        for i in range(1, n - length + 1):
+            first, last = path[i], path[i + length - 1]
+            if i + length < n:
+                after = path[i + length]
+                removal = edges[i - 1] + edges[i + length - 1]
+                removal -= cost[path[i - 1], after]
+            else:
+                removal = edges[i - 1]
+
+            # Cost of inserting the run between path[k] and path[k + 1], or
+            # after the last node when k == n - 1
+            insertion = cost[first][path]
+            insertion[:-1] += cost[last][path[1:]] - edges
+            insertion[i - 1 : i + length] = np.inf
+
+            k = int(np.argmin(insertion))
+            if insertion[k] - removal < -tol:
+                segment = path[i : i + length].copy()
+                rest = np.concatenate([path[:i], path[i + length :]])
+                pos = k + 1 if k < i else k + 1 - length
+                path[:] = np.concatenate([rest[:pos], segment, rest[pos:]])
+                edges = _edge_costs(path, cost)
+                improved = True
+    return improved
+
+
+def optimize_path(
+    cost, start, max_passes=50, time_budget=None, max_segment=3, tol=1e-9
+):
+    """Build and improve an open path over all nodes of ``cost``.
+
+    Args:
+        cost: (n, n) symmetric transition cost matrix
+        start: Node the path must begin with
+        max_passes: Maximum number of 2-opt + Or-opt sweeps (default 50)
+        time_budget: Optional wall-clock limit in seconds; checked between
+            sweeps, so the result is deterministic when it is None
+        max_segment: Longest run of nodes Or-opt moves at once (default 3)
+        tol: Minimum cost decrease for a move to be applied
+
+    Returns:
+        Array of node indices, beginning with ``start``
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    path = greedy_path(cost, start)
+    if len(path) <= 2:
+        return path
+
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    for _ in range(max_passes):
+        improved = _two_opt_pass(path, cost, tol)
+        improved |= _or_opt_pass(path, cost, tol, max_segment)
+        if not improved:
+            break
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+    return path
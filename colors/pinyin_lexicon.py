@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Memoized pinyin transliteration backed by an on-disk lexicon.
+
+pypinyin is only imported when a name is not in the lexicon yet, so a run
+whose names were all seen before never pays for loading its dictionaries.
+The lexicon file records the pypinyin version it was built with and is
+discarded when that version changes. Each reading is stored as a list of
+syllables, since pypinyin passes spaces and other non-Hanzi text through
+as syllables of their own.
+
+Overrides correct names that pypinyin reads wrongly. They are applied on
+top of the stored readings and never written to disk, so editing them
+takes effect immediately. ``PINYIN_OVERRIDES`` is empty, because
+``check_pinyin`` finds no misread names in the current workbook, so in
+practice every correction comes from a user file passed with
+``--pinyin-overrides`` (see ``load_overrides``).
+
+Run this module with a lexicon file to check that every stored reading
+still equals a fresh transliteration:
+
+  python3 colors/pinyin_lexicon.py colors/.cache/pinyin_lexicon.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+LEXICON_FORMAT = 2
+
+# Accepted readings of the category characters; used to flag names whose
+# transliteration picked an unexpected reading
+CATEGORY_READINGS = {
+    "蓝": ("lan",),
+    "红": ("hong",),
+    "绿": ("lv", "lu"),
+    "黄": ("huang",),
+    "橙": ("cheng",),
+    "紫": ("zi",),
+    "青": ("qing",),
+    "灰": ("hui",),
+    "褐": ("he",),
+}
+
+# Phrase -> space-separated syllables (one per character) for words that
+# pypinyin reads wrongly in color names. Empty: no name in the current
+# workbook needs one; user files add entries through load_overrides
+PINYIN_OVERRIDES = {}
+
+
+def load_overrides(path):
+    """Read user overrides from a JSON object of phrase to reading.
+
+    A reading is either space-separated syllables (``"qian hong"``) or a
+    list of them. The result extends ``PINYIN_OVERRIDES``; entries in the
+    file win.
+
+    Raises:
+        ValueError: The file is not a JSON object of strings or lists
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: pinyin overrides must be a JSON object")
+    overrides = dict(PINYIN_OVERRIDES)
+    for phrase, reading in data.items():
+        if isinstance(reading, list) and all(isinstance(s, str) for s in reading):
+            reading = " ".join(reading)
+        if not isinstance(reading, str):
+            raise ValueError(f"{path}: reading for '{phrase}' must be a string")
+        overrides[phrase] = reading
+    return overrides
+
+
+def pypinyin_version():
+    """Installed pypinyin version, read without importing the package."""
+    from importlib import metadata
+
+    try:
+        return metadata.version("pypinyin")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _transliterate(text):
+    try:
+        from pypinyin import Style, lazy_pinyin
+    except ImportError as e:
+        raise ImportError(
+            "pypinyin package is required. Install it with: pip install pypinyin"
+        ) from e
+
+    return tuple(syllable.lower() for syllable in lazy_pinyin(text, style=Style.NORMAL))
+
+
+def align_syllables(text, syllables):
+    """Pair each item of a ``lazy_pinyin`` result with the text it came from.
+
+    Chinese characters map to one syllable each; runs of other characters
+    are passed through by pypinyin (lowercased here) and map to themselves.
+
+    Returns:
+        List of (source, syllable) tuples
+    """
+    pairs = []
+    pos = 0
+    for syllable in syllables:
+        run = text[pos : pos + len(syllable)]
+        if len(syllable) > 1 and run.lower() == syllable:
+            source = run
+        else:
+            source = text[pos : pos + 1]
+        pairs.append((source, syllable))
+        pos += len(source)
+    return pairs
+
+
+class PinyinLexicon:
+    """Name -> pinyin syllables, memoized in memory and optionally on disk.
+
+    Args:
+        path: JSON lexicon file; None keeps the lexicon in memory only
+        overrides: Phrase -> space-separated syllables, applied before
+            pypinyin; defaults to ``PINYIN_OVERRIDES``
+    """
+
+    def __init__(self, path=None, overrides=None):
+        self.path = None if path is None else Path(path)
+        self.version = pypinyin_version()
+        self.overrides = {}
+        for phrase, reading in (
+            PINYIN_OVERRIDES if overrides is None else overrides
+        ).items():
+            syllables = reading.split()
+            if len(syllables) != len(phrase):
+                raise ValueError(
+                    f"Override for '{phrase}' needs one syllable per character"
+                )
+            self.overrides[phrase] = [s.lower() for s in syllables]
+        self._phrases = sorted(self.overrides, key=len, reverse=True)
+        self._entries = self._load()
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("format") != LEXICON_FORMAT or data.get("pypinyin") != self.version:
+            return {}
+        return {name: list(syllables) for name, syllables in data["entries"].items()}
+
+    def save(self):
+        """Write new entries to the lexicon file, if there are any."""
+        if self.path is None or not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "format": LEXICON_FORMAT,
+            "pypinyin": self.version,
+            "entries": dict(sorted(self._entries.items())),
+        }
+        tmp_path = self.path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=0)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def _lookup(self, text):
+        syllables = self._entries.get(text)
+        if syllables is None:
+            syllables = list(_transliterate(text))
+            self._entries[text] = syllables
+            self._dirty = True
+        return syllables
+
+    def _split(self, name):
+        """Split ``name`` into (text, override syllables or None) pieces."""
+        for phrase in self._phrases:
+            start = name.find(phrase)
+            if start >= 0:
+                end = start + len(phrase)
+                return (
+                    self._split(name[:start])
+                    + [(phrase, self.overrides[phrase])]
+                    + self._split(name[end:])
+                )
+        return [(name, None)] if name else []
+
+    def syllables(self, name):
+        """Pinyin syllables of ``name``, lowercase and without tones."""
+        if not self._phrases:
+            return list(self._lookup(name))
+        result = []
+        for text, fixed in self._split(name):
+            result.extend(fixed if fixed is not None else self._lookup(text))
+        return result
+
+    def transliterate(self, name):
+        """Pinyin of ``name`` as one lowercase word without tones."""
+        return "".join(self.syllables(name))
+
+    def transliterate_many(self, names):
+        """Transliterate a batch of names, then persist any new readings.
+
+        Each distinct name is converted once, however often it repeats.
+        """
+        unique = {name: self.transliterate(name) for name in dict.fromkeys(names)}
+        self.save()
+        return [unique[name] for name in names]
+
+    def stale_entries(self):
+        """Stored names whose reading differs from a fresh transliteration.
+
+        A lexicon loaded from disk must give the same readings as a cold
+        run; any name returned here means it does not.
+        """
+        return [
+            name
+            for name, syllables in self._entries.items()
+            if syllables != list(_transliterate(name))
+        ]
+
+    def misread(self, name, chars, readings=CATEGORY_READINGS):
+        """Whether any of ``chars`` in ``name`` got a reading outside
+        ``readings``."""
+        return any(
+            source in chars and syllable not in readings.get(source, (syllable,))
+            for source, syllable in align_syllables(name, self.syllables(name))
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check that a saved pinyin lexicon matches a fresh transliteration.",
+    )
+    parser.add_argument("lexicon", type=Path, help="Lexicon JSON file to check")
+    args = parser.parse_args(argv)
+
+    lexicon = PinyinLexicon(args.lexicon, overrides={})
+    if not len(lexicon):
+        print(f"Error: {args.lexicon} is missing or was written by another version")
+        return 1
+    stale = lexicon.stale_entries()
+    for name in stale:
+        print(
+            f"{name}: stored {lexicon._entries[name]}, fresh {list(_transliterate(name))}"
+        )
+    print(f"{len(lexicon) - len(stale)} of {len(lexicon)} entries match")
+    return 1 if stale else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Per-stage timing, work counters and diagnostics for one build, as JSON.
+
+The hot loops bump named counters with ``count``, e.g. distance
+evaluations and candidates scanned. Functions that find something worth
+reporting, such as duplicates or pinyin issues, call ``note``. Both write
+to module-level state, so no report object has to be passed through every
+function. ``RunReport`` resets that state when it starts, times each
+stage and collects everything into one dict.
+
+Work done in ``ProcessPoolExecutor`` workers is counted there.
+``counted_call`` ships the worker's counters back with its result, and
+``merge_counters`` adds them to the parent's totals.
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPORT_FORMAT = 1
+
+COUNTERS = Counter()
+NOTES = {}
+
+
+def count(name, n=1):
+    """Add ``n`` to the counter ``name``."""
+    COUNTERS[name] += n
+
+
+def note(key, value):
+    """Store a JSON-serializable diagnostic under ``key``."""
+    NOTES[key] = value
+
+
+def merge_counters(counters):
+    COUNTERS.update(counters)
+
+
+def counted_call(func, *args):
+    """Call ``func`` and return ``(result, counters it added)``.
+
+    Used as the worker function of a process pool, so counts made in the
+    worker reach the parent.
+    """
+    before = Counter(COUNTERS)
+    result = func(*args)
+    return result, dict(COUNTERS - before)
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process and of its finished children.
+
+    Returns:
+        Tuple of (self, children) in bytes, or (None, None) where the
+        ``resource`` module is unavailable
+    """
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return own, children
+
+
+def _cpu_seconds():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class RunReport:
+    """Timings, counters and notes collected over one pipeline run.
+
+    Args:
+        settings: JSON-serializable options the run was started with
+    """
+
+    def __init__(self, settings=None):
+        COUNTERS.clear()
+        NOTES.clear()
+        self.settings = dict(settings or {})
+        self.stages = []
+        self.started = datetime.now(timezone.utc)
+        self._wall = time.perf_counter()
+        self._cpu = _cpu_seconds()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as stage ``name``, including worker CPU."""
+        wall = time.perf_counter()
+        cpu = _cpu_seconds()
+        counters = Counter(COUNTERS)
+        try:
+            yield
+        finally:
+            peak, peak_children = peak_rss_bytes()
+            self.stages.append(
+                {
+                    "name": name,
+                    "wall_seconds": time.perf_counter() - wall,
+                    "cpu_seconds": _cpu_seconds() - cpu,
+                    "counters": dict(COUNTERS - counters),
+                    "peak_rss_bytes": peak,
+                    "peak_rss_children_bytes": peak_children,
+                }
+            )
+
+    def to_dict(self):
+        peak, peak_children = peak_rss_bytes()
+        return {
+            "format": REPORT_FORMAT,
+            "started": self.started.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "settings": self.settings,
+            "wall_seconds": time.perf_counter() - self._wall,
+            "cpu_seconds": _cpu_seconds() - self._cpu,
+            "peak_rss_bytes": peak,
+            "peak_rss_children_bytes": peak_children,
+            "stages": self.stages,
+            "counters": dict(COUNTERS),
+            "diagnostics": dict(NOTES),
+        }
+
+    def save(self, path):
+        """Write the report as indented JSON, atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Single-pass workbook ingestion and a memory-mappable columnar copy.
+
+Every sheet is read from one open of the workbook, either through pandas
+(``sheet_name=None``) or by streaming rows from openpyxl in read-only mode,
+and handed on in frames of bounded size.
+The merged frame can be written to a directory of ``.npy`` files, one per
+column, that later runs and other tools open with ``np.load(mmap_mode="r")``
+instead of parsing the Excel XML again.
+
+pandas is imported on first use, so loading a columnar copy and the
+helpers that work on plain arrays do not pay its import cost.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from colorspace import rgb_array_to_hex
+
+
+class WorkbookError(ValueError):
+    """The workbook is missing or does not contain the columns the pipeline needs."""
+
+
+def _pandas():
+    try:
+        import pandas as pd
+    except ImportError as e:
+        raise ImportError(
+            "pandas package is required. Install it with: pip install pandas openpyxl"
+        ) from e
+    return pd
+
+
+REQUIRED_COLUMNS = ["色名", "C", "M", "Y", "K", "R", "G", "B", "总"]
+TEXT_COLUMNS = ("色名", "sheet_name")
+COLUMNS_FORMAT = 1
+
+SHEET_CATEGORIES = {
+    "红": "red",
+    "橙": "orange",
+    "黄": "yellow",
+    "绿": "green",
+    "青": "cyan",
+    "蓝": "blue",
+    "紫": "purple",
+    "灰褐": "gray_brown",
+}
+CATEGORY_CHARS = ["红", "橙", "黄", "绿", "青", "蓝", "紫", "灰", "褐", "黑", "白"]
+MAX_NAME_LENGTH = 10
+
+# Reasons a row is dropped by ``clean_rows``, in the order they are checked
+SKIP_REASONS = (
+    "missing_name",
+    "no_chinese",
+    "name_too_long",
+    "single_char",
+    "missing_rgb",
+    "rgb_out_of_range",
+    "unknown_category",
+)
+
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+def _frame_chunks(df, chunk_rows):
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start : start + chunk_rows]
+
+
+def _open_sheets_pandas(excel_path, chunk_rows):
+    sheets = _pandas().read_excel(excel_path, sheet_name=None, header=1)
+    return list(sheets), (
+        (sheet, list(df.columns), _frame_chunks(df, chunk_rows))
+        for sheet, df in sheets.items()
+    )
+
+
+def _open_sheets_streaming(excel_path, chunk_rows):
+    """Stream every sheet row by row with openpyxl's read-only reader.
+
+    The frames match ``pd.read_excel(..., header=1)``: the second row is the
+    header, unnamed columns become ``Unnamed: <i>``, and blank rows are
+    dropped. At most ``chunk_rows`` rows are held at a time.
+    """
+    pd = _pandas()
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+
+    def frames(rows, columns):
+        # Keep the first of any repeated header, as pandas does
+        keep = ~pd.Index(columns).duplicated()
+        batch = []
+        emitted = False
+        for row in rows:
+            if any(value is not None and value != "" for value in row):
+                batch.append(row[: len(columns)])
+            if len(batch) == chunk_rows:
+                yield frame(batch, columns, keep)
+                batch = []
+                emitted = True
+        if batch or not emitted:
+            yield frame(batch, columns, keep)
+
+    def frame(batch, columns, keep):
+        df = pd.DataFrame.from_records(batch, columns=range(len(columns)))
+        df.columns = columns
+        return df.loc[:, keep]
+
+    def sheets():
+        try:
+            for worksheet in workbook.worksheets:
+                rows = worksheet.iter_rows(values_only=True)
+                next(rows, None)
+                header = next(rows, ())
+                columns = [
+                    f"Unnamed: {i}" if value is None else value
+                    for i, value in enumerate(header)
+                ]
+                yield worksheet.title, list(dict.fromkeys(columns)), frames(
+                    rows, columns
+                )
+        finally:
+            workbook.close()
+
+    return workbook.sheetnames, sheets()
+
+
+def iter_workbook_frames(excel_path, streaming=False, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield the required columns of every sheet in frames of bounded size.
+
+    Args:
+        excel_path: Path to the workbook
+        streaming: If True, stream rows with openpyxl in read-only mode, so
+            no more than ``chunk_rows`` rows are in memory at once; pandas
+            otherwise loads each sheet whole before it is split
+        chunk_rows: Maximum number of rows per frame
+
+    Yields:
+        DataFrames with the available ``REQUIRED_COLUMNS`` of one sheet and
+        a ``sheet_name`` column; sheets without any of them are skipped
+    """
+    print(f"Reading Excel file: {excel_path}")
+    if streaming:
+        names, sheets = _open_sheets_streaming(excel_path, chunk_rows)
+    else:
+        names, sheets = _open_sheets_pandas(excel_path, chunk_rows)
+
+    print(f"Found sheets: {', '.join(names)}")
+
+    for sheet, available_cols, frames in sheets:
+        print(f"  Reading sheet: {sheet}...")
+
+        missing_cols = [col for col in REQUIRED_COLUMNS if col not in available_cols]
+        if missing_cols:
+            print(f"    Warning: Missing columns in sheet '{sheet}': {missing_cols}")
+            print(f"    Available columns: {available_cols}")
+            for missing_col in missing_cols:
+                similar = [
+                    c
+                    for c in available_cols
+                    if missing_col in str(c) or str(c) in missing_col
+                ]
+                if similar:
+                    print(f"      Similar to '{missing_col}': {similar}")
+
+        cols_to_use = [col for col in REQUIRED_COLUMNS if col in available_cols]
+        if len(cols_to_use) == 0:
+            print(f"    Error: No required columns found in sheet '{sheet}'")
+            continue
+
+        n_rows = 0
+        for df in frames:
+            df = df[cols_to_use].copy()
+            df["sheet_name"] = sheet
+            n_rows += len(df)
+            yield df
+        print(f"    Rows: {n_rows}, Cols: {len(cols_to_use) + 1}")
+
+
+def read_workbook(excel_path, streaming=False):
+    """Read the required columns of every sheet into one frame.
+
+    Returns:
+        DataFrame with the available ``REQUIRED_COLUMNS`` and a
+        ``sheet_name`` column, or None if no sheet had any of them
+    """
+    frames = list(iter_workbook_frames(excel_path, streaming=streaming))
+    if len(frames) == 0:
+        return None
+    return _pandas().concat(frames, ignore_index=True)
+
+
+def _column_array(series, text):
+    pd = _pandas()
+    if text:
+        # Missing text becomes "", which the row cleaning skips like NaN
+        values = ["" if pd.isna(v) else str(v) for v in series.tolist()]
+        return np.array(values, dtype=str) if values else np.array([], dtype="U1")
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def frame_to_columns(df):
+    """Column arrays in the form ``save_columns`` stores and ``load_columns``
+    returns, so freshly read and reloaded data are indistinguishable."""
+    return {
+        column: _column_array(df[column], column in TEXT_COLUMNS)
+        for column in df.columns
+    }
+
+
+def save_columns(columns, directory, source_digest):
+    """Write each column as its own ``.npy`` file plus a manifest.
+
+    Text columns are stored as fixed-width unicode arrays and every other
+    column as float64 (non-numeric cells become NaN), so all of them can be
+    memory-mapped.
+
+    Args:
+        columns: Dict returned by ``frame_to_columns``
+        directory: Output directory; created if needed
+        source_digest: Digest of the workbook the frame was read from
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    files = {}
+    for i, (column, values) in enumerate(columns.items()):
+        name = f"col{i}.npy"
+        np.save(directory / name, values)
+        files[column] = name
+
+    manifest = {
+        "format": COLUMNS_FORMAT,
+        "source": source_digest,
+        "rows": len(next(iter(columns.values()), ())),
+        "columns": files,
+    }
+    tmp_path = directory / f"manifest.json.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, directory / "manifest.json")
+
+
+def load_columns(directory, source_digest=None, mmap_mode="r"):
+    """Open a directory written by ``save_columns``.
+
+    Args:
+        directory: Directory holding ``manifest.json`` and the column files
+        source_digest: If given, only accept data read from this workbook
+        mmap_mode: Passed to ``np.load``; None reads the arrays into memory
+
+    Returns:
+        Dict of column name to array, in the original column order, or None
+        if the directory is missing, stale or unreadable
+    """
+    directory = Path(directory)
+    try:
+        with open(directory / "manifest.json", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != COLUMNS_FORMAT:
+        return None
+    if source_digest is not None and manifest.get("source") != source_digest:
+        return None
+
+    try:
+        columns = {
+            column: np.load(directory / name, mmap_mode=mmap_mode)
+            for column, name in manifest["columns"].items()
+        }
+    except (OSError, ValueError):
+        return None
+    if any(len(values) != manifest["rows"] for values in columns.values()):
+        return None
+    return columns
+
+
+def _rgb_strings(rgb):
+    return [f"({r}, {g}, {b})" for r, g, b in rgb.tolist()]
+
+
+def clean_rows(columns, name_col="色名", rgb_cols=("R", "G", "B"), row_offset=0):
+    """Validate and normalize workbook rows with whole-column operations.
+
+    Names are trimmed, newlines become spaces and only the part before the
+    first ``/`` is kept. A row is dropped, for the first matching reason in
+    ``SKIP_REASONS``, if its name is empty, has no CJK character or is
+    longer than ``MAX_NAME_LENGTH``; if it is a lone category character
+    naming its own sheet; if an RGB value is missing or not a number; if RGB
+    values truncated to integers fall outside 0-255; or if the sheet is not
+    a known category.
+
+    Args:
+        columns: Dict of column arrays, as returned by ``frame_to_columns``
+        name_col: Column holding the Chinese color name
+        rgb_cols: Columns holding the R, G and B values
+        row_offset: Index of the first row, when ``columns`` is one chunk
+            of a longer stream; added to the reported row numbers
+
+    Returns:
+        Tuple of (table, short_names, skipped): a DataFrame of the kept rows
+        with columns row, name_ch, r, g, b (uint8), hex, rgb, category and
+        category_ch; a list of dicts describing the skipped single-character
+        names; and a dict counting the dropped rows per reason
+    """
+    pd = _pandas()
+    names = pd.Series(np.asarray(columns[name_col]), dtype=object).str.strip()
+    sheets = pd.Series(np.asarray(columns["sheet_name"]), dtype=object).str.strip()
+    n = len(names)
+    reason = np.full(n, "", dtype=object)
+
+    def drop(mask, why):
+        mask = np.asarray(mask, dtype=bool) & (reason == "")
+        reason[mask] = why
+        return mask
+
+    drop((names == "") | (names == "nan"), "missing_name")
+    names = names.str.replace("\n", " ").str.replace("\r", " ")
+    names = names.str.split("/", n=1).str[0].str.strip()
+    drop(~names.str.contains("[\u4e00-\u9fff]", regex=True), "no_chinese")
+    drop(names.str.len() > MAX_NAME_LENGTH, "name_too_long")
+
+    # A lone category character naming its own sheet is a section header
+    # or a truncated name rather than a color
+    single = (names.str.len() == 1) & names.isin(CATEGORY_CHARS)
+    single &= np.array(
+        [name in sheet for name, sheet in zip(names.tolist(), sheets.tolist())],
+        dtype=bool,
+    )
+    single = drop(single, "single_char")
+
+    values = np.column_stack(
+        [np.asarray(columns[col], dtype=np.float64) for col in rgb_cols]
+    ).reshape(n, 3)
+    finite = np.isfinite(values).all(axis=1)
+    drop(~finite, "missing_rgb")
+    # int(float(value)) truncates toward zero; range-check before casting
+    values = np.trunc(np.where(finite[:, None], values, 0.0))
+    drop(((values < 0) | (values > 255)).any(axis=1), "rgb_out_of_range")
+    rgb = np.clip(values, 0, 255).astype(np.int64)
+
+    short_rows = np.flatnonzero(single)
+    short_rgb = _rgb_strings(values[short_rows].astype(np.int64))
+    short_names = [
+        {
+            "row": row_offset + int(row),
+            "name": names.iat[row],
+            "sheet": sheets.iat[row],
+            "rgb": rgb_str if finite[row] else "N/A",
+        }
+        for row, rgb_str in zip(short_rows.tolist(), short_rgb)
+    ]
+
+    unknown = drop(~sheets.isin(list(SHEET_CATEGORIES)), "unknown_category")
+    for row in np.flatnonzero(unknown).tolist():
+        print(
+            f"  Warning: Skipping row {row_offset + row}: Unknown category '{sheets.iat[row]}'"
+        )
+
+    kept = np.flatnonzero(reason == "")
+    kept_rgb = rgb[kept].astype(np.uint8)
+    table = pd.DataFrame(
+        {
+            "row": row_offset + kept,
+            "name_ch": names.iloc[kept].to_numpy(dtype=object),
+            "r": kept_rgb[:, 0],
+            "g": kept_rgb[:, 1],
+            "b": kept_rgb[:, 2],
+            "hex": rgb_array_to_hex(kept_rgb),
+            "rgb": _rgb_strings(kept_rgb),
+            "category": sheets.iloc[kept].map(SHEET_CATEGORIES).to_numpy(dtype=object),
+            "category_ch": sheets.iloc[kept].to_numpy(dtype=object),
+        }
+    )
+    skipped = {why: int((reason == why).sum()) for why in SKIP_REASONS}
+    return table, short_names, skipped